@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+from collections import namedtuple
+
+# (msb, lsb) alarm kodunun çözümlenmiş hali
+AlarmCode = namedtuple('AlarmCode', ['is_valid', 'type', 'key'])
+
+ARM_ALARM_LSB = 9  # LSB = 9 -> kol alarmı
+
+# Açıklama anahtarları static/locales/*.json'daki alarms.descriptions anahtarlarıyla aynı
+DESCRIPTIONS = {
+    'tr': {
+        'highCurrent': "Yüksek akım alarmı",
+        'highHumidity': "Yüksek nem alarmı",
+        'highAmbientTemp': "Yüksek ortam sıcaklığı alarmı",
+        'highArmTemp': "Yüksek kol sıcaklığı alarmı",
+        'noArmData': "Kol verisi gelmiyor",
+        'positivePoleTemp': "Pozitif kutup başı alarmı",
+        'negativePoleTemp': "Negatif kutup başı sıcaklık alarmı",
+        'lowVoltageWarning': "Düşük batarya gerilim uyarısı",
+        'lowVoltageAlarm': "Düşük batarya gerilimi alarmı",
+        'highVoltageWarning': "Yüksek batarya gerilimi uyarısı",
+        'highVoltageAlarm': "Yüksek batarya gerilimi alarmı",
+        'moduleTempAlarm': "Modül sıcaklık alarmı"
+    },
+    'en': {
+        'highCurrent': "High current alarm",
+        'highHumidity': "High humidity alarm",
+        'highAmbientTemp': "High ambient temperature alarm",
+        'highArmTemp': "High arm temperature alarm",
+        'noArmData': "No arm data received",
+        'positivePoleTemp': "Positive pole temperature alarm",
+        'negativePoleTemp': "Negative pole temperature alarm",
+        'lowVoltageWarning': "Low battery voltage warning",
+        'lowVoltageAlarm': "Low battery voltage alarm",
+        'highVoltageWarning': "High battery voltage warning",
+        'highVoltageAlarm': "High battery voltage alarm",
+        'moduleTempAlarm': "Module temperature alarm"
+    }
+}
+
+ARM_ALARM_KEYS = {
+    2: 'highCurrent',
+    4: 'highHumidity',
+    8: 'highAmbientTemp',
+    16: 'highArmTemp',
+    266: 'noArmData'  # Byte aralığı dışında, tablo yerine doğrudan çözülür
+}
+
+BATTERY_LSB_KEYS = {
+    4: 'lowVoltageWarning',
+    8: 'lowVoltageAlarm',
+    16: 'highVoltageWarning',
+    32: 'highVoltageAlarm',
+    64: 'moduleTempAlarm'
+}
+
+BATTERY_MSB_KEYS = {
+    1: 'positivePoleTemp',
+    2: 'negativePoleTemp'
+}
+
+# Özet (digest) mail penceresini beklemeden gönderilebilen alarmlar
+CRITICAL_KEYS = frozenset(('lowVoltageAlarm', 'highVoltageAlarm', 'highCurrent', 'noArmData'))
+
+def _resolve(error_msb, error_lsb):
+    """(msb, lsb) kodunu çöz - tablo bu fonksiyondan bir kez üretilir"""
+    if error_lsb == ARM_ALARM_LSB:
+        key = ARM_ALARM_KEYS.get(error_msb)
+        return AlarmCode(key is not None, 'arm', key)
+
+    # MSB (kutup sıcaklığı) LSB'den önce gelir, LSB = 1 (düzelme) hariç
+    key = None
+    if error_lsb != 1:
+        key = BATTERY_MSB_KEYS.get(error_msb)
+    if key is None:
+        key = BATTERY_LSB_KEYS.get(error_lsb)
+    return AlarmCode(key is not None, 'battery', key)
+
+# 256x256 arama tablosu: indeks = msb * 256 + lsb
+ALARM_TABLE = tuple(_resolve(msb, lsb) for msb in range(256) for lsb in range(256))
+
+def lookup(error_msb, error_lsb):
+    """Alarm kodunu tablodan çöz (byte aralığı dışındaki kodlar doğrudan çözülür)"""
+    if 0 <= error_msb < 256 and 0 <= error_lsb < 256:
+        return ALARM_TABLE[error_msb * 256 + error_lsb]
+    return _resolve(error_msb, error_lsb)
+
+def is_valid_alarm(error_msb, error_lsb):
+    """Alarm geçerli mi (açıklaması tanımlı mı)"""
+    return lookup(error_msb, error_lsb).is_valid
+
+def get_alarm_type(error_msb, error_lsb):
+    """Alarm türünü döndür - 'arm' veya 'battery'"""
+    return lookup(error_msb, error_lsb).type
+
+def get_description(error_msb, error_lsb, language='tr'):
+    """Alarm açıklaması (tanımsız kod için None, bilinmeyen dil için Türkçe)"""
+    key = lookup(error_msb, error_lsb).key
+    if key is None:
+        return None
+    return DESCRIPTIONS.get(language, DESCRIPTIONS['tr'])[key]
+
+def is_critical(error_msb, error_lsb):
+    """Alarm kritik mi (özet mail penceresini atlayabilir)"""
+    return lookup(error_msb, error_lsb).key in CRITICAL_KEYS
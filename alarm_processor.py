@@ -3,7 +3,8 @@
 import time
 import threading
 from datetime import datetime
-from mail_sender import send_alarm_notification
+from mail_sender import mail_sender, send_alarm_notification, queue_alarm_digest
+import alarm_codes
 
 class AlarmProcessor:
     def __init__(self, db=None):
@@ -19,6 +20,18 @@ class AlarmProcessor:
         self.pending_alarms = []  # Bekleyen alarmlar
         self.pending_resolves = []  # Bekleyen düzeltmeler
         self.lock = threading.Lock()
+        # Aktif alarm index'i: (arm, battery) -> {(msb, lsb): episode id} (insert/resolve ile senkron)
+        self.active_alarms = self._load_active_alarms()
+    
+    def _load_active_alarms(self):
+        """Başlangıçta aktif alarm index'ini veritabanından yükle"""
+        try:
+            active_alarms = self.db.get_active_alarm_index()
+            print(f"📋 Aktif alarm index'i yüklendi: {sum(len(episodes) for episodes in active_alarms.values())} alarm, {len(active_alarms)} kol/batarya")
+            return active_alarms
+        except Exception as e:
+            print(f"⚠️ Aktif alarm index'i yüklenemedi: {e}")
+            return {}
         
     def add_alarm(self, arm, battery, error_msb, error_lsb, timestamp):
         """Yeni alarm ekle (periyot bitiminde işlenecek)"""
@@ -56,27 +69,24 @@ class AlarmProcessor:
             
             # Alarmları kaydet
             if self.pending_alarms:
-                # Geçerli ve geçersiz alarmları ayır
-                valid_alarms = []
-                invalid_alarms = []
-                
+                # Geçersiz alarmları logla (yine de kaydedilir)
                 for alarm in self.pending_alarms:
-                    if self._is_valid_alarm(alarm['error_code_msb'], alarm['error_code_lsb']):
-                        valid_alarms.append(alarm)
-                    else:
-                        invalid_alarms.append(alarm)
-                
-                # Geçersiz alarmları logla
-                if invalid_alarms:
-                    for alarm in invalid_alarms:
+                    if not self._is_valid_alarm(alarm['error_code_msb'], alarm['error_code_lsb']):
                         print(f"⚠️ GEÇERSİZ ALARM LOG: Kol {alarm['arm']}, Batarya {alarm['battery']}, MSB {alarm['error_code_msb']}, LSB {alarm['error_code_lsb']}, Timestamp {alarm['timestamp']}")
                 
-                # Tüm alarmları veritabanına kaydet (geçerli + geçersiz)
-                success = self.db.batch_insert_alarms(self.pending_alarms)
-                if success:
-                    # Sadece geçerli alarmlar için mail gönder
-                    if valid_alarms:
-                        self.send_alarm_emails(valid_alarms)
+                # Sadece yeni başlayan alarmlar satır olarak eklenir, devam edenlerin sayacı artar
+                raised_alarms, repeats = self._split_alarm_transitions(self.pending_alarms)
+                alarm_ids = self.db.record_alarm_episodes(raised_alarms, repeats)
+                if alarm_ids is not None:
+                    for alarm, alarm_id in zip(raised_alarms, alarm_ids):
+                        episodes = self.active_alarms.setdefault((alarm['arm'], alarm['battery']), {})
+                        episodes[(alarm['error_code_msb'], alarm['error_code_lsb'])] = alarm_id
+                    
+                    # Sadece yeni başlayan geçerli alarmlar için mail gönder
+                    raised_valid = [alarm for alarm in raised_alarms
+                                    if self._is_valid_alarm(alarm['error_code_msb'], alarm['error_code_lsb'])]
+                    if raised_valid:
+                        self.send_alarm_emails(raised_valid)
                     self.pending_alarms.clear()
             
             # Düzeltmeleri işle
@@ -84,54 +94,61 @@ class AlarmProcessor:
                 self.process_resolves()
                 self.pending_resolves.clear()
     
+    def _split_alarm_transitions(self, alarms):
+        """Bekleyen alarmları yeni başlayanlar ve devam edenler (episode id -> (tekrar, son görülme)) olarak ayır"""
+        raised = {}
+        repeats = {}
+        
+        for alarm in alarms:
+            key = (alarm['arm'], alarm['battery'])
+            code = (alarm['error_code_msb'], alarm['error_code_lsb'])
+            alarm_id = self.active_alarms.get(key, {}).get(code)
+            
+            if alarm_id is not None:
+                count, last_seen = repeats.get(alarm_id, (0, alarm['timestamp']))
+                repeats[alarm_id] = (count + 1, max(last_seen, alarm['timestamp']))
+            elif (key, code) in raised:
+                # Aynı periyotta tekrar gelen yeni alarm: ilk satırın sayacı artar
+                episode = raised[(key, code)]
+                episode['occurrence_count'] += 1
+                episode['last_seen'] = max(episode['last_seen'], alarm['timestamp'])
+            else:
+                raised[(key, code)] = dict(alarm, occurrence_count=1, last_seen=alarm['timestamp'])
+        
+        return list(raised.values()), repeats
+    
     def _is_valid_alarm(self, error_msb, error_lsb):
-        """Alarm geçerli mi kontrol et (web_app.py ile uyumlu)"""
-        # Kol alarmı kontrolü
-        if error_lsb == 9:
-            return self.get_arm_alarm_description(error_msb) is not None
-        # Batarya alarmı kontrolü
-        else:
-            return self.get_battery_alarm_description(error_msb, error_lsb) is not None
+        """Alarm geçerli mi kontrol et (ortak alarm kod tablosu)"""
+        return alarm_codes.is_valid_alarm(error_msb, error_lsb)
     
     def process_resolves(self):
-        """Bekleyen düzeltmeleri işle"""
+        """Bekleyen düzeltmeleri işle (index'te aktif alarmı olanlar tek UPDATE ile)"""
         try:
+            keys = []
             for resolve in self.pending_resolves:
-                arm = resolve['arm']
-                battery = resolve['battery']
+                key = (resolve['arm'], resolve['battery'])
+                if key in self.active_alarms:
+                    if key not in keys:
+                        keys.append(key)
+                else:
+                    print(f"⚠️ Düzeltilecek aktif alarm bulunamadı: Kol {key[0]}, Batarya {key[1]}")
+            
+            if not keys:
+                return
+            
+            resolved = self.db.resolve_active_alarms(keys)
+            if resolved is None:
+                print(f"❌ Alarm düzeltme hatası: {len(keys)} kol/batarya")
+                return
+            
+            for arm, battery in keys:
+                print(f"✅ {len(self.active_alarms.pop((arm, battery)))} alarm düzeltildi: Kol {arm}, Batarya {battery}")
                 
-                # Veritabanından aktif alarmları bul ve düzelt
-                with self.db.get_connection() as conn:
-                    cursor = conn.cursor()
-                    
-                    # Kol alarmı mı batarya alarmı mı kontrol et
-                    if battery == 0:  # Kol alarmı
-                        cursor.execute('''
-                            SELECT id FROM alarms 
-                            WHERE arm = ? AND battery = 0 AND status = 'active'
-                        ''', (arm,))
-                    else:  # Batarya alarmı
-                        cursor.execute('''
-                            SELECT id FROM alarms 
-                            WHERE arm = ? AND battery = ? AND status = 'active'
-                        ''', (arm, battery))
-                    
-                    alarm_ids = [row[0] for row in cursor.fetchall()]
-                    
-                    if alarm_ids:
-                        success = self.db.batch_resolve_alarms(alarm_ids)
-                        if success:
-                            print(f"✅ {len(alarm_ids)} alarm düzeltildi: Kol {arm}, Batarya {battery}")
-                        else:
-                            print(f"❌ Alarm düzeltme hatası: Kol {arm}, Batarya {battery}")
-                    else:
-                        print(f"⚠️ Düzeltilecek aktif alarm bulunamadı: Kol {arm}, Batarya {battery}")
-                        
         except Exception as e:
             print(f"❌ Düzeltme işleme hatası: {e}")
     
     def send_alarm_emails(self, alarms):
-        """Alarm maili gönder"""
+        """Alarm maili gönder (özet modu açıksa pencerede biriktir)"""
         try:
             # Mail alıcılarını al
             recipients = self.db.get_mail_recipients()
@@ -142,22 +159,32 @@ class AlarmProcessor:
             # Alarm verilerini işle ve seviyelerine göre grupla
             critical_alarms = []
             normal_alarms = []
+            window_seconds, critical_bypass = mail_sender.get_digest_settings()
             
             for alarm in alarms:
                 processed_alarm = self.process_alarm_for_email(alarm)
                 if processed_alarm:
-                    # Tüm alarmları normal olarak işle (kritiklik kaldırıldı)
-                    normal_alarms.append(processed_alarm)
+                    if window_seconds and critical_bypass and alarm_codes.is_critical(alarm['error_code_msb'], alarm['error_code_lsb']):
+                        critical_alarms.append(processed_alarm)
+                    else:
+                        normal_alarms.append(processed_alarm)
             
-            if not normal_alarms:
+            if not critical_alarms and not normal_alarms:
                 print("⚠️ İşlenecek alarm bulunamadı")
                 return
             
-            # Tüm alarmlar için mail gönder
+            # Kritik alarmlar özet penceresini beklemez
+            if critical_alarms:
+                send_alarm_notification(recipients, critical_alarms)
+                print(f"✅ {len(critical_alarms)} kritik alarm için mail gönderildi ({len(recipients)} alıcıya)")
+            
             if normal_alarms:
-                from mail_sender import send_alarm_notification
-                send_alarm_notification(recipients, normal_alarms)
-                print(f"✅ {len(normal_alarms)} alarm için mail gönderildi ({len(recipients)} alıcıya)")
+                if window_seconds:
+                    queue_alarm_digest(normal_alarms, window_seconds)
+                    print(f"📨 {len(normal_alarms)} alarm özet maile eklendi")
+                else:
+                    send_alarm_notification(recipients, normal_alarms)
+                    print(f"✅ {len(normal_alarms)} alarm için mail gönderildi ({len(recipients)} alıcıya)")
                 
         except Exception as e:
             print(f"❌ Mail gönderme hatası: {e}")
@@ -174,9 +201,12 @@ class AlarmProcessor:
             # Timestamp'i formatla
             formatted_time = datetime.fromtimestamp(timestamp / 1000).strftime('%d.%m.%Y %H:%M:%S')
             
-            # Alarm açıklaması oluştur
-            if error_lsb == 9:  # Kol alarmı
-                description = self.get_arm_alarm_description(error_msb)
+            # Alarm açıklaması oluştur (ortak alarm kod tablosu)
+            description = alarm_codes.get_description(error_msb, error_lsb)
+            if description is None:  # Geçersiz alarm
+                return None
+            
+            if alarm_codes.get_alarm_type(error_msb, error_lsb) == 'arm':  # Kol alarmı
                 return {
                     'type': 'arm',
                     'arm': arm,
@@ -185,17 +215,13 @@ class AlarmProcessor:
                     'timestamp': formatted_time
                 }
             else:  # Batarya alarmı
-                description = self.get_battery_alarm_description(error_msb, error_lsb)
-                if description:  # Geçerli alarm ise
-                    return {
-                        'type': 'battery',
-                        'arm': arm,
-                        'battery': str(battery - 2) if battery > 2 else '',
-                        'description': description,
-                        'timestamp': formatted_time
-                    }
-            
-            return None
+                return {
+                    'type': 'battery',
+                    'arm': arm,
+                    'battery': str(battery - 2) if battery > 2 else '',
+                    'description': description,
+                    'timestamp': formatted_time
+                }
             
         except Exception as e:
             print(f"❌ Alarm işleme hatası: {e}")
@@ -203,39 +229,11 @@ class AlarmProcessor:
     
     def get_arm_alarm_description(self, error_msb):
         """Kol alarm açıklaması"""
-        descriptions = {
-            0: "Kol alarmı düzeldi",
-            1: "Kol sıcaklık alarmı",
-            2: "Kol nem alarmı",
-            3: "Kol bağlantı hatası",
-            4: "Kol güç hatası"
-        }
-        return descriptions.get(error_msb, f"Bilinmeyen kol alarmı (Kod: {error_msb})")
+        return alarm_codes.get_description(error_msb, alarm_codes.ARM_ALARM_LSB)
     
     def get_battery_alarm_description(self, error_msb, error_lsb):
         """Batarya alarm açıklaması oluştur"""
-        description_parts = []
-        
-        # MSB kontrolü
-        if error_msb >= 1:
-            if error_msb == 1:
-                description_parts.append("Pozitif kutup başı alarmı")
-            elif error_msb == 2:
-                description_parts.append("Negatif kutup başı sıcaklık alarmı")
-        
-        # LSB kontrolü
-        if error_lsb == 4:
-            description_parts.append("Düşük batarya gerilim uyarısı")
-        elif error_lsb == 8:
-            description_parts.append("Düşük batarya gerilimi alarmı")
-        elif error_lsb == 16:
-            description_parts.append("Yüksek batarya gerilimi uyarısı")
-        elif error_lsb == 32:
-            return "Yüksek batarya gerilimi alarmı"
-        elif error_lsb == 64:
-            description_parts.append("Modül sıcaklık alarmı")
-        
-        return " + ".join(description_parts) if description_parts else None
+        return alarm_codes.get_description(error_msb, error_lsb)
 
 # Global alarm processor instance - main.py'de db instance'ı oluşturulduktan sonra set edilecek
 alarm_processor = None
@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+"""Statik dosya derleme: JS/CSS paketleme, küçültme, içerik hash'li adlar ve .gz/.br kopyalar
+
+Kullanım:
+    python3 asset_pipeline.py       # static/dist/ ve manifest.json üretir (Node gerekmez)
+
+Derlenmiş dosyalar /assets/<ad>.<hash>.<uzantı> adresinden 'immutable' olarak sunulur; içerik
+değişince adı da değiştiği için tarayıcı önbelleği hiç bayatlamaz. Derleme yoksa şablonlar
+static/ altındaki orijinal dosyaları kullanır.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(BASE_DIR, 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_PATH = os.path.join(DIST_DIR, 'manifest.json')
+URL_PREFIX = '/assets/'
+
+# Her sayfada yüklenen ortak paketler (sıra korunur); diğer static/js dosyaları sayfa başına ayrı paketlenir
+BUNDLES = {
+    'app.css': ['css/main.css', 'css/components.css'],
+    'app.js': ['js/translation.js', 'js/auth.js', 'js/main.js']
+}
+
+LOCALES = ['locales/tr.json', 'locales/en.json']
+
+_WORD = re.compile(r'[\w$]')
+_REGEX_KEYWORDS = {
+    'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void',
+    'throw', 'case', 'do', 'else', 'yield', 'await'
+}
+# Bu karakterlerden sonra gelen '/' bölme değil regex başlangıcıdır
+_REGEX_AFTER = set('(,=:[!&|?{};+-*%<>~^')
+# Bu karakterlerin çevresindeki boşluk anlamsızdır ('+', '-', '/' güvenlik için hariç)
+_JS_TIGHT = set('{}()[];,:=<>!&|?*%^~.')
+
+def _skip_string(source, i, quote):
+    """Tırnak içi metnin bittiği index (kaçış karakterleri dahil)"""
+    i += 1
+    while i < len(source):
+        if source[i] == '\\':
+            i += 2
+            continue
+        if source[i] == quote:
+            return i + 1
+        i += 1
+    return i
+
+def _skip_template(source, i):
+    """Template literal'ın bittiği index (${...} içindeki iç içe metin ve süslü parantezler dahil)"""
+    i += 1
+    while i < len(source):
+        char = source[i]
+        if char == '\\':
+            i += 2
+            continue
+        if char == '`':
+            return i + 1
+        if char == '$' and source.startswith('${', i):
+            depth = 1
+            i += 2
+            while i < len(source) and depth:
+                char = source[i]
+                if char in '\'"':
+                    i = _skip_string(source, i, char)
+                    continue
+                if char == '`':
+                    i = _skip_template(source, i)
+                    continue
+                if char == '{':
+                    depth += 1
+                elif char == '}':
+                    depth -= 1
+                i += 1
+            continue
+        i += 1
+    return i
+
+def _skip_regex(source, i):
+    """Regex literal'ın (bayraklar dahil) bittiği index"""
+    i += 1
+    in_class = False
+    while i < len(source):
+        char = source[i]
+        if char == '\\':
+            i += 2
+            continue
+        if char == '[':
+            in_class = True
+        elif char == ']':
+            in_class = False
+        elif char == '/' and not in_class:
+            i += 1
+            break
+        elif char == '\n':
+            break  # Geçersiz regex, olduğu gibi bırak
+        i += 1
+    while i < len(source) and _WORD.match(source[i]):
+        i += 1
+    return i
+
+def _regex_allowed(out):
+    """Çıktının sonuna göre '/' regex başlatır mı (bölme operatörü değilse)"""
+    text = ''.join(out[-32:]).rstrip()
+    if not text or text[-1] in _REGEX_AFTER:
+        return True
+    match = re.search(r'[A-Za-z_$][\w$]*$', text)
+    return bool(match) and match.group(0) in _REGEX_KEYWORDS
+
+def minify_js(source):
+    """Yorumları ve gereksiz boşlukları at; satır sonları korunur (otomatik noktalı virgül güvenli)"""
+    out = []
+    i = 0
+    length = len(source)
+    while i < length:
+        char = source[i]
+        if char in '\'"':
+            end = _skip_string(source, i, char)
+            out.append(source[i:end])
+            i = end
+        elif char == '`':
+            end = _skip_template(source, i)
+            out.append(source[i:end])
+            i = end
+        elif char == '/' and source.startswith('//', i):
+            end = source.find('\n', i)
+            i = length if end == -1 else end
+        elif char == '/' and source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            end = length if end == -1 else end + 2
+            out.append('\n' if '\n' in source[i:end] else ' ')
+            i = end
+        elif char == '/' and _regex_allowed(out):
+            end = _skip_regex(source, i)
+            out.append(source[i:end])
+            i = end
+        elif char.isspace():
+            end = i
+            while end < length and source[end].isspace():
+                end += 1
+            newline = '\n' in source[i:end]
+            while out and out[-1] in (' ', '\n'):
+                newline = newline or out[-1] == '\n'
+                out.pop()
+            if out:
+                prev = out[-1][-1]
+                nxt = source[end] if end < length else ''
+                if newline:
+                    out.append('\n')
+                elif nxt and prev not in _JS_TIGHT and nxt not in _JS_TIGHT:
+                    out.append(' ')
+            i = end
+        else:
+            out.append(char)
+            i += 1
+    return ''.join(out).strip() + '\n'
+
+def minify_css(source):
+    """Yorumları at, boşlukları daralt (seçicilerdeki anlamlı boşluklar korunur)"""
+    out = []
+    i = 0
+    length = len(source)
+    while i < length:
+        char = source[i]
+        if char in '\'"':
+            end = _skip_string(source, i, char)
+            out.append(source[i:end])
+            i = end
+        elif source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = length if end == -1 else end + 2
+        elif char.isspace():
+            while i < length and source[i].isspace():
+                i += 1
+            if out and out[-1][-1] not in '{};,>:' and i < length and source[i] not in '{};,>':
+                out.append(' ')
+        else:
+            if char in '{};,>' and out and out[-1] == ' ':
+                out.pop()
+            if char == '}' and out and out[-1] == ';':
+                out.pop()
+            out.append(char)
+            i += 1
+    return ''.join(out).strip()
+
+def _read(relative_path):
+    with open(os.path.join(STATIC_DIR, relative_path), 'r', encoding='utf-8') as f:
+        return f.read()
+
+def _write_asset(name, content, written):
+    """İçerik hash'li dosyayı ve sıkıştırılmış kopyalarını yaz, URL'sini döndür"""
+    data = content.encode('utf-8')
+    stem, ext = os.path.splitext(name)
+    filename = f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+    path = os.path.join(DIST_DIR, filename)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    variants = [(path, data), (path + '.gz', gzip.compress(data, 9, mtime=0))]
+    if brotli is not None:
+        variants.append((path + '.br', brotli.compress(data, quality=11)))
+    for variant_path, variant_data in variants:
+        with open(variant_path, 'wb') as f:
+            f.write(variant_data)
+        written.add(os.path.relpath(variant_path, DIST_DIR))
+    return URL_PREFIX + filename
+
+def sources(name):
+    """Paket adının kaynak dosyaları (derleme yokken şablonlar bunları tek tek yükler)"""
+    return BUNDLES.get(name, [name])
+
+def _page_scripts():
+    bundled = {path for paths in BUNDLES.values() for path in paths}
+    return sorted(
+        f"js/{filename}" for filename in os.listdir(os.path.join(STATIC_DIR, 'js'))
+        if filename.endswith('.js') and f"js/{filename}" not in bundled
+    )
+
+def build():
+    """Tüm paketleri derle, manifest'i yaz ve önceki iki derlemede olmayan dosyaları sil"""
+    previous = load_manifest()
+    written = set()
+    manifest = {}
+
+    for name, paths in BUNDLES.items():
+        if name.endswith('.css'):
+            content = '\n'.join(minify_css(_read(path)) for path in paths)
+        else:
+            # Dosyalar ayrı <script> gibi çalışsın: noktalı virgülsüz bitenler birleşmesin
+            content = ';\n'.join(minify_js(_read(path)) for path in paths)
+        manifest[name] = _write_asset(name, content, written)
+
+    for path in _page_scripts():
+        manifest[path] = _write_asset(path, minify_js(_read(path)), written)
+
+    for path in LOCALES:
+        data = json.loads(_read(path))
+        manifest[path] = _write_asset(path, json.dumps(data, ensure_ascii=False, separators=(',', ':')), written)
+
+    # Çalışan sunucu eski manifest'le sayfa vermiş olabilir: bir önceki derlemenin dosyaları kalır
+    keep = set(written)
+    for url in previous.values():
+        relative = url[len(URL_PREFIX):]
+        keep.update({relative, relative + '.gz', relative + '.br'})
+    for root, _, filenames in os.walk(DIST_DIR):
+        for filename in filenames:
+            relative = os.path.relpath(os.path.join(root, filename), DIST_DIR)
+            if relative != 'manifest.json' and relative not in keep:
+                os.remove(os.path.join(root, filename))
+
+    tmp_path = MANIFEST_PATH + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, MANIFEST_PATH)
+    return manifest
+
+_manifest_cache = {'mtime': None, 'data': {}}
+
+def load_manifest(path=MANIFEST_PATH):
+    """Derleme manifest'i (paket adı -> URL); dosya değişince yeniden okunur, yoksa boş"""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return {}
+    if mtime != _manifest_cache['mtime']:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                _manifest_cache['data'] = json.load(f)
+            _manifest_cache['mtime'] = mtime
+        except (OSError, ValueError) as e:
+            print(f"❌ Asset manifest okunamadı: {e}")
+            return {}
+    return _manifest_cache['data']
+
+if __name__ == '__main__':
+    if brotli is None:
+        print("⚠️ brotli kurulu değil (pip install brotli), sadece .gz kopyalar üretilecek")
+    result = build()
+    total = 0
+    for name, url in result.items():
+        size = os.path.getsize(os.path.join(DIST_DIR, url[len(URL_PREFIX):]))
+        total += size
+    print(f"✅ {len(result)} paket derlendi ({total // 1024} KB, küçültülmüş): {DIST_DIR}")
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""web_app okuma yolu eşzamanlılık ölçümü (20 paralel istemci, karışık endpoint'ler)
+
+Kullanım:
+    # Çalışan web_app'e karşı HTTP ölçümü (önce/sonra iki sürümde ayrı ayrı çalıştırılır)
+    python3 bench_web_concurrency.py --url http://127.0.0.1:80 --clients 20 --duration 30
+
+    # web_app'in kullandığı veritabanı okumaları, eski global kilitle ve kilitsiz karşılaştırmalı
+    python3 bench_web_concurrency.py --db /tmp/bench.db --seed 200000 --clients 20 --duration 15
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.request
+
+# (metod, yol, JSON gövde) - panelin gerçek yoklama karışımı
+HTTP_REQUESTS = (
+    ('GET', '/api/summary', None),
+    ('GET', '/api/active-arms', None),
+    ('GET', '/api/alarm_count', None),
+    ('GET', '/api/batconfigs', None),
+    ('GET', '/api/armconfigs', None),
+    ('GET', '/api/alarms?page=1&pageSize=50&show_resolved=false', None),
+    ('POST', '/api/batteries', {'page': 1, 'pageSize': 30, 'selectedArm': 3}),
+    ('POST', '/api/battery-logs', {'page': 1, 'pageSize': 50, 'filters': {}}),
+    ('POST', '/api/arm-logs', {'page': 1, 'pageSize': 50, 'filters': {}}),
+)
+
+# web_app endpoint'lerinin çağırdığı veritabanı okumaları
+DB_READS = (
+    ('summary', lambda db: db.get_summary_data()),
+    ('active-arms', lambda db: db.get_active_arms()),
+    ('batconfigs', lambda db: db.get_batconfigs()),
+    ('alarms', lambda db: db.get_paginated_alarms(show_resolved=False, page=1, page_size=50)),
+    ('batteries', lambda db: db.get_batteries_for_display(1, 30, 3, 'tr')),
+    ('battery-logs', lambda db: db.get_grouped_battery_logs(page=1, page_size=50, filters={})),
+    ('arm-logs', lambda db: db.get_grouped_arm_logs(page=1, page_size=50, filters={})),
+)
+
+def http_call(base_url, method, path, body, timeout=30):
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    request = urllib.request.Request(base_url.rstrip('/') + path, data=data, method=method)
+    request.add_header('Content-Type', 'application/json')
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        response.read()
+
+def run_clients(clients, duration, call):
+    """clients adet thread'i duration saniye boyunca çalıştır, gecikmeleri (ms) ve hata sayısını topla"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(seed):
+        rng = random.Random(seed)
+        local = []
+        local_errors = 0
+        while time.monotonic() < deadline:
+            started = time.monotonic()
+            try:
+                call(rng)
+            except Exception:
+                local_errors += 1
+            local.append((time.monotonic() - started) * 1000)
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0], time.monotonic() - started
+
+def report(label, latencies, errors, elapsed):
+    latencies.sort()
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] if latencies else 0.0
+    print(f"{label:<12} {len(latencies):>7} istek  {len(latencies) / elapsed:>8.1f} istek/s  "
+          f"p50 {percentile(0.50):>7.1f} ms  p95 {percentile(0.95):>7.1f} ms  "
+          f"p99 {percentile(0.99):>7.1f} ms  hata {errors}")
+    return len(latencies) / elapsed
+
+def seed_database(db, rows):
+    """Ölçüm için sentetik batarya verisi ekle (3. kol, 7 batarya, 4 dtype)"""
+    now = int(time.time() * 1000)
+    batch = []
+    step = 0
+    while len(batch) < rows:
+        timestamp = now - (rows // 28 - step) * 60000
+        for k in range(3, 10):
+            for dtype, value in ((10, 12.5), (11, 98.0), (12, 25.0), (126, 80.0)):
+                batch.append({'Arm': 3, 'k': k, 'Dtype': dtype, 'data': value + random.random(), 'timestamp': timestamp})
+        step += 1
+        if len(batch) >= 5000:
+            db.insert_battery_data_batch(batch)
+            rows -= len(batch)
+            batch = []
+    if batch:
+        db.insert_battery_data_batch(batch)
+
+def bench_http(args):
+    def call(rng):
+        method, path, body = rng.choice(HTTP_REQUESTS)
+        http_call(args.url, method, path, body)
+    print(f"🔄 {args.url} - {args.clients} istemci, {args.duration}s")
+    report('http', *run_clients(args.clients, args.duration, call))
+
+def bench_db(args):
+    from database import BatteryDatabase
+    db = BatteryDatabase(args.db)
+    if args.seed:
+        print(f"🔄 {args.seed} satır sentetik veri ekleniyor...")
+        seed_database(db, args.seed)
+
+    global_lock = threading.RLock()  # Eski web_app'teki db_read_lock davranışı
+
+    def serialized(rng):
+        _, read = rng.choice(DB_READS)
+        with global_lock:
+            read(db)
+
+    def concurrent(rng):
+        _, read = rng.choice(DB_READS)
+        read(db)
+
+    print(f"🔄 {args.db} - {args.clients} istemci, {args.duration}s, {db.read_connections} okuyucu connection")
+    before = report('global kilit', *run_clients(args.clients, args.duration, serialized))
+    after = report('kilitsiz', *run_clients(args.clients, args.duration, concurrent))
+    print(f"✅ Verim oranı: {after / before:.2f}x" if before else "⚠️ Ölçüm yapılamadı")
+
+def main():
+    parser = argparse.ArgumentParser(description='web_app okuma yolu eşzamanlılık ölçümü')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--url', help='Çalışan web_app adresi (HTTP ölçümü)')
+    target.add_argument('--db', help='Veritabanı dosyası (kilitli/kilitsiz okuma karşılaştırması)')
+    parser.add_argument('--clients', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=15)
+    parser.add_argument('--seed', type=int, default=0, help='--db ile: eklenecek sentetik satır sayısı')
+    args = parser.parse_args()
+
+    if args.url:
+        bench_http(args)
+    else:
+        bench_db(args)
+
+if __name__ == '__main__':
+    main()
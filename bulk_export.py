@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+
+import csv
+import gzip
+import io
+import os
+from datetime import datetime
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Kolon adı -> NumPy tipi (analiz tarafı bu isimlerle okur)
+COLUMNS = (
+    ('timestamp', 'int64'),  # ms epoch
+    ('arm', 'uint8'),
+    ('k', 'uint8'),
+    ('dtype', 'uint8'),
+    ('value', 'float32')
+)
+
+FORMATS = ('npz', 'csv.gz')
+
+class BulkExporter:
+    """battery_data'yı ay ay kolon bazlı (NPZ / CSV.gz) dışa aktar"""
+
+    def __init__(self, db, fetch_rows=10000):
+        self.db = db
+        self.fetch_rows = fetch_rows
+
+    @staticmethod
+    def parse_month(value):
+        """YYYY-MM -> (yıl, ay)"""
+        try:
+            parsed = datetime.strptime(value, '%Y-%m')
+        except (TypeError, ValueError):
+            raise ValueError(f"Geçersiz ay: {value} (beklenen format: YYYY-MM)")
+        return parsed.year, parsed.month
+
+    def _month_bounds(self, year, month):
+        """Ayın [başlangıç, bitiş) ms aralığı"""
+        _, _, start_ms, end_ms = self.db._partition_info(year, month)
+        return start_ms, end_ms
+
+    def available_months(self):
+        """Veri bulunan ayları (eskiden yeniye) listele"""
+        with self.db.get_read_connection() as conn:
+            first_ts, last_ts = self.db.battery_data_bounds(conn)
+
+        if first_ts is None:
+            return []
+
+        first = datetime.fromtimestamp(first_ts / 1000)
+        last = datetime.fromtimestamp(last_ts / 1000)
+        months = []
+        year, month = first.year, first.month
+        while (year, month) <= (last.year, last.month):
+            months.append(f'{year:04d}-{month:02d}')
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return months
+
+    def _estimated_rows(self, cursor, start_ms, end_ms, arm=None):
+        """Ön ayırma kapasitesi için rollup'tan okuma sayısı"""
+        return self.db._approximate_reading_count(cursor, '1=1', None, arm, None, start_ms, end_ms - 1)
+
+    def _iter_month_rows(self, year, month, arm=None):
+        """Ayın ham satırlarını fetchmany chunk'ları halinde üret: (timestamp, arm, k, dtype, data)"""
+        start_ms, end_ms = self._month_bounds(year, month)
+        # NULL değerler atlanır (rollup'larla aynı): float32 diziye yazılamaz, NPZ ve CSV.gz aynı satırları içerir
+        query = ("SELECT timestamp, arm, k, dtype, data FROM battery_data "
+                 "WHERE timestamp >= ? AND timestamp < ? AND data IS NOT NULL")
+        params = [start_ms, end_ms]
+        if arm:
+            query += " AND arm = ?"
+            params.append(arm)
+        query += " ORDER BY timestamp"
+
+        with self.db.get_read_connection() as conn:
+            cursor = conn.cursor()
+            yield self._estimated_rows(cursor, start_ms, end_ms, arm)
+            cursor.execute(self.db.route_battery_data(conn, query, start_ms, end_ms - 1), params)
+            while True:
+                rows = cursor.fetchmany(self.fetch_rows)
+                if not rows:
+                    break
+                yield rows
+
+    def read_month_arrays(self, year, month, arm=None):
+        """Ayın verisini ön ayrılmış NumPy dizilerine oku (kolon adı -> dizi)"""
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("NPZ export için numpy kurulu olmalı (pip install numpy)")
+
+        chunks = self._iter_month_rows(year, month, arm)
+        capacity = max(next(chunks), self.fetch_rows)
+        arrays = {name: np.empty(capacity, dtype=dtype) for name, dtype in COLUMNS}
+
+        size = 0
+        for rows in chunks:
+            count = len(rows)
+            if size + count > capacity:
+                # Rollup eksik/eski ise kapasiteyi ikiye katla
+                capacity = max(capacity * 2, size + count)
+                for name in arrays:
+                    arrays[name] = np.resize(arrays[name], capacity)
+            for (name, _), column in zip(COLUMNS, zip(*rows)):
+                arrays[name][size:size + count] = column
+            size += count
+
+        return {name: array[:size] for name, array in arrays.items()}
+
+    def write_npz(self, fileobj, year, month, arm=None):
+        """Ayın verisini sıkıştırılmış .npz olarak yaz, satır sayısını döndür"""
+        arrays = self.read_month_arrays(year, month, arm)
+        np.savez_compressed(fileobj, **arrays)
+        return len(arrays['timestamp'])
+
+    def iter_csv_chunks(self, year, month, arm=None, header=True):
+        """Ayın verisini ham kolonlarla CSV metin parçaları halinde üret"""
+        chunks = self._iter_month_rows(year, month, arm)
+        next(chunks)  # Kapasite tahmini CSV için gerekmiyor
+        if header:
+            yield ','.join(name for name, _ in COLUMNS) + '\n'
+        for rows in chunks:
+            buffer = io.StringIO()
+            csv.writer(buffer, lineterminator='\n').writerows(rows)
+            yield buffer.getvalue()
+
+    def write_csv_gz(self, path, year, month, arm=None):
+        """Ayın verisini .csv.gz dosyasına yaz, satır sayısını döndür"""
+        rows = 0
+        with gzip.open(path, 'wt', encoding='utf-8', compresslevel=6) as output:
+            for chunk in self.iter_csv_chunks(year, month, arm):
+                output.write(chunk)
+                rows += chunk.count('\n')
+        return rows - 1  # Başlık satırı hariç
+
+    def export_range(self, output_dir, fmt='npz', start_month=None, end_month=None, arm=None):
+        """Aralıktaki her ay için ayrı dosya yaz, [(dosya yolu, satır sayısı)] döndür"""
+        if fmt not in FORMATS:
+            raise ValueError(f"Geçersiz format: {fmt} ({'/'.join(FORMATS)})")
+        if fmt == 'npz' and not NUMPY_AVAILABLE:
+            raise RuntimeError("NPZ export için numpy kurulu olmalı (pip install numpy)")
+
+        os.makedirs(output_dir, exist_ok=True)
+        written = []
+        for month_label in self.available_months():
+            if start_month and month_label < start_month:
+                continue
+            if end_month and month_label > end_month:
+                continue
+            year, month = self.parse_month(month_label)
+            path = os.path.join(output_dir, f"battery_data_{year:04d}_{month:02d}{'_arm' + str(arm) if arm else ''}.{fmt}")
+            if fmt == 'npz':
+                with open(path, 'wb') as output:
+                    rows = self.write_npz(output, year, month, arm)
+            else:
+                rows = self.write_csv_gz(path, year, month, arm)
+            size_mb = os.path.getsize(path) / (1024 * 1024)
+            print(f"✓ {month_label}: {rows} satır -> {path} ({size_mb:.2f} MB)")
+            written.append((path, rows))
+        return written
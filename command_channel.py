@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import socket
+import threading
+import time
+
+# web_app -> main.py komut kanalı (Unix domain socket, satır başına bir JSON mesaj)
+SOCKET_PATH = os.environ.get('COMMAND_SOCKET_PATH', '/tmp/battery_monitor_commands.sock')
+
+# Socket'e ulaşılamazsa (main.py eski sürüm / kapalı) kullanılan uyumluluk dosyası
+FALLBACK_FILE = 'pending_config.json'
+
+COMMAND_TYPES = (
+    'batconfig',
+    'armconfig',
+    'send_to_device',
+    'manual_set',
+    'command',
+    'dataget',
+    'data_retrieval_start',
+    'data_retrieval_stop',
+    'reload_trap_targets'
+)
+
+MAX_MESSAGE_BYTES = 64 * 1024
+
+def _read_line(conn):
+    """Bağlantıdan tek bir satır (mesaj) oku"""
+    buffer = b''
+    while not buffer.endswith(b'\n'):
+        chunk = conn.recv(4096)
+        if not chunk:
+            break
+        buffer += chunk
+        if len(buffer) > MAX_MESSAGE_BYTES:
+            raise ValueError("Komut mesajı çok büyük")
+    return buffer.decode('utf-8')
+
+def _send_json(conn, data):
+    conn.sendall((json.dumps(data, ensure_ascii=False) + '\n').encode('utf-8'))
+
+class CommandServer:
+    """main.py tarafı: komutları socket'ten alıp sırayla işler, işlendikten sonra onay döner"""
+
+    def __init__(self, handler, path=SOCKET_PATH):
+        self.handler = handler
+        self.path = path
+        self._sock = None
+        self._thread = None
+
+    def start(self):
+        """Socket'i aç ve dinleme thread'ini başlat"""
+        if os.path.exists(self.path):
+            os.remove(self.path)  # Önceki çalışmadan kalan socket dosyası
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.bind(self.path)
+        os.chmod(self.path, 0o660)
+        self._sock.listen(16)
+        self._thread = threading.Thread(target=self._serve, name='command-channel', daemon=True)
+        self._thread.start()
+        print(f"✓ Komut kanalı dinleniyor: {self.path}")
+
+    def _serve(self):
+        """Bağlantıları tek tek işle (komut sırası korunur)"""
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                break  # Socket kapatıldı
+            with conn:
+                try:
+                    conn.settimeout(5)
+                    self._handle_connection(conn)
+                except Exception as e:
+                    print(f"❌ Komut kanalı bağlantı hatası: {e}")
+
+    def _handle_connection(self, conn):
+        message = json.loads(_read_line(conn))
+        command_id = message.get('id')
+        if message.get('type') not in COMMAND_TYPES:
+            _send_json(conn, {'ok': False, 'id': command_id, 'error': f"Bilinmeyen komut tipi: {message.get('type')}"})
+            return
+        try:
+            self.handler(message)
+            _send_json(conn, {'ok': True, 'id': command_id})
+        except Exception as e:
+            print(f"❌ Komut işlenirken hata ({message.get('type')}): {e}")
+            _send_json(conn, {'ok': False, 'id': command_id, 'error': str(e)})
+
+    def stop(self):
+        """Socket'i kapat ve dosyasını sil"""
+        if self._sock:
+            self._sock.close()
+            self._sock = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+def write_fallback(message, path=FALLBACK_FILE):
+    """Komutu uyumluluk dosyasına ekle (önceki bekleyen komutların üzerine yazmaz)"""
+    pending = []
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                existing = json.load(f)
+            pending = existing if isinstance(existing, list) else [existing]
+        except (OSError, ValueError):
+            pending = []
+    pending.append(message)
+
+    # Tek komut eski formatta (sözlük) yazılır, eski main.py sürümleri de okuyabilir
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(pending if len(pending) > 1 else message, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def read_fallback(path=FALLBACK_FILE):
+    """Uyumluluk dosyasındaki komutları al ve dosyayı sil (tek komut veya liste)"""
+    if not os.path.exists(path):
+        return []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    finally:
+        os.remove(path)
+    return data if isinstance(data, list) else [data]
+
+def send_command(message, timeout=5.0, path=SOCKET_PATH):
+    """Komutu main.py'ye gönder ve onayı döndür: {'ok': bool, 'id', 'error'?, 'queued'?}
+
+    Socket yoksa komut uyumluluk dosyasına yazılır ('queued': True). Zaman aşımında
+    komut iletilmiş olabileceği için dosyaya tekrar yazılmaz.
+    """
+    if message.get('type') not in COMMAND_TYPES:
+        raise ValueError(f"Bilinmeyen komut tipi: {message.get('type')}")
+    message.setdefault('timestamp', int(time.time() * 1000))
+    message.setdefault('id', f"{os.getpid()}-{time.monotonic_ns()}")
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.settimeout(timeout)
+            conn.connect(path)
+            _send_json(conn, message)
+            reply = _read_line(conn)
+        return json.loads(reply) if reply else {'ok': False, 'id': message['id'], 'error': 'Boş yanıt'}
+    except socket.timeout:
+        print(f"⚠️ Komut onayı zaman aşımına uğradı: {message['type']}")
+        return {'ok': False, 'id': message['id'], 'error': 'Komut onayı zaman aşımına uğradı'}
+    except (FileNotFoundError, ConnectionRefusedError):
+        write_fallback(message)
+        print(f"⚠️ Komut kanalı yok, komut {FALLBACK_FILE} dosyasına yazıldı: {message['type']}")
+        return {'ok': True, 'id': message['id'], 'queued': True}
@@ -2,11 +2,17 @@
 import sqlite3
 import threading
 import os
+import re
+import json
+import base64
 from datetime import datetime, timedelta
 import time
 import queue
 from contextlib import contextmanager
 
+import alarm_codes
+import downsampling
+
 # Migration'ın sadece bir kez çalışması için modül seviyesi kontrol
 _migration_lock = threading.Lock()
 _migrated_databases = set()  # Migration'dan geçen veritabanları
@@ -29,8 +35,139 @@ def get_default_db_path():
     
     return desktop_db
 
+def encode_page_cursor(direction, key):
+    """Keyset sayfalama anahtarını opak cursor metnine çevir"""
+    payload = json.dumps({'d': direction, 'k': list(key)}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_page_cursor(cursor):
+    """Opak cursor'dan (yön, anahtar) çöz - cursor yoksa ilk sayfa ('next', None)"""
+    if not cursor:
+        return 'next', None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        direction, key = payload['d'], payload['k']
+        if direction not in ('next', 'prev') or not isinstance(key, list) or not key:
+            raise ValueError
+        if not all(isinstance(value, (int, float)) for value in key):
+            raise ValueError
+        return direction, key
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Geçersiz sayfalama cursor'ı")
+
+class PartitionRangeError(ValueError):
+    """Sorgu tek connection'a eklenebilecekten (ATTACH sınırı) fazla aylık partition gerektiriyor"""
+
+def is_partitioning_enabled():
+    """Aylık bölümleme (partition) açık mı - BATTERY_DB_PARTITIONED environment variable'ından"""
+    return os.environ.get('BATTERY_DB_PARTITIONED', '').lower() in ('1', 'true', 'yes', 'on')
+
+class _ConnectionPool:
+    """Sabit boyutlu connection havuzu - dış kilit yok, aynı thread iç içe alırsa aynı connection döner"""
+    
+    def __init__(self, name, size, factory, wait_timeout=30.0, overflow=True):
+        self.name = name
+        self.size = size
+        self.wait_timeout = wait_timeout
+        self.overflow = overflow  # False: havuz dolunca ikinci connection açılmaz (tek yazıcı)
+        self._factory = factory
+        self._queue = queue.Queue(maxsize=size)
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()  # Sadece sayaç güncellemesi için, bekleme sırasında tutulmaz
+        self._borrows = 0
+        self._waits = 0
+        self._wait_ms_total = 0.0
+        self._wait_ms_max = 0.0
+        self._overflows = 0
+        for _ in range(size):
+            self._queue.put(factory())
+    
+    @contextmanager
+    def borrow(self):
+        """Havuzdan connection ödünç al (boşsa wait_timeout kadar bekle, sonra geçici connection aç veya hata ver)"""
+        held = getattr(self._local, 'conn', None)
+        if held is not None:
+            # Aynı thread içinde iç içe çağrı (ör. export içinden get_latest_battery_data)
+            yield held
+            return
+        
+        wait_ms = 0.0
+        overflow = False
+        try:
+            conn = self._queue.get_nowait()
+        except queue.Empty:
+            started = time.monotonic()
+            try:
+                conn = self._queue.get(timeout=self.wait_timeout)
+            except queue.Empty:
+                if not self.overflow:
+                    # İkinci yazıcı aynı kilidi bekleyip "database is locked" ile düşerdi
+                    raise sqlite3.OperationalError(f"{self.name} havuzu {self.wait_timeout}s içinde boşalmadı")
+                print(f"⚠️ {self.name} havuzu {self.wait_timeout}s içinde boşalmadı, geçici connection açılıyor")
+                conn = self._factory()
+                overflow = True
+            wait_ms = (time.monotonic() - started) * 1000
+        
+        with self._stats_lock:
+            self._borrows += 1
+            if wait_ms:
+                self._waits += 1
+                self._wait_ms_total += wait_ms
+                self._wait_ms_max = max(self._wait_ms_max, wait_ms)
+            if overflow:
+                self._overflows += 1
+        
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            if conn.in_transaction:
+                # Yarıda kalan transaction sonraki ödünç alana (ve yazıcı kilidine) taşınmasın
+                try:
+                    conn.rollback()
+                except sqlite3.Error as e:
+                    print(f"⚠️ {self.name} connection rollback hatası: {e}")
+            if overflow:
+                conn.close()
+            else:
+                self._queue.put(conn)
+    
+    def for_each_idle(self, fn):
+        """Boştaki ve bu thread'in tuttuğu connection'lara fn uygula (diğer thread'lerdekiler atlanır)"""
+        held = getattr(self._local, 'conn', None)
+        if held is not None:
+            fn(held)
+        
+        idle = []
+        try:
+            while True:
+                idle.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        try:
+            for conn in idle:
+                fn(conn)
+        finally:
+            for conn in idle:
+                self._queue.put(conn)
+    
+    def stats(self):
+        """Havuz metrikleri"""
+        with self._stats_lock:
+            return {
+                'size': self.size,
+                'available': self._queue.qsize(),
+                'borrows': self._borrows,
+                'waits': self._waits,
+                'wait_ms_avg': round(self._wait_ms_total / self._waits, 2) if self._waits else 0.0,
+                'wait_ms_max': round(self._wait_ms_max, 2),
+                'overflows': self._overflows
+            }
+
 class BatteryDatabase:
-    def __init__(self, db_path=None, max_connections=20):
+    def __init__(self, db_path=None, read_connections=None, partitioned=None):
         # Eğer db_path verilmemişse, default yolu kullan
         if db_path is None:
             db_path = get_default_db_path()
@@ -42,9 +179,15 @@ class BatteryDatabase:
             print(f"Veritabanı dizini oluşturuldu: {db_dir}")
         
         self.db_path = db_path
+        # Ham veri aylık dosyalara (battery_data_YYYY_MM.db) yazılsın mı
+        self.partitioned = is_partitioning_enabled() if partitioned is None else partitioned
+        # (id(connection), schema) -> ATTACH anındaki (st_dev, st_ino): silinip yeniden oluşan dosyayı ayırt eder
+        self._attached_files = {}
         self.lock = threading.Lock()
-        self.connection_pool = queue.Queue(maxsize=max_connections)
-        self.max_connections = max_connections
+        # Okuyucu sayısı: BATTERY_DB_READERS veya 3 (tek yazıcı her zaman vardır)
+        if read_connections is None:
+            read_connections = int(os.environ.get('BATTERY_DB_READERS', '3') or 3)
+        self.read_connections = max(1, read_connections)
         self._create_connections()
         # Veritabanı yoksa oluştur, varsa sadece bağlan
         if not os.path.exists(self.db_path):
@@ -74,64 +217,80 @@ class BatteryDatabase:
                     # Migration zaten yapılmış, sadece bağlan
                     pass  # Sessizce devam et
     
-    def _create_connections(self):
-        """Connection pool oluştur - thread-safe ve performanslı"""
-        for _ in range(self.max_connections):
-            conn = sqlite3.connect(
-                self.db_path, 
-                timeout=60.0,  # Daha uzun timeout
-                check_same_thread=False  # Thread-safe için
-            )
-            # Performans ve concurrency optimizasyonları
+    def _memory_budget_bytes(self):
+        """Bu instance'ın SQLite bellek bütçesi (BATTERY_DB_MEMORY_BUDGET_MB veya toplam RAM'in 1/32'si)"""
+        env_budget = os.environ.get('BATTERY_DB_MEMORY_BUDGET_MB')
+        if env_budget:
+            try:
+                return max(4, int(float(env_budget))) * 1024 * 1024
+            except ValueError:
+                print(f"⚠️ Geçersiz BATTERY_DB_MEMORY_BUDGET_MB: {env_budget}, RAM'den hesaplanacak")
+        
+        total_ram = 1024 * 1024 * 1024  # Okunamazsa 1 GB varsay
+        try:
+            with open('/proc/meminfo') as f:
+                for line in f:
+                    if line.startswith('MemTotal:'):
+                        total_ram = int(line.split()[1]) * 1024
+                        break
+        except (OSError, ValueError, IndexError):
+            try:
+                total_ram = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+            except (ValueError, OSError, AttributeError):
+                pass
+        
+        # main.py, web_app.py ve mail_sender.py ayrı instance açar; 1 GB Pi'de ~32 MB/instance
+        return min(max(total_ram // 32, 8 * 1024 * 1024), 256 * 1024 * 1024)
+    
+    def _open_connection(self, read_only=False):
+        """Bütçeye göre ayarlanmış yeni SQLite connection aç"""
+        conn = sqlite3.connect(
+            self.db_path, 
+            timeout=60.0,  # Daha uzun timeout
+            check_same_thread=False  # Thread-safe için
+        )
+        # Performans ve concurrency optimizasyonları
+        if not read_only:
             conn.execute("PRAGMA journal_mode=WAL")  # WAL mode for better concurrency
-            conn.execute("PRAGMA synchronous=NORMAL")  # Faster writes
-            conn.execute("PRAGMA cache_size=50000")  # Çok daha büyük cache
-            conn.execute("PRAGMA temp_store=MEMORY")  # Temp tabloları memory'de
-            conn.execute("PRAGMA mmap_size=268435456")  # 256MB mmap
             conn.execute("PRAGMA page_size=4096")  # 4KB page size
             conn.execute("PRAGMA auto_vacuum=INCREMENTAL")  # Incremental vacuum
-            conn.execute("PRAGMA foreign_keys=ON")  # Foreign key constraints
-            conn.execute("PRAGMA busy_timeout=30000")  # 30 saniye busy timeout
-            self.connection_pool.put(conn)
+        conn.execute("PRAGMA synchronous=NORMAL")  # Faster writes
+        conn.execute(f"PRAGMA cache_size=-{self.cache_size_kib}")  # Negatif değer: KiB cinsinden
+        conn.execute("PRAGMA temp_store=MEMORY")  # Temp tabloları memory'de
+        conn.execute(f"PRAGMA mmap_size={self.mmap_size}")  # Dosya sayfaları connection'lar arasında paylaşılır
+        conn.execute("PRAGMA foreign_keys=ON")  # Foreign key constraints
+        conn.execute("PRAGMA busy_timeout=30000")  # 30 saniye busy timeout
+        if read_only:
+            conn.execute("PRAGMA query_only=ON")  # Okuyucu asla yazamaz
+        return conn
     
-    @contextmanager
-    def get_connection(self):
-        """Connection pool'dan connection al - thread-safe ve güçlü"""
-        conn = None
-        retry_count = 0
-        max_retries = 3
+    def _create_connections(self):
+        """Tek yazıcı + birkaç query_only okuyucu connection havuzu oluştur (bellek bütçesine göre)"""
+        budget = self.memory_budget = self._memory_budget_bytes()
+        # Bütçenin yarısı connection başına page cache, yarısı paylaşılan mmap
+        self.cache_size_kib = max(1024, budget // 2 // (1 + self.read_connections) // 1024)
+        self.mmap_size = budget // 2
         
-        while retry_count < max_retries:
-            try:
-                with self.lock:  # Thread-safe access
-                    conn = self.connection_pool.get(timeout=10.0)  # Daha uzun timeout
-                yield conn
-                break
-            except queue.Empty:
-                retry_count += 1
-                if retry_count >= max_retries:
-                    print(f"❌ Connection pool timeout after {max_retries} retries")
-                    # Yeni connection oluştur
-                    conn = sqlite3.connect(
-                        self.db_path, 
-                        timeout=30.0,
-                        check_same_thread=False
-                    )
-                    conn.execute("PRAGMA journal_mode=WAL")
-                    conn.execute("PRAGMA synchronous=NORMAL")
-                    conn.execute("PRAGMA cache_size=50000")
-                    yield conn
-                else:
-                    print(f"⚠️ Connection pool timeout, retry {retry_count}/{max_retries}")
-                    time.sleep(0.1)  # Kısa bekleme
-            finally:
-                if conn:
-                    try:
-                        with self.lock:  # Thread-safe return
-                            self.connection_pool.put(conn)
-                    except queue.Full:
-                        # Pool dolu, connection'ı kapat
-                        conn.close()
+        self.writer_pool = _ConnectionPool('writer', 1, lambda: self._open_connection(read_only=False), overflow=False)
+        self.reader_pool = _ConnectionPool('reader', self.read_connections, lambda: self._open_connection(read_only=True))
+    
+    def get_connection(self):
+        """Yazıcı connection'ı al (yazma işlemleri ve transaction'lar için)"""
+        return self.writer_pool.borrow()
+    
+    def get_read_connection(self):
+        """Salt okunur (query_only) connection al - okuma sorguları yazıcıyı beklemez"""
+        return self.reader_pool.borrow()
+    
+    def get_pool_stats(self):
+        """Connection havuzu bekleme metrikleri ve bellek ayarları"""
+        return {
+            'memory_budget_mb': round(self.memory_budget / (1024 * 1024), 1),
+            'cache_size_kib': self.cache_size_kib,
+            'mmap_size_mb': round(self.mmap_size / (1024 * 1024), 1),
+            'writer': self.writer_pool.stats(),
+            'reader': self.reader_pool.stats()
+        }
     
     def init_database(self):
         with self.lock:
@@ -203,7 +362,10 @@ class BatteryDatabase:
                         timestamp INTEGER,
                         status TEXT DEFAULT 'active',
                         resolved_at DATETIME,
-                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                        occurrence_count INTEGER DEFAULT 1,
+                        last_seen INTEGER,
+                        is_valid INTEGER DEFAULT 1
                     )
                 ''')
                 print("✓ alarms tablosu oluşturuldu")
@@ -230,6 +392,8 @@ class BatteryDatabase:
                         smtp_password TEXT,
                         use_tls BOOLEAN DEFAULT 1,
                         is_active BOOLEAN DEFAULT 0,
+                        digest_window_minutes INTEGER DEFAULT 0,
+                        digest_critical_bypass BOOLEAN DEFAULT 1,
                         created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
                         updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
                         CONSTRAINT single_config CHECK (id = 1)
@@ -237,6 +401,10 @@ class BatteryDatabase:
                 ''')
                 print("✓ mail_server_config tablosu oluşturuldu")
                 
+                # Mail tekrar deneme kuyruğu
+                self._create_mail_retry_queue_table(cursor)
+                print("✓ mail_retry_queue tablosu oluşturuldu")
+                
                 # Reset system tarihi tablosu
                 cursor.execute('''
                     CREATE TABLE IF NOT EXISTS reset_system_log (
@@ -480,6 +648,9 @@ class BatteryDatabase:
                 
                 # Index'ler oluştur - sadece kullanılan filtreler için
                 cursor.execute('CREATE INDEX IF NOT EXISTS idx_alarm_timestamp ON alarms(timestamp)')
+                # Aktif alarm araması (arm, battery) - sadece aktif satırları içerir, geçmiş büyüdükçe büyümez
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_alarms_active ON alarms(arm, battery) WHERE status = 'active'")
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_alarms_active_valid ON alarms(is_valid) WHERE status = 'active' AND is_valid = 1")
                 # Battery logs için: k > 2, arm, timestamp filtreleri
                 cursor.execute('CREATE INDEX IF NOT EXISTS idx_k_arm_timestamp ON battery_data(k, arm, timestamp)')
                 # Arm logs için: k = 2, arm, timestamp filtreleri  
@@ -488,6 +659,22 @@ class BatteryDatabase:
                 cursor.execute('CREATE INDEX IF NOT EXISTS idx_timestamp_arm_k ON battery_data(timestamp, arm, k)')
                 print("✓ Index'ler oluşturuldu")
                 
+                # Son değer tablosu (batteries/summary sayfaları için)
+                self._create_latest_readings_table(cursor)
+                print("✓ latest_readings tablosu oluşturuldu")
+                
+                # Saatlik/günlük özet (rollup) tabloları (grafik ve trend API'leri için)
+                self._create_rollup_tables(cursor)
+                print("✓ Rollup tabloları oluşturuldu")
+                
+                # Veri saklama (retention) politikası
+                self._create_retention_config_table(cursor)
+                print("✓ retention_config tablosu oluşturuldu")
+                
+                # Header rozeti için aktif alarm sayacı
+                self._create_alarm_counter_table(cursor)
+                print("✓ alarm_counter tablosu oluşturuldu")
+                
                 conn.commit()
                 print("✓ Veritabanı başarıyla oluşturuldu!")
                 
@@ -505,11 +692,12 @@ class BatteryDatabase:
     
     # get_connection metodu yukarıda connection pool ile tanımlandı
     
-    def execute_query(self, query, params=None):
-        """Özel SQL sorgusu çalıştır"""
+    def execute_query(self, query, params=None, start_ts=None, end_ts=None):
+        """Özel SQL sorgusu çalıştır (battery_data okumaları verilen aralıktaki partition'lara yönlendirilir)"""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
+                query = self.route_battery_data(conn, query, start_ts, end_ts)
                 if params:
                     cursor.execute(query, params)
                 else:
@@ -520,14 +708,506 @@ class BatteryDatabase:
             print(f"execute_query hatası: {e}")
             raise e
     
+    # latest_readings upsert sorgusu - eski timestamp'li veri son değeri ezmez
+    LATEST_READINGS_UPSERT = '''
+        INSERT INTO latest_readings (arm, k, dtype, value, timestamp)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(arm, k, dtype) DO UPDATE SET
+            value = excluded.value,
+            timestamp = excluded.timestamp
+        WHERE excluded.timestamp >= latest_readings.timestamp
+    '''
+    
+    def _backfill_alarm_validity(self, cursor):
+        """Private: mevcut alarmların is_valid değerini kod tablosundan doldur (farklı kod çifti başına bir UPDATE)"""
+        cursor.execute('SELECT DISTINCT error_code_msb, error_code_lsb FROM alarms')
+        cursor.executemany(
+            'UPDATE alarms SET is_valid = ? WHERE error_code_msb = ? AND error_code_lsb = ?',
+            [(int(alarm_codes.is_valid_alarm(msb, lsb)), msb, lsb) for msb, lsb in cursor.fetchall()]
+        )
+    
+    def _compact_alarm_episodes(self, cursor):
+        """Private: her periyot tekrar yazılmış alarm satırlarını episode'lara birleştir, silinen satır sayısını döndür"""
+        # Aynı alarmın tekrarları aynı anda düzeltildiği için (aynı resolved_at) tek episode sayılır;
+        # aktif olanlar (resolved_at NULL) kendi aralarında birleşir
+        episode_key = 'arm, battery, error_code_msb, error_code_lsb, status, resolved_at'
+        cursor.execute(f'''
+            CREATE TEMP TABLE alarm_episodes AS
+            SELECT MIN(id) AS keep_id, COUNT(*) AS occurrences, MAX(timestamp) AS last_seen
+            FROM alarms
+            GROUP BY {episode_key}
+        ''')
+        cursor.execute('''
+            UPDATE alarms SET
+                occurrence_count = (SELECT occurrences FROM alarm_episodes WHERE keep_id = alarms.id),
+                last_seen = (SELECT last_seen FROM alarm_episodes WHERE keep_id = alarms.id)
+            WHERE id IN (SELECT keep_id FROM alarm_episodes)
+        ''')
+        cursor.execute('DELETE FROM alarms WHERE id NOT IN (SELECT keep_id FROM alarm_episodes)')
+        removed = cursor.rowcount
+        cursor.execute('DROP TABLE alarm_episodes')
+        return removed
+    
+    def _create_latest_readings_table(self, cursor):
+        """Private: (arm, k, dtype) başına son değer tablosunu oluştur (cursor ile)"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS latest_readings (
+                arm INTEGER NOT NULL,
+                k INTEGER NOT NULL,
+                dtype INTEGER NOT NULL,
+                value REAL,
+                timestamp INTEGER NOT NULL,
+                PRIMARY KEY (arm, k, dtype)
+            ) WITHOUT ROWID
+        ''')
+    
+    # Rollup tabloları: çözünürlük -> tablo adı
+    ROLLUP_TABLES = {
+        'hourly': 'battery_rollup_hourly',
+        'daily': 'battery_rollup_daily'
+    }
+    
+    # Rollup upsert sorgusu - count/sum/min/max birikimli, last_value en yeni timestamp'e göre
+    ROLLUP_UPSERT = '''
+        INSERT INTO {table} (arm, k, dtype, bucket, value_count, value_sum,
+                             value_min, value_max, last_value, last_ts)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(arm, k, dtype, bucket) DO UPDATE SET
+            value_count = value_count + excluded.value_count,
+            value_sum = value_sum + excluded.value_sum,
+            value_min = MIN(value_min, excluded.value_min),
+            value_max = MAX(value_max, excluded.value_max),
+            last_value = CASE WHEN excluded.last_ts >= last_ts
+                              THEN excluded.last_value ELSE last_value END,
+            last_ts = MAX(last_ts, excluded.last_ts)
+    '''
+    
+    # SQL tarafında ms timestamp -> yerel gün başlangıcı (ms) ifadesi
+    DAY_BUCKET_SQL = "CAST(strftime('%s', date({col} / 1000, 'unixepoch', 'localtime'), 'utc') AS INTEGER) * 1000"
+    
+    HOUR_MS = 60 * 60 * 1000
+    
+    def _create_rollup_tables(self, cursor):
+        """Private: saatlik ve günlük rollup tablolarını oluştur (cursor ile)"""
+        for table in self.ROLLUP_TABLES.values():
+            cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS {table} (
+                    arm INTEGER NOT NULL,
+                    k INTEGER NOT NULL,
+                    dtype INTEGER NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    value_count INTEGER NOT NULL,
+                    value_sum REAL NOT NULL,
+                    value_min REAL,
+                    value_max REAL,
+                    last_value REAL,
+                    last_ts INTEGER NOT NULL,
+                    PRIMARY KEY (arm, k, dtype, bucket)
+                ) WITHOUT ROWID
+            ''')
+            # Retention zaman aralığına göre siler
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_bucket ON {table}(bucket)')
+    
+    def _create_retention_config_table(self, cursor):
+        """Private: retention politikası tablosunu oluştur ve varsayılan satırı ekle (cursor ile)"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS retention_config (
+                id INTEGER PRIMARY KEY DEFAULT 1,
+                raw_days INTEGER DEFAULT 30,
+                hourly_days INTEGER DEFAULT 730,
+                daily_days INTEGER,
+                chunk_size INTEGER DEFAULT 5000,
+                max_run_seconds INTEGER DEFAULT 60,
+                run_interval_hours INTEGER DEFAULT 24,
+                is_active BOOLEAN DEFAULT 1,
+                last_run_at DATETIME,
+                last_report TEXT,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                CONSTRAINT single_config CHECK (id = 1)
+            )
+        ''')
+        cursor.execute('INSERT OR IGNORE INTO retention_config (id) VALUES (1)')
+    
+    def _create_mail_retry_queue_table(self, cursor):
+        """Private: gönderilemeyen mailler için kalıcı tekrar deneme kuyruğunu oluştur (cursor ile)"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS mail_retry_queue (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                recipients TEXT NOT NULL,
+                subject TEXT NOT NULL,
+                body TEXT NOT NULL,
+                attempts INTEGER DEFAULT 0,
+                next_attempt_at INTEGER NOT NULL,
+                last_error TEXT,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_mail_retry_next ON mail_retry_queue(next_attempt_at)')
+    
+    # Header rozeti için aktif (geçerli) alarm sayısı - alarm yazan transaction içinde güncellenir
+    ALARM_COUNT_SQL = "SELECT COUNT(*) FROM alarms WHERE status = 'active' AND is_valid = 1"
+    
+    def _create_alarm_counter_table(self, cursor):
+        """Private: tek satırlık aktif alarm sayacı tablosunu oluştur ve mevcut sayıyla doldur (cursor ile)"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS alarm_counter (
+                id INTEGER PRIMARY KEY DEFAULT 1,
+                active_count INTEGER NOT NULL DEFAULT 0,
+                version INTEGER NOT NULL DEFAULT 1,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                CONSTRAINT single_counter CHECK (id = 1)
+            )
+        ''')
+        cursor.execute(f'INSERT OR IGNORE INTO alarm_counter (id, active_count) SELECT 1, ({self.ALARM_COUNT_SQL})')
+    
+    def _refresh_alarm_counter(self, cursor):
+        """Private: sayaç satırını partial index üzerinden yeniden say, değiştiyse versiyonu artır (transaction içinde)"""
+        cursor.execute(f'''
+            UPDATE alarm_counter
+            SET active_count = ({self.ALARM_COUNT_SQL}),
+                version = version + 1,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = 1 AND active_count != ({self.ALARM_COUNT_SQL})
+        ''')
+    
+    @staticmethod
+    def _hour_bucket(timestamp):
+        """Timestamp'in (ms) ait olduğu saatin başlangıcı (ms)"""
+        return timestamp - (timestamp % BatteryDatabase.HOUR_MS)
+    
+    @staticmethod
+    def _day_bucket(timestamp):
+        """Timestamp'in (ms) ait olduğu yerel günün başlangıcı (ms)"""
+        day_start = datetime.fromtimestamp(timestamp / 1000).replace(hour=0, minute=0, second=0, microsecond=0)
+        return int(day_start.timestamp() * 1000)
+    
+    def _update_rollups(self, cursor, rows):
+        """Private: (arm, k, dtype, data, timestamp) satırlarını rollup tablolarına işle (cursor ile)"""
+        hourly = {}
+        daily = {}
+        day_cache = {}
+        
+        for arm, k, dtype, data, timestamp in rows:
+            if data is None:
+                continue
+            hour = self._hour_bucket(timestamp)
+            day = day_cache.get(hour)
+            if day is None:
+                day = day_cache[hour] = self._day_bucket(hour)
+            
+            for groups, bucket in ((hourly, hour), (daily, day)):
+                key = (arm, k, dtype, bucket)
+                agg = groups.get(key)
+                if agg is None:
+                    # [count, sum, min, max, last_value, last_ts]
+                    groups[key] = [1, data, data, data, data, timestamp]
+                else:
+                    agg[0] += 1
+                    agg[1] += data
+                    if data < agg[2]:
+                        agg[2] = data
+                    if data > agg[3]:
+                        agg[3] = data
+                    if timestamp >= agg[5]:
+                        agg[4] = data
+                        agg[5] = timestamp
+        
+        for resolution, groups in (('hourly', hourly), ('daily', daily)):
+            if groups:
+                cursor.executemany(
+                    self.ROLLUP_UPSERT.format(table=self.ROLLUP_TABLES[resolution]),
+                    [key + tuple(agg) for key, agg in groups.items()]
+                )
+    
+    # ==============================================
+    # PARTITION (Aylık Bölümleme) FUNCTIONS
+    # ==============================================
+    
+    # SQLite varsayılan ATTACH limiti 10, biri yazıcının o anki ayı için boş bırakılır
+    MAX_ATTACHED_PARTITIONS = 9
+    BATTERY_DATA_COLUMNS = 'id, arm, k, dtype, data, timestamp, created_at'
+    # Router'ın yeniden yazdığı kaynak: "FROM battery_data" veya "FROM battery_data bd"
+    BATTERY_DATA_FROM_RE = re.compile(r'\bFROM\s+battery_data\b(?:\s+(bd)\b)?')
+    
+    @staticmethod
+    def _month_start(year, month):
+        """Yerel ay başlangıcı (ms)"""
+        return int(datetime(year, month, 1).timestamp() * 1000)
+    
+    def _partition_info(self, year, month):
+        """Ay için (schema, dosya yolu, başlangıç ms, bitiş ms) döndür"""
+        base, ext = os.path.splitext(os.path.abspath(self.db_path))
+        next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return (
+            f'p_{year:04d}_{month:02d}',
+            f'{base}_{year:04d}_{month:02d}{ext or ".db"}',
+            self._month_start(year, month),
+            self._month_start(next_year, next_month)
+        )
+    
+    def _partition_for_timestamp(self, timestamp):
+        """Timestamp'in yazılacağı ayın partition bilgisi"""
+        dt = datetime.fromtimestamp(timestamp / 1000)
+        return self._partition_info(dt.year, dt.month)
+    
+    def list_partitions(self, start_ts=None, end_ts=None):
+        """Diskteki aylık partition dosyalarını (eskiden yeniye) listele, opsiyonel zaman aralığına göre filtrele"""
+        base, ext = os.path.splitext(os.path.abspath(self.db_path))
+        directory, stem = os.path.split(base)
+        pattern = re.compile(rf'^{re.escape(stem)}_(\d{{4}})_(\d{{2}}){re.escape(ext or ".db")}$')
+        
+        partitions = []
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return partitions
+        
+        for name in sorted(names):
+            match = pattern.match(name)
+            if not match:
+                continue
+            info = self._partition_info(int(match.group(1)), int(match.group(2)))
+            if start_ts is not None and info[3] <= start_ts:
+                continue
+            if end_ts is not None and info[2] > end_ts:
+                continue
+            partitions.append(info)
+        return partitions
+    
+    def _attach_partitions(self, conn, start_ts=None, end_ts=None):
+        """Aralıkla kesişen partition'ları bu connection'a ATTACH et, schema adlarını döndür"""
+        wanted = self.list_partitions(start_ts, end_ts)
+        if len(wanted) > self.MAX_ATTACHED_PARTITIONS:
+            # Eksik ay sessizce atlanmaz: sayfalama/export dilimlere böler, diğer sorgular hata döner
+            raise PartitionRangeError(
+                f"Sorgu {len(wanted)} aylık partition'a yayılıyor (en fazla {self.MAX_ATTACHED_PARTITIONS}), "
+                f"tarih aralığını daraltın"
+            )
+        wanted_schemas = {info[0] for info in wanted}
+        
+        attached = {row[1]: row[2] for row in conn.execute("PRAGMA database_list") if row[1].startswith('p_')}
+        
+        # Silinmiş/yeniden oluşturulmuş (retention) veya yer açmak için gereksiz partition'ları ayır
+        if not conn.in_transaction:
+            for schema, path in list(attached.items()):
+                stale = self._attachment_stale(conn, schema, path)
+                crowded = len(attached) + len(wanted_schemas - attached.keys()) > self.MAX_ATTACHED_PARTITIONS
+                if stale or (crowded and schema not in wanted_schemas):
+                    self._detach_partition(conn, schema)
+                    del attached[schema]
+        
+        schemas = []
+        for schema, path, _, _ in wanted:
+            if schema not in attached:
+                try:
+                    conn.execute(f"ATTACH DATABASE ? AS {schema}", (path,))
+                except sqlite3.OperationalError as e:
+                    print(f"⚠️ Partition eklenemedi ({schema}): {e}")
+                    continue
+                self._attached_files[(id(conn), schema)] = self._file_identity(path)
+            schemas.append(schema)
+        return schemas
+    
+    @staticmethod
+    def _file_identity(path):
+        """Dosyanın (st_dev, st_ino) kimliği, yoksa None"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_dev, stat.st_ino)
+    
+    def _attachment_stale(self, conn, schema, path):
+        """ATTACH edilen dosya silinmiş veya yerine yenisi oluşturulmuş mu (başka process'in retention'ı dahil)"""
+        identity = self._file_identity(path)
+        return identity is None or identity != self._attached_files.get((id(conn), schema), identity)
+    
+    def _detach_partition(self, conn, schema):
+        """Partition'ı connection'dan ayır (transaction dışında çağrılmalı)"""
+        conn.execute(f"DETACH DATABASE {schema}")
+        self._attached_files.pop((id(conn), schema), None)
+    
+    def _ensure_write_partition(self, conn, timestamp):
+        """Yazılacak ayın partition'ını oluştur/ATTACH et (transaction dışında çağrılmalı), schema adını döndür"""
+        schema, path, _, _ = self._partition_for_timestamp(timestamp)
+        attached = {row[1]: row[2] for row in conn.execute("PRAGMA database_list") if row[1].startswith('p_')}
+        if schema in attached:
+            if not self._attachment_stale(conn, schema, path):
+                return schema
+            # Ay retention ile silinmiş: eski dosyaya yazılan veri kaybolurdu
+            self._detach_partition(conn, schema)
+            del attached[schema]
+        
+        if len(attached) >= self.MAX_ATTACHED_PARTITIONS:
+            # Yer aç: diğer aylar sonraki sorgularda gerektiğinde yeniden eklenir
+            for other in attached:
+                self._detach_partition(conn, other)
+        
+        is_new = not os.path.exists(path)
+        conn.execute(f"ATTACH DATABASE ? AS {schema}", (path,))
+        if is_new:
+            # auto_vacuum tablo oluşturulmadan önce ayarlanmalı
+            conn.execute(f"PRAGMA {schema}.auto_vacuum=INCREMENTAL")
+            conn.execute(f"PRAGMA {schema}.journal_mode=WAL")
+            print(f"✓ Yeni partition oluşturuldu: {os.path.basename(path)}")
+        conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS {schema}.battery_data (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                arm INTEGER,
+                k INTEGER,
+                dtype INTEGER,
+                data REAL,
+                timestamp INTEGER,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {schema}.idx_k_arm_timestamp ON battery_data(k, arm, timestamp)')
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {schema}.idx_arm_k_timestamp ON battery_data(arm, k, timestamp)')
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {schema}.idx_timestamp_arm_k ON battery_data(timestamp, arm, k)')
+        self._attached_files[(id(conn), schema)] = self._file_identity(path)
+        return schema
+    
+    def route_battery_data(self, conn, query, start_ts=None, end_ts=None):
+        """battery_data sorgusunu sadece ilgili aylara (ana tablo + partition'lar) yönlendir"""
+        if not self.partitioned or not self.BATTERY_DATA_FROM_RE.search(query):
+            return query
+        schemas = self._attach_partitions(conn, start_ts, end_ts)
+        if not schemas:
+            return query
+        
+        # Bölümleme öncesi veriler ana dosyada kalır, retention ile azalır
+        parts = [f'SELECT {self.BATTERY_DATA_COLUMNS} FROM main.battery_data']
+        parts += [f'SELECT {self.BATTERY_DATA_COLUMNS} FROM {schema}.battery_data' for schema in schemas]
+        source = '(' + ' UNION ALL '.join(parts) + ')'
+        return self.BATTERY_DATA_FROM_RE.sub(
+            lambda m: f"FROM {source} {m.group(1) or 'battery_data'}", query
+        )
+    
+    def partition_windows(self, start_ts=None, end_ts=None):
+        """Aralığı her biri en fazla MAX_ATTACHED_PARTITIONS ay içeren [alt, üst) dilimlerine böl (eskiden yeniye)
+        
+        None açık uçtur. Ana dosya her dilimde sorgulandığı için dilim koşulu satırların tekrarını önler.
+        """
+        wanted = self.list_partitions(start_ts, end_ts) if self.partitioned else []
+        if len(wanted) <= self.MAX_ATTACHED_PARTITIONS:
+            return [(start_ts, None if end_ts is None else end_ts + 1)]
+        
+        splits = [info[2] for info in wanted[self.MAX_ATTACHED_PARTITIONS::self.MAX_ATTACHED_PARTITIONS]]
+        lows = [start_ts] + splits
+        highs = splits + [None if end_ts is None else end_ts + 1]
+        return list(zip(lows, highs))
+    
+    def route_battery_window(self, conn, query, column, window):
+        """Sorguyu tek dilimle sınırla ve yönlendir, (sorgu, ek parametreler) döndür"""
+        low, high = window
+        params = []
+        if low is not None:
+            query += f' AND {column} >= ?'
+            params.append(low)
+        if high is not None:
+            query += f' AND {column} < ?'
+            params.append(high)
+        return self.route_battery_data(conn, query, low, None if high is None else high - 1), params
+    
+    def battery_data_bounds(self, conn, start_ts=None, end_ts=None):
+        """Aralıktaki en eski ve en yeni timestamp (partition'lar dilim dilim sorgulanır)"""
+        oldest = newest = None
+        for window in self.partition_windows(start_ts, end_ts):
+            # MIN ve MAX ayrı sorgularda: ikisi birlikte index optimizasyonunu kapatır
+            for function in ('MIN', 'MAX'):
+                query, params = self.route_battery_window(
+                    conn, f"SELECT {function}(timestamp) FROM battery_data WHERE 1=1", 'timestamp', window
+                )
+                value = conn.execute(query, params).fetchone()[0]
+                if value is None:
+                    continue
+                if function == 'MIN':
+                    oldest = value if oldest is None else min(oldest, value)
+                else:
+                    newest = value if newest is None else max(newest, value)
+        return oldest, newest
+    
+    def drop_partitions_before(self, cutoff_ts):
+        """Tamamı cutoff'tan eski olan partition dosyalarını sil (retention), silinen dosya adlarını döndür
+        
+        Dosya silinmeden önce bu process'in boştaki connection'larından ayrılır; kullanımdaki ve diğer
+        process'lerin connection'ları dosya kimliği değişince bir sonraki sorguda ayırır.
+        """
+        expired = [info for info in self.list_partitions(end_ts=cutoff_ts) if info[3] <= cutoff_ts]
+        if not expired:
+            return []
+        
+        def detach_expired(conn):
+            if conn.in_transaction:
+                return
+            attached = {row[1] for row in conn.execute("PRAGMA database_list")}
+            for schema, _, _, _ in expired:
+                if schema in attached:
+                    self._detach_partition(conn, schema)
+        
+        self.writer_pool.for_each_idle(detach_expired)
+        self.reader_pool.for_each_idle(detach_expired)
+        
+        dropped = []
+        for schema, path, _, _ in expired:
+            for suffix in ('', '-wal', '-shm'):
+                try:
+                    os.remove(path + suffix)
+                except FileNotFoundError:
+                    pass
+            dropped.append(os.path.basename(path))
+        if dropped:
+            print(f"🗑️ Eski partition'lar silindi: {', '.join(dropped)}")
+        return dropped
+    
+    @staticmethod
+    def _filter_time_bounds(filters, start_key, end_key):
+        """Filtre sözlüğündeki YYYY-MM-DD tarihlerini (başlangıç ms, gün sonu ms) aralığına çevir"""
+        start_ts = end_ts = None
+        if filters.get(start_key):
+            start_ts = int(datetime.strptime(filters[start_key], '%Y-%m-%d').timestamp() * 1000)
+        if filters.get(end_key):
+            end_ts = int(datetime.strptime(filters[end_key], '%Y-%m-%d').timestamp() * 1000) + (24 * 60 * 60 * 1000) - 1
+        return start_ts, end_ts
+    
+    def _insert_raw_rows(self, cursor, rows):
+        """Private: ham satırları ana tabloya veya ayın partition'ına ekle (transaction içinde)"""
+        if not self.partitioned:
+            cursor.executemany('''
+                INSERT INTO battery_data (arm, k, dtype, data, timestamp)
+                VALUES (?, ?, ?, ?, ?)
+            ''', rows)
+            return
+        
+        by_schema = {}
+        for row in rows:
+            by_schema.setdefault(self._partition_for_timestamp(row[4])[0], []).append(row)
+        for schema, schema_rows in by_schema.items():
+            cursor.executemany(f'''
+                INSERT INTO {schema}.battery_data (arm, k, dtype, data, timestamp)
+                VALUES (?, ?, ?, ?, ?)
+            ''', schema_rows)
+    
+    def _prepare_write_partitions(self, conn, rows):
+        """Private: satırların ayları için partition'ları hazırla (BEGIN öncesi, ATTACH transaction içinde yapılamaz)"""
+        if not self.partitioned:
+            return
+        months = {}
+        for row in rows:
+            dt = datetime.fromtimestamp(row[4] / 1000)
+            months.setdefault((dt.year, dt.month), row[4])
+        for timestamp in months.values():
+            self._ensure_write_partition(conn, timestamp)
+    
     def insert_battery_data(self, arm, k, dtype, data, timestamp):
         """Veri ekle (arm ve battery için tek tablo)"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO battery_data (arm, k, dtype, data, timestamp)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (arm, k, dtype, data, timestamp))
+            rows = [(arm, k, dtype, data, timestamp)]
+            self._prepare_write_partitions(conn, rows)
+            self._insert_raw_rows(cursor, rows)
+            cursor.execute(self.LATEST_READINGS_UPSERT, rows[0])
+            self._update_rollups(cursor, rows)
             conn.commit()
     
     def insert_battery_data_batch(self, batch):
@@ -535,19 +1215,26 @@ class BatteryDatabase:
         if not batch:
             return
             
+        rows = [(record['Arm'], record['k'], record['Dtype'], record['data'], record['timestamp']) for record in batch]
+        
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
+            # Bölümleme açıksa ayın partition'ı transaction öncesi hazırlanır
+            self._prepare_write_partitions(conn, rows)
+            
             # Transaction başlat
             cursor.execute("BEGIN IMMEDIATE")
             
             try:
-                # Ana tabloya ekle
-                cursor.executemany('''
-                    INSERT INTO battery_data (arm, k, dtype, data, timestamp)
-                    VALUES (?, ?, ?, ?, ?)
-                ''', [(record['Arm'], record['k'], record['Dtype'], record['data'], record['timestamp']) for record in batch])
+                # Ana tabloya (veya ayın partition'ına) ekle
+                self._insert_raw_rows(cursor, rows)
+                
+                # Son değer tablosunu aynı transaction içinde güncelle
+                cursor.executemany(self.LATEST_READINGS_UPSERT, rows)
                 
+                # Saatlik/günlük rollup'ları aynı transaction içinde güncelle
+                self._update_rollups(cursor, rows)
                 
                 # Commit
                 conn.commit()
@@ -563,13 +1250,23 @@ class BatteryDatabase:
     
 
     def insert_alarm(self, arm, battery, error_code_msb, error_code_lsb, timestamp):
-        """Alarm verisi ekle"""
+        """Alarm verisi ekle (aynı alarm zaten aktifse yeni satır yerine episode'u güncelle)"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                INSERT INTO alarms (arm, battery, error_code_msb, error_code_lsb, timestamp)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (arm, battery, error_code_msb, error_code_lsb, timestamp))
+                UPDATE alarms 
+                SET occurrence_count = occurrence_count + 1,
+                    last_seen = MAX(COALESCE(last_seen, timestamp), ?)
+                WHERE arm = ? AND battery = ? AND status = 'active'
+                  AND error_code_msb = ? AND error_code_lsb = ?
+            ''', (timestamp, arm, battery, error_code_msb, error_code_lsb))
+            if cursor.rowcount == 0:
+                cursor.execute('''
+                    INSERT INTO alarms (arm, battery, error_code_msb, error_code_lsb, timestamp, occurrence_count, last_seen, is_valid)
+                    VALUES (?, ?, ?, ?, ?, 1, ?, ?)
+                ''', (arm, battery, error_code_msb, error_code_lsb, timestamp, timestamp,
+                      int(alarm_codes.is_valid_alarm(error_code_msb, error_code_lsb))))
+            self._refresh_alarm_counter(cursor)
             conn.commit()
     
     def resolve_alarm(self, arm, battery):
@@ -581,13 +1278,15 @@ class BatteryDatabase:
                 SET status = 'resolved', resolved_at = CURRENT_TIMESTAMP
                 WHERE arm = ? AND battery = ? AND status = 'active'
             ''', (arm, battery))
+            resolved = cursor.rowcount > 0
+            self._refresh_alarm_counter(cursor)
             conn.commit()
-            return cursor.rowcount > 0
+            return resolved
 
     def get_all_alarms(self, show_resolved=True):
         """Tüm alarmları getir"""
         try:
-            with self.get_connection() as conn:
+            with self.get_read_connection() as conn:
                 cursor = conn.cursor()
                 
                 if show_resolved:
@@ -612,65 +1311,59 @@ class BatteryDatabase:
             print(f"get_all_alarms hatası: {e}")
             return []
 
-    def get_paginated_alarms(self, show_resolved=True, page=1, page_size=50):
-        """Sayfalanmış alarmları getir"""
+    def get_paginated_alarms(self, show_resolved=True, page=1, page_size=50, cursor=None, include_total=False):
+        """Sayfalanmış alarmları getir ((timestamp, id) üzerinde keyset sayfalama)"""
         try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                # Toplam alarm sayısını hesapla
-                if show_resolved:
-                    count_query = 'SELECT COUNT(*) FROM alarms'
-                    cursor.execute(count_query)
-                else:
-                    count_query = 'SELECT COUNT(*) FROM alarms WHERE status = "active"'
-                    cursor.execute(count_query)
-                
-                total_count = cursor.fetchone()[0]
-                print(f"🔍 get_paginated_alarms: total_count = {total_count}, show_resolved = {show_resolved}")
+            with self.get_read_connection() as conn:
+                db_cursor = conn.cursor()
                 
-                # Sayfalama hesapla
-                offset = (page - 1) * page_size
-                total_pages = (total_count + page_size - 1) // page_size
-                print(f"🔍 get_paginated_alarms: page = {page}, page_size = {page_size}, offset = {offset}")
-                
-                # Sayfalanmış verileri getir
-                if show_resolved:
-                    query = '''
-                        SELECT id, arm, battery, error_code_msb, error_code_lsb, timestamp, status, resolved_at, created_at
-                        FROM alarms 
-                        ORDER BY timestamp DESC
-                        LIMIT ? OFFSET ?
-                    '''
-                    cursor.execute(query, (page_size, offset))
-                else:
-                    query = '''
-                        SELECT id, arm, battery, error_code_msb, error_code_lsb, timestamp, status, resolved_at, created_at
-                        FROM alarms 
-                        WHERE status = 'active'
-                        ORDER BY timestamp DESC
-                        LIMIT ? OFFSET ?
-                    '''
-                    cursor.execute(query, (page_size, offset))
+                query = '''
+                    SELECT id, arm, battery, error_code_msb, error_code_lsb, timestamp, status, resolved_at, created_at,
+                           occurrence_count, last_seen
+                    FROM alarms 
+                    WHERE is_valid = 1
+                '''
+                if not show_resolved:
+                    query += " AND status = 'active'"
                 
-                rows = cursor.fetchall()
-                print(f"🔍 get_paginated_alarms: rows count = {len(rows)}")
-                if len(rows) > 0:
-                    print(f"🔍 get_paginated_alarms: first row = {rows[0]}")
+                page_data = self._fetch_keyset_page(
+                    db_cursor, query, [],
+                    ['timestamp', 'id'], lambda row: (row[5], row[0]),
+                    page_size, cursor
+                )
                 
-                return {
-                    'alarms': rows,
-                    'totalCount': total_count,
-                    'totalPages': total_pages,
-                    'currentPage': page
+                result = {
+                    'alarms': page_data['rows'],
+                    'currentPage': page,
+                    'hasMore': page_data['hasMore'],
+                    'nextCursor': page_data['nextCursor'],
+                    'prevCursor': page_data['prevCursor']
                 }
+                if include_total:
+                    if show_resolved:
+                        # Yaklaşık: id aralığı (PRIMARY KEY uçları, tablo taranmaz), geçersiz/silinmiş kayıtlar dahil
+                        db_cursor.execute('SELECT COALESCE(MAX(id) - MIN(id) + 1, 0) FROM alarms')
+                    else:
+                        # Aktif alarm sayacı alarm yazan transaction içinde güncellenir (kesin)
+                        db_cursor.execute('SELECT active_count FROM alarm_counter WHERE id = 1')
+                    row = db_cursor.fetchone()
+                    total_count = row[0] if row else 0
+                    result['totalCount'] = total_count
+                    result['totalPages'] = max(1, (total_count + page_size - 1) // page_size)
+                    result['totalIsApproximate'] = show_resolved
+                return result
+        except ValueError:
+            raise
         except Exception as e:
             print(f"get_paginated_alarms hatası: {e}")
             return {
                 'alarms': [],
                 'totalCount': 0,
                 'totalPages': 1,
-                'currentPage': 1
+                'currentPage': 1,
+                'hasMore': False,
+                'nextCursor': None,
+                'prevCursor': None
             }
     
     def insert_missing_data(self, arm, slave, status, timestamp):
@@ -780,6 +1473,8 @@ class BatteryDatabase:
                     # Index'leri oluştur (battery_data tablosu oluşturulduktan sonra)
                     print("🔍 Index'ler oluşturuluyor...")
                     cursor.execute('CREATE INDEX IF NOT EXISTS idx_alarm_timestamp ON alarms(timestamp)')
+                    # Aktif alarm araması (arm, battery) - sadece aktif satırları içerir, geçmiş büyüdükçe büyümez
+                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_alarms_active ON alarms(arm, battery) WHERE status = 'active'")
                     cursor.execute('CREATE INDEX IF NOT EXISTS idx_k_arm_timestamp ON battery_data(k, arm, timestamp)')
                     cursor.execute('CREATE INDEX IF NOT EXISTS idx_arm_k_timestamp ON battery_data(arm, k, timestamp)')
                     cursor.execute('CREATE INDEX IF NOT EXISTS idx_timestamp_arm_k ON battery_data(timestamp, arm, k)')
@@ -872,13 +1567,32 @@ class BatteryDatabase:
                             timestamp INTEGER,
                             status TEXT DEFAULT 'active',
                             resolved_at DATETIME,
-                            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                            occurrence_count INTEGER DEFAULT 1,
+                            last_seen INTEGER,
+                            is_valid INTEGER DEFAULT 1
                         )
                     ''')
                     conn.commit()
                     print("✅ alarms tablosu oluşturuldu")
                 else:
                     print("✅ alarms tablosu mevcut")
+                    # Episode sütunları var mı kontrol et (her periyot tekrar eden satırlar yerine)
+                    cursor.execute("PRAGMA table_info(alarms)")
+                    columns = [column[1] for column in cursor.fetchall()]
+                    if 'occurrence_count' not in columns:
+                        print("🔄 alarms episode sütunları eksik, ekleniyor...")
+                        cursor.execute("ALTER TABLE alarms ADD COLUMN occurrence_count INTEGER DEFAULT 1")
+                        cursor.execute("ALTER TABLE alarms ADD COLUMN last_seen INTEGER")
+                        removed = self._compact_alarm_episodes(cursor)
+                        conn.commit()
+                        print(f"✅ alarms episode sütunları eklendi ({removed} tekrar eden satır birleştirildi)")
+                    if 'is_valid' not in columns:
+                        print("🔄 alarms is_valid sütunu eksik, ekleniyor...")
+                        cursor.execute("ALTER TABLE alarms ADD COLUMN is_valid INTEGER DEFAULT 1")
+                        self._backfill_alarm_validity(cursor)
+                        conn.commit()
+                        print("✅ alarms is_valid sütunu eklendi")
                 
                 # Mail alıcıları tablosu
                 cursor.execute("""
@@ -919,6 +1633,8 @@ class BatteryDatabase:
                             smtp_password TEXT,
                             use_tls BOOLEAN DEFAULT 1,
                             is_active BOOLEAN DEFAULT 0,
+                            digest_window_minutes INTEGER DEFAULT 0,
+                            digest_critical_bypass BOOLEAN DEFAULT 1,
                             created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
                             updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
                             CONSTRAINT single_config CHECK (id = 1)
@@ -928,6 +1644,33 @@ class BatteryDatabase:
                     print("✅ mail_server_config tablosu oluşturuldu")
                 else:
                     print("✅ mail_server_config tablosu mevcut")
+                    # Özet (digest) mail sütunları var mı kontrol et
+                    cursor.execute("PRAGMA table_info(mail_server_config)")
+                    columns = [column[1] for column in cursor.fetchall()]
+                    if 'digest_window_minutes' not in columns:
+                        print("🔄 digest_window_minutes sütunu eksik, ekleniyor...")
+                        cursor.execute("ALTER TABLE mail_server_config ADD COLUMN digest_window_minutes INTEGER DEFAULT 0")
+                        conn.commit()
+                        print("✅ digest_window_minutes sütunu eklendi")
+                    if 'digest_critical_bypass' not in columns:
+                        print("🔄 digest_critical_bypass sütunu eksik, ekleniyor...")
+                        cursor.execute("ALTER TABLE mail_server_config ADD COLUMN digest_critical_bypass BOOLEAN DEFAULT 1")
+                        conn.commit()
+                        print("✅ digest_critical_bypass sütunu eklendi")
+                
+                # mail_retry_queue tablosu var mı kontrol et
+                cursor.execute("""
+                    SELECT name FROM sqlite_master 
+                    WHERE type='table' AND name='mail_retry_queue'
+                """)
+                
+                if not cursor.fetchone():
+                    print("🔄 mail_retry_queue tablosu eksik, oluşturuluyor...")
+                    self._create_mail_retry_queue_table(cursor)
+                    conn.commit()
+                    print("✅ mail_retry_queue tablosu oluşturuldu")
+                else:
+                    print("✅ mail_retry_queue tablosu mevcut")
                 
                 # Passive balance tablosu
                 cursor.execute("""
@@ -1242,6 +1985,80 @@ class BatteryDatabase:
                     cursor.execute('CREATE INDEX IF NOT EXISTS idx_arm_k_timestamp ON battery_data(arm, k, timestamp)')
                     cursor.execute('CREATE INDEX IF NOT EXISTS idx_timestamp_arm_k ON battery_data(timestamp, arm, k)')
                     print("✅ battery_data index'leri oluşturuldu")
+
+                # Aktif alarm partial index'i (AlarmProcessor set bazlı düzeltme için)
+                cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='alarms'")
+                if cursor.fetchone():
+                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_alarms_active ON alarms(arm, battery) WHERE status = 'active'")
+                    cursor.execute("CREATE INDEX IF NOT EXISTS idx_alarms_active_valid ON alarms(is_valid) WHERE status = 'active' AND is_valid = 1")
+                    print("✅ alarms aktif index'i oluşturuldu")
+
+                # latest_readings tablosu var mı kontrol et
+                cursor.execute("""
+                    SELECT name FROM sqlite_master 
+                    WHERE type='table' AND name='latest_readings'
+                """)
+                
+                if not cursor.fetchone():
+                    print("🔄 latest_readings tablosu eksik, oluşturuluyor...")
+                    self._create_latest_readings_table(cursor)
+                    # Mevcut battery_data'dan son değerleri doldur (tek seferlik)
+                    cursor.execute('''
+                        INSERT OR REPLACE INTO latest_readings (arm, k, dtype, value, timestamp)
+                        SELECT arm, k, dtype, data, MAX(timestamp)
+                        FROM battery_data
+                        GROUP BY arm, k, dtype
+                    ''')
+                    conn.commit()
+                    print(f"✅ latest_readings tablosu oluşturuldu ({cursor.rowcount} kayıt dolduruldu)")
+                else:
+                    print("✅ latest_readings tablosu mevcut")
+                
+                # Rollup tabloları var mı kontrol et
+                cursor.execute("""
+                    SELECT name FROM sqlite_master 
+                    WHERE type='table' AND name='battery_rollup_hourly'
+                """)
+                
+                if not cursor.fetchone():
+                    print("🔄 Rollup tabloları eksik, oluşturuluyor...")
+                    self._create_rollup_tables(cursor)
+                    conn.commit()
+                    # Geçmiş veri için doldurma uzun sürebilir, başlangıçta yapılmaz
+                    print("✅ Rollup tabloları oluşturuldu (geçmiş veri için: python db_maintenance.py rebuild-rollups)")
+                else:
+                    self._create_rollup_tables(cursor)
+                    print("✅ Rollup tabloları mevcut")
+                
+                # retention_config tablosu var mı kontrol et
+                cursor.execute("""
+                    SELECT name FROM sqlite_master 
+                    WHERE type='table' AND name='retention_config'
+                """)
+                
+                if not cursor.fetchone():
+                    print("🔄 retention_config tablosu eksik, oluşturuluyor...")
+                    self._create_retention_config_table(cursor)
+                    conn.commit()
+                    print("✅ retention_config tablosu oluşturuldu")
+                else:
+                    print("✅ retention_config tablosu mevcut")
+                
+                # alarm_counter tablosu var mı kontrol et (alarms migration'larından sonra)
+                cursor.execute("""
+                    SELECT name FROM sqlite_master 
+                    WHERE type='table' AND name='alarm_counter'
+                """)
+                
+                if not cursor.fetchone():
+                    print("🔄 alarm_counter tablosu eksik, oluşturuluyor...")
+                    self._create_alarm_counter_table(cursor)
+                    conn.commit()
+                    print("✅ alarm_counter tablosu oluşturuldu")
+                else:
+                    # Sayaç dışı yollarla değişmiş olabilir, başlangıçta eşitle
+                    self._refresh_alarm_counter(cursor)
+                    print("✅ alarm_counter tablosu mevcut")
                 
                 conn.commit()
                 print("✅ Eksik tablolar ve index'ler başarıyla oluşturuldu")
@@ -1252,7 +2069,7 @@ class BatteryDatabase:
     def get_arm_slave_counts(self):
         """Arm slave counts verilerini al"""
         try:
-            with self.get_connection() as conn:
+            with self.get_read_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT arm, slave_count FROM arm_slave_counts ORDER BY arm
@@ -1562,7 +2379,7 @@ class BatteryDatabase:
     def get_all_users(self):
         """Tüm kullanıcıları listele"""
         try:
-            with self.get_connection() as conn:
+            with self.get_read_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT id, username, email, role, is_active, created_at, updated_at
@@ -1608,7 +2425,7 @@ class BatteryDatabase:
     
     def get_recent_data_with_translations(self, minutes=5, arm=None, battery=None, dtype=None, data_type=None, limit=100, language='tr'):
         """Son verileri çevirilerle birlikte getir"""
-        with self.get_connection() as conn:
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
             
             # Temel sorgu
@@ -1630,7 +2447,8 @@ class BatteryDatabase:
                 WHERE bd.timestamp >= ?
             '''
             
-            params = [language, int((datetime.now() - timedelta(minutes=minutes)).timestamp() * 1000)]
+            since = int((datetime.now() - timedelta(minutes=minutes)).timestamp() * 1000)
+            params = [language, since]
             
             # Filtreler
             if arm:
@@ -1651,11 +2469,7 @@ class BatteryDatabase:
                 elif data_type == 'battery':
                     query += ' AND bd.k != 2'
             
-            query += ' ORDER BY bd.timestamp DESC LIMIT ?'
-            params.append(limit)
-            
-            cursor.execute(query, params)
-            rows = cursor.fetchall()
+            rows = self._fetch_newest_first(cursor, query, params, 'bd.timestamp', since, None, limit)
             
             return [{
                 'arm': row[0],
@@ -1669,9 +2483,26 @@ class BatteryDatabase:
                 'translated_description': row[8]
             } for row in rows]
     
+    def _fetch_newest_first(self, cursor, query, params, column, start_ts=None, end_ts=None, limit=None):
+        """Private: battery_data sorgusunu yeniden eskiye sırala; partition'lar ATTACH sınırını aşmayan
+        dilimler halinde sorgulanır, limit dolunca durulur"""
+        rows = []
+        for window in reversed(self.partition_windows(start_ts, end_ts)):
+            window_query, window_params = self.route_battery_window(cursor.connection, query, column, window)
+            window_query += f' ORDER BY {column} DESC'
+            window_params = list(params) + window_params
+            if limit is not None:
+                window_query += ' LIMIT ?'
+                window_params.append(limit - len(rows))
+            cursor.execute(window_query, window_params)
+            rows += cursor.fetchall()
+            if limit is not None and len(rows) >= limit:
+                break
+        return rows
+    
     def get_data_types_by_language(self, language='tr'):
         """Dile göre veri tiplerini getir"""
-        with self.get_connection() as conn:
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT 
@@ -1695,7 +2526,7 @@ class BatteryDatabase:
     
     def get_data_by_date_range_with_translations(self, start_date, end_date, arm=None, battery=None, dtype=None, language='tr'):
         """Tarih aralığında veri getir (çevirilerle)"""
-        with self.get_connection() as conn:
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
             
             # Tarihleri timestamp'e çevir
@@ -1734,10 +2565,7 @@ class BatteryDatabase:
                 query += ' AND bd.dtype = ?'
                 params.append(dtype)
             
-            query += ' ORDER BY bd.timestamp DESC'
-            
-            cursor.execute(query, params)
-            rows = cursor.fetchall()
+            rows = self._fetch_newest_first(cursor, query, params, 'bd.timestamp', start_timestamp, end_timestamp)
             
             return [{
                 'arm': row[0],
@@ -1751,13 +2579,128 @@ class BatteryDatabase:
                 'translated_description': row[8]
             } for row in rows]
     
-    def get_logs_with_filters(self, page=1, page_size=50, filters=None, language='tr'):
-        """Filtrelenmiş log verilerini getir"""
+    def _fetch_keyset_page(self, cursor, query, params, key_columns, key_of, page_size, page_cursor, group_by='',
+                           ascending=(), time_range=None):
+        """Keyset sayfalama: cursor anahtarından sonrasını (veya öncesini) LIMIT ile getir, OFFSET yok
+        
+        Sorgu WHERE içermeli; sıralama key_columns üzerinde azalan yöndedir, ascending'deki kolonlar
+        hariç (ör. periyot yeniden eskiye, periyot içinde kol/batarya artan). Dönen satırlar her zaman
+        bu görüntüleme sırasındadır.
+        
+        time_range=(başlangıç, bitiş) verilirse sorgu yönlendirilmemiş battery_data sorgusudur ve ilk
+        anahtar kolonu timestamp'tir: partition'lar ATTACH sınırını aşmayan dilimler halinde, sayfa
+        dolana kadar sırayla sorgulanır.
+        """
+        direction, key = decode_page_cursor(page_cursor)
+        forward = direction == 'next'
+        if key is not None and len(key) != len(key_columns):
+            raise ValueError("Geçersiz sayfalama cursor'ı")
+        
+        if time_range is None:
+            rows = self._keyset_rows(cursor, query, params, key_columns, key, forward, page_size + 1, group_by, ascending)
+        else:
+            windows = self.partition_windows(*time_range)
+            if forward:
+                windows.reverse()  # Yeniden eskiye
+            rows = []
+            for window in windows:
+                window_query, window_params = self.route_battery_window(cursor.connection, query, key_columns[0], window)
+                rows += self._keyset_rows(cursor, window_query, list(params) + window_params, key_columns, key,
+                                          forward, page_size + 1 - len(rows), group_by, ascending)
+                if len(rows) > page_size:
+                    break
+        
+        has_extra = len(rows) > page_size
+        rows = rows[:page_size]
+        if direction == 'prev':
+            rows.reverse()
+        
+        # İleri giderken fazla satır sonraki sayfayı, geri giderken önceki sayfayı gösterir
+        has_next = has_extra if direction == 'next' else True
+        has_prev = key is not None if direction == 'next' else has_extra
+        return {
+            'rows': rows,
+            'hasMore': bool(rows) and has_next,
+            'nextCursor': encode_page_cursor('next', key_of(rows[-1])) if rows and has_next else None,
+            'prevCursor': encode_page_cursor('prev', key_of(rows[0])) if rows and has_prev else None
+        }
+    
+    def _keyset_rows(self, cursor, query, params, key_columns, key, forward, limit, group_by, ascending):
+        """Private: keyset koşulu ve sıralamasıyla en fazla limit satır (okuma yönünde)"""
+        if key is not None:
+            if not ascending:
+                operator = '<' if forward else '>'
+                query += f" AND ({', '.join(key_columns)}) {operator} ({', '.join('?' * len(key))})"
+                params = list(params) + list(key)
+            else:
+                # Karışık yönlü sıralamada satır karşılaştırması kullanılamaz, kolon kolon açılır:
+                # (a < ?) OR (a = ? AND b > ?) OR (a = ? AND b = ? AND c > ?) ...
+                terms = []
+                params = list(params)
+                for i, column in enumerate(key_columns):
+                    after = (column in ascending) == forward
+                    conditions = [f'{previous} = ?' for previous in key_columns[:i]]
+                    conditions.append(f"{column} {'>' if after else '<'} ?")
+                    terms.append('(' + ' AND '.join(conditions) + ')')
+                    params += list(key[:i + 1])
+                query += ' AND (' + ' OR '.join(terms) + ')'
+        
+        def order_of(column):
+            descending = column not in ascending
+            return 'DESC' if descending == forward else 'ASC'
+        
+        if ascending:
+            # Karışık yönlü ORDER BY index'ten okunamaz ve tüm grupları sıralar. Önce index sırasında
+            # (tamamen tek yön) sayfanın son satırına ait ilk kolon değeri bulunur, sıralama sadece
+            # bu sınırdan sonraki birkaç periyotla yapılır
+            lead = key_columns[0]
+            natural = 'DESC' if forward else 'ASC'
+            bound_query = (f'SELECT {lead} FROM ({query}{group_by} ORDER BY '
+                           + ', '.join(f'{column} {natural}' for column in key_columns) + ' LIMIT ?)')
+            cursor.execute(bound_query, list(params) + [limit])
+            leads = [row[0] for row in cursor.fetchall()]
+            if leads:
+                query += f" AND {lead} {'>=' if forward else '<='} ?"
+                params = list(params) + [min(leads) if forward else max(leads)]
+        
+        query += group_by + ' ORDER BY ' + ', '.join(f'{column} {order_of(column)}' for column in key_columns) + ' LIMIT ?'
+        params = list(params) + [limit]
+        
+        cursor.execute(query, params)
+        return cursor.fetchall()
+    
+    def _approximate_reading_count(self, cursor, k_condition, dtype=None, arm=None, k=None, start_ts=None, end_ts=None):
+        """Rollup tablosundan yaklaşık okuma sayısı (ham tabloda COUNT(*) yapmadan)"""
+        # Tarih aralığı yoksa günlük rollup yeterli (saatlikten ~24 kat küçük)
+        bounded = start_ts is not None or end_ts is not None
+        table = self.ROLLUP_TABLES['hourly' if bounded else 'daily']
+        query = f'SELECT COALESCE(SUM(value_count), 0) FROM {table} WHERE {k_condition}'
+        params = []
+        if dtype is not None:
+            query += ' AND dtype = ?'
+            params.append(dtype)
+        if arm:
+            query += ' AND arm = ?'
+            params.append(arm)
+        if k is not None:
+            query += ' AND k = ?'
+            params.append(k)
+        if start_ts is not None:
+            query += ' AND bucket >= ?'
+            params.append(self._hour_bucket(start_ts))
+        if end_ts is not None:
+            query += ' AND bucket <= ?'
+            params.append(end_ts)
+        cursor.execute(query, params)
+        return cursor.fetchone()[0]
+    
+    def get_logs_with_filters(self, page=1, page_size=50, filters=None, language='tr', cursor=None, include_total=False):
+        """Filtrelenmiş log verilerini getir (keyset sayfalama, toplam sayı opsiyonel ve yaklaşık)"""
         if filters is None:
             filters = {}
         
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
+        with self.get_read_connection() as conn:
+            db_cursor = conn.cursor()
             
             # Temel sorgu - JOIN'de k koşulunu kaldırdık ve çeviri ekle
             query = '''
@@ -1798,30 +2741,24 @@ class BatteryDatabase:
                 elif filters['status'] == 'warning':
                     query += ' AND bd.data BETWEEN 0 AND 50'
             
-            if filters.get('start_date'):
-                start_timestamp = int(datetime.strptime(filters['start_date'], '%Y-%m-%d').timestamp() * 1000)
+            start_timestamp, end_timestamp = self._filter_time_bounds(filters, 'start_date', 'end_date')
+            if start_timestamp is not None:
                 query += ' AND bd.timestamp >= ?'
                 params.append(start_timestamp)
             
-            if filters.get('end_date'):
-                end_timestamp = int(datetime.strptime(filters['end_date'], '%Y-%m-%d').timestamp() * 1000) + (24 * 60 * 60 * 1000) - 1
+            if end_timestamp is not None:
                 query += ' AND bd.timestamp <= ?'
                 params.append(end_timestamp)
             
-            # Toplam sayı
-            count_query = f"SELECT COUNT(*) FROM ({query})"
-            cursor.execute(count_query, params)
-            total_count = cursor.fetchone()[0]
-            
-            # Sayfalama
-            query += ' ORDER BY bd.timestamp DESC LIMIT ? OFFSET ?'
-            params.extend([page_size, (page - 1) * page_size])
-            
-            cursor.execute(query, params)
-            rows = cursor.fetchall()
+            # Sadece filtre aralığındaki aylar sorgulanır (ATTACH sınırını aşarsa dilim dilim)
+            page_data = self._fetch_keyset_page(
+                db_cursor, query, params,
+                ['bd.timestamp', 'bd.arm', 'bd.k', 'bd.dtype'], lambda row: (row[4], row[0], row[1], row[2]),
+                page_size, cursor, time_range=(start_timestamp, end_timestamp)
+            )
             
             logs = []
-            for row in rows:
+            for row in page_data['rows']:
                 logs.append({
                     'arm': row[0],
                     'batteryAddress': row[1],
@@ -1833,266 +2770,276 @@ class BatteryDatabase:
                     'status': 'success'  # Tüm veriler başarılı
                 })
             
-            return {
+            result = {
                 'logs': logs,
-                'totalCount': total_count,
-                'totalPages': (total_count + page_size - 1) // page_size,
-                'currentPage': page
+                'currentPage': page,
+                'hasMore': page_data['hasMore'],
+                'nextCursor': page_data['nextCursor'],
+                'prevCursor': page_data['prevCursor']
             }
+            if include_total:
+                # Durum filtresi rollup'ta yok, yaklaşık sayıya dahil edilmez
+                total_count = self._approximate_reading_count(
+                    db_cursor, '1=1', filters.get('dtype'), filters.get('arm'), filters.get('battery'),
+                    start_timestamp, end_timestamp
+                )
+                result['totalCount'] = total_count
+                result['totalPages'] = max(1, (total_count + page_size - 1) // page_size)
+            return result
     
-    def export_logs_to_csv(self, filters=None):
-        """Log verilerini CSV formatında export et"""
-        if filters is None:
-            filters = {}
+    # CSV export'ta tek seferde okunup yazılan satır sayısı
+    EXPORT_CHUNK_ROWS = 1000
+    
+    def _stream_csv(self, query, params, header, format_row, start_ts=None, end_ts=None, max_rows=None,
+                    key_columns=None, key_of=None, group_by='', ascending=()):
+        """Private: sorgu sonucunu CSV parçaları halinde üret (sabit bellek, chunk başına bir parça)
         
+        key_columns verilirse her chunk ayrı bir keyset sayfasıdır ve okuyucu connection'ı chunk okunur
+        okunmaz havuza döner: yavaş indirmeler havuzu tutmaz, partition'lar dilim dilim okunur.
+        Verilmezse (küçük tablolar) sonuç tek seferde okunur.
+        """
         retry_count = 0
-        max_retries = 5  # Retry sayısını artır
+        max_retries = 5
+        page_cursor = None
+        remaining = max_rows
+        first = True
         
-        while retry_count < max_retries:
+        while True:
+            limit = self.EXPORT_CHUNK_ROWS if remaining is None else min(self.EXPORT_CHUNK_ROWS, remaining)
+            
+            # Kilit hatası sadece ilk chunk okunana kadar tekrar denenebilir (sonrası istemciye gitmiş olur)
             try:
-                with self.get_connection() as conn:
-                    # Read-only mode için optimizasyonlar
-                    conn.execute("PRAGMA query_only = ON")
-                    conn.execute("PRAGMA read_uncommitted = 1")  # Uncommitted read için (write lock beklemez)
+                with self.get_read_connection() as conn:
                     cursor = conn.cursor()
-                    
-                    # Basit SQL ile gruplandırılmış verileri getir
-                    query = '''
-                        SELECT 
-                            timestamp,
-                            arm,
-                            k as batteryAddress,
-                            MAX(CASE WHEN dtype = 10 THEN data END) as voltage,
-                            MAX(CASE WHEN dtype = 11 THEN data END) as health_status,
-                            MAX(CASE WHEN dtype = 12 THEN data END) as temperature,
-                            MAX(CASE WHEN dtype = 13 THEN data END) as positive_pole_temp,
-                            MAX(CASE WHEN dtype = 14 THEN data END) as negative_pole_temp,
-                            MAX(CASE WHEN dtype = 126 THEN data END) as charge_status
-                        FROM battery_data 
-                        WHERE k > 2
-                    '''
-                    
-                    params = []
-                    
-                    # Filtreler
-                    if filters.get('arm'):
-                        query += ' AND arm = ?'
-                        params.append(filters['arm'])
-                    
-                    if filters.get('battery'):
-                        query += ' AND k = ?'
-                        params.append(filters['battery'])
-                    
-                    if filters.get('start_date'):
-                        start_timestamp = int(datetime.strptime(filters['start_date'], '%Y-%m-%d').timestamp() * 1000)
-                        query += ' AND timestamp >= ?'
-                        params.append(start_timestamp)
-                    
-                    if filters.get('end_date'):
-                        end_timestamp = int(datetime.strptime(filters['end_date'], '%Y-%m-%d').timestamp() * 1000) + (24 * 60 * 60 * 1000) - 1
-                        query += ' AND timestamp <= ?'
-                        params.append(end_timestamp)
-                    
-                    query += ' GROUP BY timestamp, arm, k ORDER BY timestamp DESC, k ASC'
-                    
-                    cursor.execute(query, params)
-                    
-                    # CSV formatı - Gruplandırılmış veriler için (UTF-8 BOM ile)
-                    csv_content = "\ufeffZAMAN,KOL,BATARYA ADRESİ,GERİLİM,ŞARJ DURUMU,MODÜL SICAKLIĞI,POZİTİF KUTUP SICAKLIĞI,NEGATİF KUTUP SICAKLIĞI,SAĞLIK DURUMU\n"
-                    
-                    # Chunk olarak işle (memory efficient)
-                    while True:
-                        rows = cursor.fetchmany(1000)  # 1000 satır chunk
-                        if not rows:
-                            break
-                        
-                        for row in rows:
-                            timestamp = datetime.fromtimestamp(row[0] / 1000).strftime('%Y-%m-%d %H:%M:%S')
-                            battery_address = row[2] - 2  # k - 2 olarak göster
-                            
-                            # 0.0 değerlerini de göster, sadece None değerleri için - kullan
-                            voltage = row[3] if row[3] is not None else '-'
-                            health_status = row[4] if row[4] is not None else '-'
-                            temperature = row[5] if row[5] is not None else '-'
-                            positive_pole_temp = row[6] if row[6] is not None else '-'
-                            negative_pole_temp = row[7] if row[7] is not None else '-'
-                            charge_status = row[8] if row[8] is not None else '-'
-                            
-                            csv_content += f"{timestamp},{row[1]},{battery_address},{voltage},{health_status},{temperature},{positive_pole_temp},{negative_pole_temp},{charge_status}\n"
-                    
-                    # Query-only mode'u kapat
-                    conn.execute("PRAGMA query_only = OFF")
-                    return csv_content
-                    
+                    if key_columns is None:
+                        chunk_query, chunk_params = query, list(params)
+                        if max_rows:
+                            chunk_query += ' LIMIT ?'
+                            chunk_params.append(max_rows)
+                        cursor.execute(chunk_query, chunk_params)
+                        rows, page_cursor = cursor.fetchall(), None
+                    else:
+                        page = self._fetch_keyset_page(
+                            cursor, query, params, key_columns, key_of, limit, page_cursor,
+                            group_by=group_by, ascending=ascending, time_range=(start_ts, end_ts)
+                        )
+                        rows, page_cursor = page['rows'], page['nextCursor']
             except sqlite3.OperationalError as e:
-                if "locked" in str(e).lower() and retry_count < max_retries - 1:
+                if first and "locked" in str(e).lower() and retry_count < max_retries - 1:
                     retry_count += 1
                     wait_time = 0.2 * (2 ** retry_count)  # Exponential backoff: 0.4s, 0.8s, 1.6s, 3.2s
                     print(f"⚠️ Veritabanı kilitli, yeniden deneniyor ({retry_count}/{max_retries}) {wait_time}s sonra...")
                     time.sleep(wait_time)
-                else:
-                    raise
-            except Exception as e:
-                print(f"❌ Log export hatası: {e}")
+                    continue
                 raise
+            
+            if first:
+                # UTF-8 BOM ile başlık
+                yield "\ufeff" + header + "\n"
+                first = False
+            if rows:
+                yield "".join(format_row(row) for row in rows)
+            
+            if remaining is not None:
+                remaining -= len(rows)
+            if not page_cursor or (remaining is not None and remaining <= 0):
+                return
+    
+    @staticmethod
+    def _csv_value(value, empty='-'):
+        """Private: CSV hücresi - 0.0 değerleri gösterilir, sadece None boş işaretiyle yazılır"""
+        return empty if value is None else value
     
-    def export_arm_logs_to_csv(self, filters=None):
-        """Kol log verilerini CSV formatında export et"""
+    def export_logs_to_csv(self, filters=None, max_rows=None):
+        """Log verilerini CSV formatında parça parça üret (generator)"""
         if filters is None:
             filters = {}
         
-        retry_count = 0
-        max_retries = 5  # Retry sayısını artır
+        # Basit SQL ile gruplandırılmış verileri getir
+        query = '''
+            SELECT 
+                timestamp,
+                arm,
+                k as batteryAddress,
+                MAX(CASE WHEN dtype = 10 THEN data END) as voltage,
+                MAX(CASE WHEN dtype = 11 THEN data END) as health_status,
+                MAX(CASE WHEN dtype = 12 THEN data END) as temperature,
+                MAX(CASE WHEN dtype = 13 THEN data END) as positive_pole_temp,
+                MAX(CASE WHEN dtype = 14 THEN data END) as negative_pole_temp,
+                MAX(CASE WHEN dtype = 126 THEN data END) as charge_status
+            FROM battery_data 
+        '''
         
-        while retry_count < max_retries:
-            try:
-                with self.get_connection() as conn:
-                    # Read-only mode için optimizasyonlar
-                    conn.execute("PRAGMA query_only = ON")
-                    conn.execute("PRAGMA read_uncommitted = 1")  # Uncommitted read için (write lock beklemez)
-                    cursor = conn.cursor()
-                    
-                    # Basit SQL ile sadece gerekli verileri getir
-                    query = '''
-                        SELECT 
-                            timestamp,
-                            arm,
-                            MAX(CASE WHEN dtype = 10 THEN data END) as current,
-                            MAX(CASE WHEN dtype = 11 THEN data END) as humidity,
-                            MAX(CASE WHEN dtype = 12 THEN data END) as module_temperature,
-                            MAX(CASE WHEN dtype = 13 THEN data END) as ambient_temperature
-                        FROM battery_data 
-                        WHERE k = 2
-                    '''
-                    
-                    params = []
-                    
-                    # Filtreler
-                    if filters.get('arm'):
-                        query += ' AND arm = ?'
-                        params.append(filters['arm'])
-                    
-                    if filters.get('start_date'):
-                        start_timestamp = int(datetime.strptime(filters['start_date'], '%Y-%m-%d').timestamp() * 1000)
-                        query += ' AND timestamp >= ?'
-                        params.append(start_timestamp)
-                    
-                    if filters.get('end_date'):
-                        end_timestamp = int(datetime.strptime(filters['end_date'], '%Y-%m-%d').timestamp() * 1000) + (24 * 60 * 60 * 1000) - 1
-                        query += ' AND timestamp <= ?'
-                        params.append(end_timestamp)
-                    
-                    query += ' GROUP BY timestamp, arm, k ORDER BY timestamp DESC, arm ASC'
-                    
-                    cursor.execute(query, params)
-                    
-                    # CSV formatı - Sadece gerekli alanlar (UTF-8 BOM ile)
-                    csv_content = "\ufeffKOL,ZAMAN,AKIM,NEM,MODÜL SICAKLIĞI,ORTAM SICAKLIĞI\n"
-                    
-                    # Chunk olarak işle (memory efficient)
-                    while True:
-                        rows = cursor.fetchmany(1000)  # 1000 satır chunk
-                        if not rows:
-                            break
-                        
-                        for row in rows:
-                            timestamp = datetime.fromtimestamp(row[0] / 1000).strftime('%Y-%m-%d %H:%M:%S')
-                            
-                            # 0.0 değerlerini de göster, sadece None değerleri için - kullan
-                            current = row[2] if row[2] is not None else '-'
-                            humidity = row[3] if row[3] is not None else '-'
-                            module_temp = row[4] if row[4] is not None else '-'
-                            ambient_temp = row[5] if row[5] is not None else '-'
-                            
-                            csv_content += f"{row[1]},{timestamp},{current},{humidity},{module_temp},{ambient_temp}\n"
-                    
-                    # Query-only mode'u kapat
-                    conn.execute("PRAGMA query_only = OFF")
-                    return csv_content
-                    
-            except sqlite3.OperationalError as e:
-                if "locked" in str(e).lower() and retry_count < max_retries - 1:
-                    retry_count += 1
-                    wait_time = 0.2 * (2 ** retry_count)  # Exponential backoff: 0.4s, 0.8s, 1.6s, 3.2s
-                    print(f"⚠️ Veritabanı kilitli, yeniden deneniyor ({retry_count}/{max_retries}) {wait_time}s sonra...")
-                    time.sleep(wait_time)
-                else:
-                    raise
-            except Exception as e:
-                print(f"❌ Arm log export hatası: {e}")
-                raise
+        params = []
+        
+        # Filtreler (batarya filtresi yoksa k index dışı: (timestamp, arm, k) index'i sırayla taranır)
+        if filters.get('battery'):
+            query += ' WHERE k = ?'
+            params.append(filters['battery'])
+        else:
+            query += ' WHERE +k > 2'
+        
+        if filters.get('arm'):
+            query += ' AND arm = ?'
+            params.append(filters['arm'])
+        
+        start_timestamp, end_timestamp = self._filter_time_bounds(filters, 'start_date', 'end_date')
+        if start_timestamp is not None:
+            query += ' AND timestamp >= ?'
+            params.append(start_timestamp)
+        
+        if end_timestamp is not None:
+            query += ' AND timestamp <= ?'
+            params.append(end_timestamp)
+        
+        
+        value = self._csv_value
+        
+        def format_row(row):
+            timestamp = datetime.fromtimestamp(row[0] / 1000).strftime('%Y-%m-%d %H:%M:%S')
+            battery_address = row[2] - 2  # k - 2 olarak göster
+            return (f"{timestamp},{row[1]},{battery_address},{value(row[3])},{value(row[4])},"
+                    f"{value(row[5])},{value(row[6])},{value(row[7])},{value(row[8])}\n")
+        
+        try:
+            yield from self._stream_csv(
+                query, params,
+                "ZAMAN,KOL,BATARYA ADRESİ,GERİLİM,ŞARJ DURUMU,MODÜL SICAKLIĞI,POZİTİF KUTUP SICAKLIĞI,NEGATİF KUTUP SICAKLIĞI,SAĞLIK DURUMU",
+                format_row, start_timestamp, end_timestamp, max_rows,
+                key_columns=['timestamp', 'arm', 'k'], key_of=lambda row: (row[0], row[1], row[2]),
+                group_by=' GROUP BY timestamp, arm, k', ascending=('arm', 'k')
+            )
+        except Exception as e:
+            print(f"❌ Log export hatası: {e}")
+            raise
+    
+    def export_arm_logs_to_csv(self, filters=None, max_rows=None):
+        """Kol log verilerini CSV formatında parça parça üret (generator)"""
+        if filters is None:
+            filters = {}
+        
+        # Basit SQL ile sadece gerekli verileri getir
+        query = '''
+            SELECT 
+                timestamp,
+                arm,
+                MAX(CASE WHEN dtype = 10 THEN data END) as current,
+                MAX(CASE WHEN dtype = 11 THEN data END) as humidity,
+                MAX(CASE WHEN dtype = 12 THEN data END) as module_temperature,
+                MAX(CASE WHEN dtype = 13 THEN data END) as ambient_temperature
+            FROM battery_data 
+        '''
+        
+        params = []
+        
+        # Filtreler
+        if filters.get('arm'):
+            query += ' WHERE k = 2 AND arm = ?'
+            params.append(filters['arm'])
+        else:
+            query += ' WHERE +k = 2'
+        
+        start_timestamp, end_timestamp = self._filter_time_bounds(filters, 'start_date', 'end_date')
+        if start_timestamp is not None:
+            query += ' AND timestamp >= ?'
+            params.append(start_timestamp)
+        
+        if end_timestamp is not None:
+            query += ' AND timestamp <= ?'
+            params.append(end_timestamp)
+        
+        
+        value = self._csv_value
+        
+        def format_row(row):
+            timestamp = datetime.fromtimestamp(row[0] / 1000).strftime('%Y-%m-%d %H:%M:%S')
+            return f"{row[1]},{timestamp},{value(row[2])},{value(row[3])},{value(row[4])},{value(row[5])}\n"
+        
+        try:
+            yield from self._stream_csv(
+                query, params,
+                "KOL,ZAMAN,AKIM,NEM,MODÜL SICAKLIĞI,ORTAM SICAKLIĞI",
+                format_row, start_timestamp, end_timestamp, max_rows,
+                key_columns=['timestamp', 'arm', 'k'], key_of=lambda row: (row[0], row[1], 2),
+                group_by=' GROUP BY timestamp, arm, k', ascending=('arm', 'k')
+            )
+        except Exception as e:
+            print(f"❌ Arm log export hatası: {e}")
+            raise
+    
+    def estimate_export_rows(self, kind, filters=None):
+        """Export satır sayısı tahmini (ilerleme için, rollup'taki gerilim/akım okuma sayısından)"""
+        if filters is None:
+            filters = {}
+        
+        start_ts, end_ts = self._filter_time_bounds(filters, 'start_date', 'end_date')
+        try:
+            with self.get_read_connection() as conn:
+                cursor = conn.cursor()
+                if kind == 'arm':
+                    # Her kol satırında bir akım (dtype 10) okuması var
+                    return self._approximate_reading_count(cursor, 'k = 2', 10, filters.get('arm'), None, start_ts, end_ts)
+                if kind == 'batteries':
+                    cursor.execute("SELECT COUNT(DISTINCT arm || ':' || k) FROM latest_readings WHERE k > 2")
+                    return cursor.fetchone()[0]
+                # Her batarya satırında bir gerilim (dtype 10) okuması var
+                return self._approximate_reading_count(cursor, 'k > 2', 10, filters.get('arm'), filters.get('battery'), start_ts, end_ts)
+        except Exception as e:
+            print(f"⚠️ Export satır tahmini alınamadı: {e}")
+            return None
 
     def get_batteries_for_display(self, page=1, page_size=30, selected_arm=0, language='tr'):
-        """Batteries sayfası için batarya verilerini getir"""
+        """Batteries sayfası için batarya verilerini getir (latest_readings üzerinden tek sorgu)"""
         
         try:
-            with self.get_connection() as conn:
+            with self.get_read_connection() as conn:
                 cursor = conn.cursor()
                 
-                # Arm filtresi ekle (her zaman bir kol seçilmeli)
-                arm_filter = f"AND bd.arm = {selected_arm}"
-                
-                # arm_slave_counts tablosundan seçili kolun batarya sayısını al
+                # Seçili kolun tüm bataryalarının son değerleri - tek indexli sorgu
+                # k değerleri 3'ten başlar (arm verisi k=2), slave_count kadar olmalı
+                # Örnek: slave_count=7 ise k=3,4,5,6,7,8,9 (7 adet)
                 cursor.execute('''
-                    SELECT slave_count FROM arm_slave_counts 
-                    WHERE arm = ?
-                ''', (selected_arm,))
-                
-                slave_count_result = cursor.fetchone()
-                if not slave_count_result:
-                    print(f"Kol {selected_arm} için slave_count bulunamadı!")
-                    return {
-                        'batteries': [],
-                        'totalPages': 1,
-                        'currentPage': 1
-                    }
+                    SELECT lr.k, lr.dtype, lr.value, lr.timestamp, dt.name,
+                           COALESCE(dtt.name, dt.name) as translated_name
+                    FROM latest_readings lr
+                    LEFT JOIN data_types dt ON lr.dtype = dt.dtype
+                    LEFT JOIN data_type_translations dtt ON lr.dtype = dtt.dtype 
+                        AND dtt.language_code = ?
+                    WHERE lr.arm = ? AND lr.k >= 3 AND lr.k < 3 + (
+                        SELECT slave_count FROM arm_slave_counts 
+                        WHERE arm = ? ORDER BY id DESC LIMIT 1
+                    )
+                    ORDER BY lr.k, lr.dtype
+                ''', (language, selected_arm, selected_arm))
                 
-                slave_count = slave_count_result[0]
-                print(f"Kol {selected_arm} için slave_count: {slave_count}")
+                readings_by_battery = {}
+                for k, dtype, value, timestamp, name, translated_name in cursor.fetchall():
+                    readings_by_battery.setdefault(k, []).append((dtype, value, timestamp, name, translated_name))
                 
-                # Sadece mevcut batarya sayısı kadar batarya getir
-                # k değerleri 3'ten başlar (arm verisi k=2), slave_count kadar olmalı
-                # Örnek: slave_count=7 ise k=3,4,5,6,7,8,9 (7 adet)
-                cursor.execute(f'''
-                    SELECT 
-                        bd.arm,
-                        bd.k as batteryAddress,
-                        MAX(bd.timestamp) as latest_timestamp
-                    FROM battery_data bd
-                    WHERE bd.k != 2 AND bd.k >= 3 AND bd.k < (3 + ?) {arm_filter}
-                    GROUP BY bd.arm, bd.k
-                    ORDER BY bd.arm, bd.k
-                ''', (slave_count,))
-                
-                all_batteries = cursor.fetchall()
-                print(f"Bulunan batarya sayısı: {len(all_batteries)}")
-                print(f"Batarya listesi: {all_batteries}")
-                
-                if not all_batteries:
-                    print("Hiç batarya bulunamadı!")
+                if not readings_by_battery:
+                    print(f"Kol {selected_arm} için batarya bulunamadı!")
                     return {
                         'batteries': [],
                         'totalPages': 1,
                         'currentPage': 1
                     }
                 
+                # Pasif balans durumu kol başına bir kez okunur
+                passive_slave = self._get_passive_balance_slave(cursor, selected_arm)
+                
                 # Sayfalama
+                battery_addresses = sorted(readings_by_battery)
                 start_idx = (page - 1) * page_size
                 end_idx = start_idx + page_size
-                page_batteries = all_batteries[start_idx:end_idx]
-                
-                batteries = []
                 
-                for arm, battery_address, latest_timestamp in page_batteries:
-                    # Her batarya için sadece en son verileri getir
-                    battery_data = self.get_latest_battery_data(arm, battery_address, language)
-                    
-                    if battery_data:
-                        batteries.append(battery_data)
+                batteries = [
+                    self._build_battery_display_row(selected_arm, k, readings_by_battery[k], passive_slave)
+                    for k in battery_addresses[start_idx:end_idx]
+                ]
                 
                 return {
                     'batteries': batteries,
-                    'totalPages': (len(all_batteries) + page_size - 1) // page_size,
+                    'totalPages': (len(battery_addresses) + page_size - 1) // page_size,
                     'currentPage': 1
                 }
         except Exception as e:
@@ -2102,200 +3049,123 @@ class BatteryDatabase:
     def get_latest_battery_data(self, arm, battery_address, language='tr'):
         """Belirli bir batarya için son verileri getir"""
         try:
-            with self.get_connection() as conn:
+            with self.get_read_connection() as conn:
                 cursor = conn.cursor()
                 
-                # En son veri zamanını bul
                 cursor.execute('''
-                    SELECT MAX(timestamp) FROM battery_data 
-                    WHERE arm = ? AND k = ?
-                ''', (arm, battery_address))
-                
-                latest_timestamp = cursor.fetchone()[0]
-                
-                if not latest_timestamp:
-                    return None
-                
-                # Debug: Dil parametresini yazdır
-                
-                
-                # Sadece en son verileri getir (en son timestamp'teki tüm dtype'lar)
-                cursor.execute('''
-                    SELECT bd.dtype, bd.data, dt.name, dt.unit,
+                    SELECT lr.dtype, lr.value, lr.timestamp, dt.name,
                            COALESCE(dtt.name, dt.name) as translated_name
-                    FROM battery_data bd
-                    LEFT JOIN data_types dt ON bd.dtype = dt.dtype
-                    LEFT JOIN data_type_translations dtt ON dt.dtype = dtt.dtype 
+                    FROM latest_readings lr
+                    LEFT JOIN data_types dt ON lr.dtype = dt.dtype
+                    LEFT JOIN data_type_translations dtt ON lr.dtype = dtt.dtype 
                         AND dtt.language_code = ?
-                    WHERE bd.arm = ? AND bd.k = ? AND bd.timestamp = ?
-                    ORDER BY bd.dtype
-                ''', (language, arm, battery_address, latest_timestamp))
-                
-                data_rows = cursor.fetchall()
-                
-                # Debug: Veri satırlarını yazdır
-            
-                
-                # Pasif balans durumunu kontrol et
-                passive_balance_status = self.check_passive_balance_status(arm, battery_address)
-                
-                # Veri tiplerine göre organize et
-                battery_data = {
-                    'arm': arm,
-                    'batteryAddress': battery_address,
-                    'timestamp': latest_timestamp,
-                    'voltage': None,
-                    'temperature': None,
-                    'health': None,
-                    'charge': None,
-                    'isActive': not passive_balance_status,  # Pasif balansta ise aktif değil
-                    'passiveBalance': passive_balance_status
-                }
+                    WHERE lr.arm = ? AND lr.k = ?
+                    ORDER BY lr.dtype
+                ''', (language, arm, battery_address))
                 
-                # Sadece en son verileri kullan
-                for dtype, data, name, unit, translated_name in data_rows:
-                    if dtype == 10:  # Gerilim
-                        battery_data['voltage'] = data
-                        battery_data['voltage_name'] = translated_name or name
-                    elif dtype == 11:  # Sağlık durumu (SOH)
-                        battery_data['health'] = data
-                        battery_data['health_name'] = translated_name or name
-                    elif dtype == 12:  # Sıcaklık
-                        battery_data['temperature'] = data
-                        battery_data['temperature_name'] = translated_name or name
-                    elif dtype == 126:  # Şarj durumu (SOC)
-                        battery_data['charge'] = data
-                        battery_data['charge_name'] = translated_name or name
-                
-                # Eksik veri alanları için en son veriyi getir
-                if battery_data['voltage'] is None:
-                    cursor.execute('''
-                        SELECT data FROM battery_data 
-                        WHERE arm = ? AND k = ? AND dtype = 10 
-                        ORDER BY timestamp DESC LIMIT 1
-                    ''', (arm, battery_address))
-                    result = cursor.fetchone()
-                    battery_data['voltage'] = result[0] if result else 0
-                
-                if battery_data['health'] is None:
-                    cursor.execute('''
-                        SELECT data FROM battery_data 
-                        WHERE arm = ? AND k = ? AND dtype = 11 
-                        ORDER BY timestamp DESC LIMIT 1
-                    ''', (arm, battery_address))
-                    result = cursor.fetchone()
-                    battery_data['health'] = result[0] if result else 0
-                
-                if battery_data['temperature'] is None:
-                    cursor.execute('''
-                        SELECT data FROM battery_data 
-                        WHERE arm = ? AND k = ? AND dtype = 12 
-                        ORDER BY timestamp DESC LIMIT 1
-                    ''', (arm, battery_address))
-                    result = cursor.fetchone()
-                    battery_data['temperature'] = result[0] if result else 0
-                
-                if battery_data['charge'] is None:
-                    cursor.execute('''
-                        SELECT data FROM battery_data 
-                        WHERE arm = ? AND k = ? AND dtype = 126 
-                        ORDER BY timestamp DESC LIMIT 1
-                    ''', (arm, battery_address))
-                    result = cursor.fetchone()
-                    battery_data['charge'] = result[0] if result else 0
+                readings = cursor.fetchall()
+                if not readings:
+                    return None
                 
-                return battery_data
+                passive_slave = self._get_passive_balance_slave(cursor, arm)
+                return self._build_battery_display_row(arm, battery_address, readings, passive_slave)
         except Exception as e:
             print(f"get_latest_battery_data hatası (arm: {arm}, battery: {battery_address}): {e}")
             return None
     
+    def _get_passive_balance_slave(self, cursor, arm):
+        """Private: Kolda pasif balansta olan bataryanın k değerini döndür (yoksa None)"""
+        cursor.execute('''
+            SELECT slave, status FROM passive_balance 
+            WHERE arm = ?
+            ORDER BY timestamp DESC LIMIT 1
+        ''', (arm,))
+        
+        result = cursor.fetchone()
+        if result and result[1] == 0:
+            return result[0]
+        return None
+    
+    def _build_battery_display_row(self, arm, battery_address, readings, passive_slave):
+        """Private: latest_readings satırlarından batteries sayfası kaydını oluştur"""
+        passive_balance_status = passive_slave == battery_address
+        
+        battery_data = {
+            'arm': arm,
+            'batteryAddress': battery_address,
+            'timestamp': max(reading[2] for reading in readings),
+            'voltage': None,
+            'temperature': None,
+            'health': None,
+            'charge': None,
+            'isActive': not passive_balance_status,  # Pasif balansta ise aktif değil
+            'passiveBalance': passive_balance_status
+        }
+        
+        # dtype -> alan adı eşlemesi
+        field_by_dtype = {
+            10: 'voltage',      # Gerilim
+            11: 'health',       # Sağlık durumu (SOH)
+            12: 'temperature',  # Sıcaklık
+            126: 'charge'       # Şarj durumu (SOC)
+        }
+        
+        for dtype, value, timestamp, name, translated_name in readings:
+            field = field_by_dtype.get(dtype)
+            if field:
+                battery_data[field] = value
+                battery_data[f'{field}_name'] = translated_name or name
+        
+        # Hiç gelmemiş veri alanları 0 gösterilir
+        for field in field_by_dtype.values():
+            if battery_data[field] is None:
+                battery_data[field] = 0
+        
+        return battery_data
+    
     def check_passive_balance_status(self, arm, battery_address):
         """Bataryanın pasif balansta olup olmadığını kontrol et"""
         try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                # Pasif balans kaydını kontrol et
-                cursor.execute('''
-                    SELECT slave, status FROM passive_balance 
-                    WHERE arm = ?
-                    ORDER BY timestamp DESC LIMIT 1
-                ''', (arm,))
-                
-                result = cursor.fetchone()
-                if result:
-                    slave, status = result
-                    # Eğer bu batarya pasif balansta ise (status=0 ve slave=battery_address)
-                    return slave == battery_address and status == 0
-                
-                return False
+            with self.get_read_connection() as conn:
+                # Eğer bu batarya pasif balansta ise (status=0 ve slave=battery_address)
+                return self._get_passive_balance_slave(conn.cursor(), arm) == battery_address
                 
         except Exception as e:
             print(f"Pasif balans durumu kontrol hatası: {e}")
             return False
     
-    def export_batteries_to_csv(self):
-        """Batarya verilerini CSV formatında export et"""
+    def export_batteries_to_csv(self, max_rows=None):
+        """Batarya verilerini CSV formatında parça parça üret (latest_readings üzerinden tek sorgu)"""
+        # Her batarya için son değerler ve en son veri zamanı
+        query = '''
+            SELECT 
+                arm,
+                k as batteryAddress,
+                MAX(timestamp) as latest_timestamp,
+                MAX(CASE WHEN dtype = 10 THEN value END) as voltage,
+                MAX(CASE WHEN dtype = 12 THEN value END) as temperature,
+                MAX(CASE WHEN dtype = 11 THEN value END) as health,
+                MAX(CASE WHEN dtype = 126 THEN value END) as charge
+            FROM latest_readings
+            WHERE k != 2
+            GROUP BY arm, k
+            ORDER BY arm, k
+        '''
         
-        retry_count = 0
-        max_retries = 5  # Retry sayısını artır
+        def format_row(row):
+            timestamp = datetime.fromtimestamp(row[2] / 1000).strftime('%Y-%m-%d %H:%M:%S')
+            return (f"{row[0]},{row[1]},{timestamp},{row[3] or '--'},{row[4] or '--'},"
+                    f"{row[6] or '--'},{row[5] or '--'}\n")
         
-        while retry_count < max_retries:
-            try:
-                with self.get_connection() as conn:
-                    # Read-only mode için optimizasyonlar
-                    conn.execute("PRAGMA query_only = ON")
-                    conn.execute("PRAGMA read_uncommitted = 1")  # Uncommitted read için (write lock beklemez)
-                    cursor = conn.cursor()
-                    
-                    # Her batarya için en son veri zamanını bul
-                    base_query = '''
-                        SELECT 
-                            bd.arm,
-                            bd.k as batteryAddress,
-                            MAX(bd.timestamp) as latest_timestamp
-                        FROM battery_data bd
-                        WHERE bd.k != 2
-                        GROUP BY bd.arm, bd.k 
-                        ORDER BY bd.arm, bd.k
-                    '''
-                    
-                    cursor.execute(base_query)
-                    battery_groups = cursor.fetchall()
-                    
-                    # CSV formatı (UTF-8 BOM ile)
-                    csv_content = "\ufeffKOL,BATARYA ADRESİ,SON GÜNCELLEME,GERİLİM (V),SICAKLIK (°C),SAĞLIK DURUMU (%),ŞARJ DURUMU (%)\n"
-                    
-                    for group in battery_groups:
-                        arm, battery_address, latest_timestamp = group
-                        
-                        # Her batarya için sadece en son verileri getir
-                        battery_data = self.get_latest_battery_data(arm, battery_address)
-                        
-                        if battery_data:
-                            timestamp = datetime.fromtimestamp(latest_timestamp / 1000).strftime('%Y-%m-%d %H:%M:%S')
-                            
-                            csv_content += f"{arm},{battery_address},{timestamp},"
-                            csv_content += f"{battery_data['voltage'] or '--'},"
-                            csv_content += f"{battery_data['temperature'] or '--'},"
-                            csv_content += f"{battery_data['charge'] or '--'},"
-                            csv_content += f"{battery_data['health'] or '--'}\n"
-                    
-                    # Query-only mode'u kapat
-                    conn.execute("PRAGMA query_only = OFF")
-                    return csv_content
-                    
-            except sqlite3.OperationalError as e:
-                if "locked" in str(e).lower() and retry_count < max_retries - 1:
-                    retry_count += 1
-                    wait_time = 0.2 * (2 ** retry_count)  # Exponential backoff: 0.4s, 0.8s, 1.6s, 3.2s
-                    print(f"⚠️ Veritabanı kilitli, yeniden deneniyor ({retry_count}/{max_retries}) {wait_time}s sonra...")
-                    time.sleep(wait_time)
-                else:
-                    raise
-            except Exception as e:
-                print(f"❌ Batteries export hatası: {e}")
-                raise
+        try:
+            yield from self._stream_csv(
+                query, [],
+                "KOL,BATARYA ADRESİ,SON GÜNCELLEME,GERİLİM (V),SICAKLIK (°C),SAĞLIK DURUMU (%),ŞARJ DURUMU (%)",
+                format_row, max_rows=max_rows
+            )
+        except Exception as e:
+            print(f"❌ Batteries export hatası: {e}")
+            raise
     
     def get_database_size(self):
         """Veritabanı boyutunu MB cinsinden döndür"""
@@ -2305,148 +3175,61 @@ class BatteryDatabase:
         return 0
     
     def get_summary_data(self):
-        """Özet sayfası için veri getir - son 10 dakikada verisi gelen kollar"""
+        """Özet sayfası için veri getir - latest_readings üzerinden tek sorgu"""
         try:
-            with self.get_connection() as conn:
+            with self.get_read_connection() as conn:
                 cursor = conn.cursor()
                 
-                # Sadece arm_slave_counts tablosunda bataryası olan kolları getir
+                # Bataryası olan kolların son değerleri (k=2 kol verisi + bataryalar)
                 cursor.execute('''
-                    SELECT asc.arm, asc.slave_count
-                    FROM arm_slave_counts asc
-                    WHERE asc.slave_count > 0
-                    ORDER BY asc.arm
+                    SELECT lr.arm, lr.k, lr.dtype, lr.value, lr.timestamp, asc.slave_count
+                    FROM latest_readings lr
+                    JOIN arm_slave_counts asc ON asc.arm = lr.arm
+                    WHERE asc.id IN (SELECT MAX(id) FROM arm_slave_counts GROUP BY arm)
+                      AND asc.slave_count > 0
+                      AND (lr.k = 2 OR (lr.k >= 3 AND lr.k < 3 + asc.slave_count))
+                    ORDER BY lr.arm
                 ''')
                 
-                active_arms = cursor.fetchall()
-                summary_data = []
-                
-                for arm, slave_count in active_arms:
-                    # Bu kol için en son veriyi bul
-                    cursor.execute('''
-                        SELECT MAX(timestamp) as latest_timestamp
-                        FROM battery_data
-                        WHERE arm = ?
-                    ''', (arm,))
-                    
-                    latest_timestamp = cursor.fetchone()[0]
-                    if not latest_timestamp:
-                        continue
-                    
-                    # Bu kol için nem, sıcaklık ve akım bilgisini al (k=2)
-                    cursor.execute('''
-                        SELECT bd.dtype, bd.data, dt.name, dt.unit
-                        FROM battery_data bd
-                        LEFT JOIN data_types dt ON bd.dtype = dt.dtype
-                        WHERE bd.arm = ? AND bd.k = 2 AND bd.timestamp = ?
-                        ORDER BY bd.dtype
-                    ''', (arm, latest_timestamp))
-                    
-                    arm_data = cursor.fetchall()
-                    
-                    print(f"Kol {arm} için k=2 verileri: {arm_data}")
-                    
-                    # Nem, sıcaklık ve akım değerlerini al
-                    humidity = None
-                    temperature = None
-                    current = None
-                    
-                    for dtype, data, name, unit in arm_data:
-                        print(f"  dtype={dtype}, data={data}, name={name}, unit={unit}")
-                        if dtype == 10 and data is not None:  # Akım (dtype=10, k=2)
-                            current = data
-                            print(f"    Akım bulundu: {current}")
-                        elif dtype == 11 and data is not None:  # Nem (dtype=11, k=2)
-                            humidity = data
-                            print(f"    Nem bulundu: {humidity}")
-                        elif dtype == 12 and data is not None:  # Sıcaklık (dtype=12, k=2)
-                            temperature = data
-                            print(f"    Sıcaklık bulundu: {temperature}")
-                    
-                    # Batarya sayısı zaten slave_count'tan geldi
-                    battery_count = slave_count
+                arms = {}
+                for arm, k, dtype, value, timestamp, slave_count in cursor.fetchall():
+                    arm_info = arms.setdefault(arm, {
+                        'slave_count': slave_count,
+                        'timestamp': timestamp,
+                        'arm_values': {},
+                        'battery_values': {10: [], 11: [], 126: []}
+                    })
+                    arm_info['timestamp'] = max(arm_info['timestamp'], timestamp)
                     
-                    # Ortalama değerleri hesapla
-                    cursor.execute('''
-                        SELECT 
-                            AVG(CASE WHEN bd.dtype = 10 THEN bd.data END) as avg_voltage,
-                            AVG(CASE WHEN bd.dtype = 11 THEN bd.data END) as avg_health,
-                            AVG(CASE WHEN bd.dtype = 126 THEN bd.data END) as avg_charge
-                        FROM battery_data bd
-                        WHERE bd.arm = ? AND bd.k != 2 AND bd.timestamp = ?
-                    ''', (arm, latest_timestamp))
+                    if k == 2:
+                        arm_info['arm_values'][dtype] = value
+                    elif dtype in arm_info['battery_values'] and value is not None:
+                        arm_info['battery_values'][dtype].append(value)
+                
+                def average(values):
+                    return sum(values) / len(values) if values else 0
+                
+                summary_data = []
+                for arm in sorted(arms):
+                    arm_info = arms[arm]
+                    arm_values = arm_info['arm_values']
+                    battery_values = arm_info['battery_values']
                     
-                    battery_stats = cursor.fetchone()
+                    avg_voltage = average(battery_values[10])
+                    avg_health = average(battery_values[11])
+                    avg_charge = average(battery_values[126])
                     
-                    if battery_stats:
-                        avg_voltage, avg_health, avg_charge = battery_stats
-                        
-                        # Eksik veri alanları için en son veriyi getir
-                        if current is None:
-                            cursor.execute('''
-                                SELECT data FROM battery_data 
-                                WHERE arm = ? AND k = 2 AND dtype = 10 
-                                ORDER BY timestamp DESC LIMIT 1
-                            ''', (arm,))
-                            result = cursor.fetchone()
-                            current = result[0] if result else 0
-                        
-                        if humidity is None:
-                            cursor.execute('''
-                                SELECT data FROM battery_data 
-                                WHERE arm = ? AND k = 2 AND dtype = 11 
-                                ORDER BY timestamp DESC LIMIT 1
-                            ''', (arm,))
-                            result = cursor.fetchone()
-                            humidity = result[0] if result else 0
-                        
-                        if temperature is None:
-                            cursor.execute('''
-                                SELECT data FROM battery_data 
-                                WHERE arm = ? AND k = 2 AND dtype = 12 
-                                ORDER BY timestamp DESC LIMIT 1
-                            ''', (arm,))
-                            result = cursor.fetchone()
-                            temperature = result[0] if result else 0
-                        
-                        if avg_voltage is None:
-                            cursor.execute('''
-                                SELECT AVG(data) FROM battery_data 
-                                WHERE arm = ? AND k > 2 AND dtype = 10 
-                                ORDER BY timestamp DESC LIMIT 10
-                            ''', (arm,))
-                            result = cursor.fetchone()
-                            avg_voltage = result[0] if result else 0
-                        
-                        if avg_health is None:
-                            cursor.execute('''
-                                SELECT AVG(data) FROM battery_data 
-                                WHERE arm = ? AND k > 2 AND dtype = 11 
-                                ORDER BY timestamp DESC LIMIT 10
-                            ''', (arm,))
-                            result = cursor.fetchone()
-                            avg_health = result[0] if result else 0
-                        
-                        if avg_charge is None:
-                            cursor.execute('''
-                                SELECT AVG(data) FROM battery_data 
-                                WHERE arm = ? AND k > 2 AND dtype = 126 
-                                ORDER BY timestamp DESC LIMIT 10
-                            ''', (arm,))
-                            result = cursor.fetchone()
-                            avg_charge = result[0] if result else 0
-                        
-                        summary_data.append({
-                            'arm': arm,
-                            'timestamp': latest_timestamp,
-                            'current': current,
-                            'humidity': humidity,
-                            'temperature': temperature,
-                            'battery_count': battery_count or 0,
-                            'avg_voltage': round(avg_voltage, 3) if avg_voltage else 0,
-                            'avg_health': round(avg_health, 3) if avg_health else 0,
-                            'avg_charge': round(avg_charge, 3) if avg_charge else 0
-                        })
+                    summary_data.append({
+                        'arm': arm,
+                        'timestamp': arm_info['timestamp'],
+                        'current': arm_values.get(10) or 0,      # Akım (dtype=10, k=2)
+                        'humidity': arm_values.get(11) or 0,     # Nem (dtype=11, k=2)
+                        'temperature': arm_values.get(12) or 0,  # Sıcaklık (dtype=12, k=2)
+                        'battery_count': arm_info['slave_count'] or 0,
+                        'avg_voltage': round(avg_voltage, 3) if avg_voltage else 0,
+                        'avg_health': round(avg_health, 3) if avg_health else 0,
+                        'avg_charge': round(avg_charge, 3) if avg_charge else 0
+                    })
                 
                 return summary_data
                 
@@ -2457,7 +3240,7 @@ class BatteryDatabase:
     def get_mail_recipients(self):
         """Aktif mail alıcılarını getir"""
         try:
-            with self.get_connection() as conn:
+            with self.get_read_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT id, name, email, is_active, created_at
@@ -2566,14 +3349,16 @@ class BatteryDatabase:
                         alarm['battery'],
                         alarm['error_code_msb'],
                         alarm['error_code_lsb'],
-                        alarm['timestamp']
+                        alarm['timestamp'],
+                        int(alarm_codes.is_valid_alarm(alarm['error_code_msb'], alarm['error_code_lsb']))
                     ))
                 
                 # Toplu insert
                 cursor.executemany('''
-                    INSERT INTO alarms (arm, battery, error_code_msb, error_code_lsb, timestamp)
-                    VALUES (?, ?, ?, ?, ?)
+                    INSERT INTO alarms (arm, battery, error_code_msb, error_code_lsb, timestamp, is_valid)
+                    VALUES (?, ?, ?, ?, ?, ?)
                 ''', alarm_data)
+                self._refresh_alarm_counter(cursor)
                 
                 conn.commit()
                 print(f"✅ {len(alarms)} alarm toplu olarak kaydedildi")
@@ -2596,6 +3381,7 @@ class BatteryDatabase:
                     SET status = 'resolved', resolved_at = ?
                     WHERE id = ? AND status = 'active'
                 ''', [(current_time, alarm_id) for alarm_id in alarm_ids])
+                self._refresh_alarm_counter(cursor)
                 
                 conn.commit()
                 print(f"✅ {len(alarm_ids)} alarm toplu olarak düzeltildi")
@@ -2604,11 +3390,103 @@ class BatteryDatabase:
         except Exception as e:
             print(f"❌ Alarm toplu düzeltme hatası: {e}")
             return False
+    
+    def get_active_alarm_index(self):
+        """Aktif alarm episode'larını (arm, battery) -> {(msb, lsb): alarm id} olarak getir (AlarmProcessor başlangıcı için)"""
+        with self.get_read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT arm, battery, error_code_msb, error_code_lsb, MAX(id) FROM alarms 
+                WHERE status = 'active'
+                GROUP BY arm, battery, error_code_msb, error_code_lsb
+            ''')
+            index = {}
+            for arm, battery, error_msb, error_lsb, alarm_id in cursor.fetchall():
+                index.setdefault((arm, battery), {})[(error_msb, error_lsb)] = alarm_id
+            return index
+    
+    def record_alarm_episodes(self, raised_alarms, repeats):
+        """Yeni alarm episode'larını ekle, devam edenlerin tekrar sayısını artır (tek transaction)
+        
+        raised_alarms: alarm sözlükleri listesi, repeats: {alarm id: (tekrar sayısı, son görülme ms)}
+        Eklenen alarmların id listesini (raised_alarms sırasıyla) döndürür, hata durumunda None
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
+                try:
+                    alarm_ids = []
+                    for alarm in raised_alarms:
+                        cursor.execute('''
+                            INSERT INTO alarms (arm, battery, error_code_msb, error_code_lsb, timestamp, occurrence_count, last_seen, is_valid)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                        ''', (alarm['arm'], alarm['battery'], alarm['error_code_msb'], alarm['error_code_lsb'],
+                              alarm['timestamp'], alarm.get('occurrence_count', 1), alarm.get('last_seen', alarm['timestamp']),
+                              int(alarm_codes.is_valid_alarm(alarm['error_code_msb'], alarm['error_code_lsb']))))
+                        alarm_ids.append(cursor.lastrowid)
+                    
+                    if repeats:
+                        cursor.executemany('''
+                            UPDATE alarms 
+                            SET occurrence_count = occurrence_count + ?,
+                                last_seen = MAX(COALESCE(last_seen, timestamp), ?)
+                            WHERE id = ? AND status = 'active'
+                        ''', [(count, last_seen, alarm_id) for alarm_id, (count, last_seen) in repeats.items()])
+                    
+                    self._refresh_alarm_counter(cursor)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                
+                print(f"✅ {len(raised_alarms)} yeni alarm kaydedildi, {len(repeats)} devam eden alarm güncellendi")
+                return alarm_ids
+                
+        except Exception as e:
+            print(f"❌ Alarm episode kayıt hatası: {e}")
+            return None
+    
+    def resolve_active_alarms(self, keys):
+        """Verilen (arm, battery) anahtarlarının aktif alarmlarını tek transaction'da set bazlı düzelt"""
+        keys = list(keys)
+        if not keys:
+            return 0
+        
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                resolved = 0
+                
+                cursor.execute("BEGIN IMMEDIATE")
+                try:
+                    # SQLite parametre sınırı için anahtarlar parça parça, aynı transaction içinde
+                    for i in range(0, len(keys), 400):
+                        chunk = keys[i:i + 400]
+                        values = ', '.join(['(?, ?)'] * len(chunk))
+                        cursor.execute(f'''
+                            UPDATE alarms 
+                            SET status = 'resolved', resolved_at = ?
+                            WHERE status = 'active' AND (arm, battery) IN (VALUES {values})
+                        ''', [current_time] + [value for key in chunk for value in key])
+                        resolved += cursor.rowcount
+                    self._refresh_alarm_counter(cursor)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                
+                return resolved
+                
+        except Exception as e:
+            print(f"❌ Alarm toplu düzeltme hatası: {e}")
+            return None
 
     def get_batconfigs(self):
         """Tüm batarya konfigürasyonlarını getir"""
         try:
-            with self.get_connection() as conn:
+            with self.get_read_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT armValue, Vmin, Vmax, Vnom, Rintnom, Tempmin_D, Tempmax_D, 
@@ -2646,7 +3524,7 @@ class BatteryDatabase:
     def get_armconfigs(self):
         """Tüm kol konfigürasyonlarını getir"""
         try:
-            with self.get_connection() as conn:
+            with self.get_read_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT armValue, akimKats, akimMax, nemMax, nemMin, tempMax, tempMin, time, created_at
@@ -2676,17 +3554,102 @@ class BatteryDatabase:
             print(f"get_armconfigs hatası: {e}")
             return []
     
-    def get_grouped_battery_logs(self, page=1, page_size=50, filters=None, language='tr'):
-        """Gruplandırılmış batarya log verilerini getir"""
+    def get_retrieved_data_since(self, start_timestamp, after=None):
+        """Veri alma periyodunda (timestamp, id) anahtarı after'dan sonra eklenen satırların gruplarını getir
+
+        Yeni satırların dokunduğu (timestamp, arm, k) grupları tüm dtype'larıyla yeniden toplanır:
+        önceki yoklamada yarım kalan bir grup (başka flush'ta gelen dtype) güncel haliyle tekrar gelir.
+        Dönen (satırlar, son anahtar); yeni satır yoksa anahtar değişmez.
+        """
+        try:
+            with self.get_read_connection() as conn:
+                db_cursor = conn.cursor()
+
+                if after:
+                    last_timestamp, last_id = after
+                    where = 'timestamp >= ? AND k > 2 AND (timestamp > ? OR id > ?)'
+                    params = [max(start_timestamp, last_timestamp), last_timestamp, last_id]
+                else:
+                    where = 'timestamp >= ? AND k > 2'
+                    params = [start_timestamp]
+
+                query = self.route_battery_data(conn, f'''
+                    SELECT timestamp, arm, k, MAX(id)
+                    FROM battery_data
+                    WHERE {where}
+                    GROUP BY timestamp, arm, k
+                ''', params[0])
+                db_cursor.execute(query, params)
+                touched = db_cursor.fetchall()
+                if not touched:
+                    return [], after
+
+                last_key = max((row[0], row[3]) for row in touched)
+                keys = sorted(row[:3] for row in touched)
+
+                rows = []
+                for i in range(0, len(keys), 300):
+                    chunk = keys[i:i + 300]
+                    values = ', '.join(['(?, ?, ?)'] * len(chunk))
+                    query = self.route_battery_data(conn, f'''
+                        SELECT
+                            timestamp,
+                            arm,
+                            (k - 2) as address,
+                            MAX(CASE WHEN dtype = 10 THEN data END) as voltage,
+                            MAX(CASE WHEN dtype = 11 THEN data END) as health_status,
+                            MAX(CASE WHEN dtype = 12 THEN data END) as temperature,
+                            MAX(CASE WHEN dtype = 13 THEN data END) as positive_pole_temp,
+                            MAX(CASE WHEN dtype = 14 THEN data END) as negative_pole_temp,
+                            MAX(CASE WHEN dtype = 15 THEN data END) as ntc3_temp,
+                            MAX(CASE WHEN dtype = 126 THEN data END) as charge_status
+                        FROM battery_data
+                        WHERE timestamp BETWEEN ? AND ? AND (timestamp, arm, k) IN (VALUES {values})
+                        GROUP BY timestamp, arm, k
+                        ORDER BY timestamp ASC, arm ASC, k ASC
+                    ''', chunk[0][0], chunk[-1][0])
+                    db_cursor.execute(query, [chunk[0][0], chunk[-1][0]] + [value for key in chunk for value in key])
+                    rows.extend(db_cursor.fetchall())
+
+                return rows, last_key
+        except Exception as e:
+            print(f"❌ Veri alma satırları getirilemedi: {e}")
+            raise
+
+    def get_grouped_battery_logs(self, page=1, page_size=50, filters=None, language='tr', cursor=None, include_total=False):
+        """Gruplandırılmış batarya log verilerini getir ((timestamp, arm, k) üzerinde keyset sayfalama)"""
         if filters is None:
             filters = {}
         
         try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
+            with self.get_read_connection() as conn:
+                db_cursor = conn.cursor()
                 
-                # Hızlı SQL - sadece mevcut verileri getir
-                query = '''
+                params = []
+                battery_k = int(filters['battery']) + 2 if filters.get('battery') else None
+                
+                # Batarya filtresi yoksa arm/k index dışı bırakılır: (timestamp, arm, k) index'i
+                # ters taranıp LIMIT'te durur, derin sayfalar da ilk sayfa kadar ucuzdur
+                if battery_k is not None:
+                    where = 'k = ?'
+                    params.append(battery_k)
+                else:
+                    where = '+k > 2'
+                
+                if filters.get('arm'):
+                    where += ' AND arm = ?' if battery_k is not None else ' AND +arm = ?'
+                    params.append(filters['arm'])
+                
+                start_timestamp, end_timestamp = self._filter_time_bounds(filters, 'startDate', 'endDate')
+                if start_timestamp is not None:
+                    where += ' AND timestamp >= ?'
+                    params.append(start_timestamp)
+                
+                if end_timestamp is not None:
+                    where += ' AND timestamp <= ?'
+                    params.append(end_timestamp)
+                
+                query = f'''
                     SELECT 
                         timestamp,
                         arm,
@@ -2698,37 +3661,17 @@ class BatteryDatabase:
                         MAX(CASE WHEN dtype = 14 THEN data END) as negative_pole_temp,
                         MAX(CASE WHEN dtype = 126 THEN data END) as charge_status
                     FROM battery_data 
-                    WHERE k > 2
+                    WHERE {where}
                 '''
+                page_data = self._fetch_keyset_page(
+                    db_cursor, query, params,
+                    ['timestamp', 'arm', 'k'], lambda row: (row[0], row[1], row[2]),
+                    page_size, cursor, group_by=' GROUP BY timestamp, arm, k', ascending=('arm', 'k'),
+                    time_range=(start_timestamp, end_timestamp)
+                )
                 
-                params = []
-                
-                if filters.get('arm'):
-                    query += ' AND arm = ?'
-                    params.append(filters['arm'])
-                
-                if filters.get('battery'):
-                    query += ' AND k = ?'
-                    params.append(int(filters['battery']) + 2)
-                
-                if filters.get('startDate'):
-                    start_timestamp = int(datetime.strptime(filters['startDate'], '%Y-%m-%d').timestamp() * 1000)
-                    query += ' AND timestamp >= ?'
-                    params.append(start_timestamp)
-                
-                if filters.get('endDate'):
-                    end_timestamp = int(datetime.strptime(filters['endDate'], '%Y-%m-%d').timestamp() * 1000) + (24 * 60 * 60 * 1000) - 1
-                    query += ' AND timestamp <= ?'
-                    params.append(end_timestamp)
-                
-                query += ' GROUP BY timestamp, arm, k ORDER BY timestamp DESC, k ASC LIMIT ? OFFSET ?'
-                params.extend([page_size, (page - 1) * page_size])
-                
-                print(f"DEBUG database.py: Query: {query}")
-                print(f"DEBUG database.py: Params: {params}")
-                
-                cursor.execute(query, params)
-                rows = cursor.fetchall()
+                # Aynı periyot içinde kol/batarya sırası artan (sayfa sınırında da korunur)
+                rows = page_data['rows']
                 
                 # Verileri formatla
                 logs = []
@@ -2745,72 +3688,78 @@ class BatteryDatabase:
                         'charge_status': row[8]
                     })
                 
-                # COUNT sorgusu kaldırıldı - performans için
-                # Toplam sayfa sayısı gösterilmiyor, sadece sayfalama var
-                
-                # Eğer gelen kayıt sayısı page_size'dan azsa, son sayfadayız
-                has_more = len(logs) == page_size
-                
-                print(f"DEBUG database.py: {len(logs)} log verisi döndürüldü, sayfa: {page}, daha fazla var: {has_more}")
+                print(f"DEBUG database.py: {len(logs)} log verisi döndürüldü, sayfa: {page}, daha fazla var: {page_data['hasMore']}")
                 
-                return {
+                result = {
                     'logs': logs,
                     'currentPage': page,
-                    'hasMore': has_more  # Daha fazla kayıt var mı? (COUNT sorgusu yapılmıyor - performans için)
+                    'hasMore': page_data['hasMore'],
+                    'nextCursor': page_data['nextCursor'],
+                    'prevCursor': page_data['prevCursor']
                 }
+                if include_total:
+                    # Her grup bir gerilim okuması içerir, saatlik rollup'tan yaklaşık sayı
+                    result['totalCount'] = self._approximate_reading_count(
+                        db_cursor, 'k > 2', 10, filters.get('arm'), battery_k, start_timestamp, end_timestamp
+                    )
+                return result
+        except ValueError:
+            raise
         except Exception as e:
             print(f"DEBUG database.py: Hata oluştu: {e}")
             import traceback
             traceback.print_exc()
             raise e
     
-    def get_grouped_arm_logs(self, page=1, page_size=50, filters=None, language='tr'):
-        """Gruplandırılmış kol log verilerini getir"""
-        print(f"DEBUG database.py: get_grouped_arm_logs çağrıldı - page={page}, page_size={page_size}, filters={filters}, language={language}")
+    def get_grouped_arm_logs(self, page=1, page_size=50, filters=None, language='tr', cursor=None, include_total=False):
+        """Gruplandırılmış kol log verilerini getir ((timestamp, arm, k) üzerinde keyset sayfalama)"""
         if filters is None:
             filters = {}
         
         try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                # Hızlı SQL - sadece mevcut verileri getir
-                query = '''
-                    SELECT 
-                        timestamp,
-                        arm,
-                        MAX(CASE WHEN dtype = 10 THEN data END) as current,
-                        MAX(CASE WHEN dtype = 11 THEN data END) as humidity,
-                        MAX(CASE WHEN dtype = 12 THEN data END) as module_temperature,
-                        MAX(CASE WHEN dtype = 13 THEN data END) as ambient_temperature
-                    FROM battery_data 
-                    WHERE k = 2
-                '''
+            with self.get_read_connection() as conn:
+                db_cursor = conn.cursor()
                 
                 params = []
                 
                 if filters.get('arm'):
-                    query += ' AND arm = ?'
+                    # (arm, k, timestamp) index'i zaman sırasını doğrudan verir
+                    where = 'k = 2 AND arm = ?'
                     params.append(filters['arm'])
+                else:
+                    # (timestamp, arm, k) index'i ters taranır, LIMIT'te durur
+                    where = '+k = 2'
                 
-                if filters.get('startDate'):
-                    start_timestamp = int(datetime.strptime(filters['startDate'], '%Y-%m-%d').timestamp() * 1000)
-                    query += ' AND timestamp >= ?'
+                start_timestamp, end_timestamp = self._filter_time_bounds(filters, 'startDate', 'endDate')
+                if start_timestamp is not None:
+                    where += ' AND timestamp >= ?'
                     params.append(start_timestamp)
                 
-                if filters.get('endDate'):
-                    end_timestamp = int(datetime.strptime(filters['endDate'], '%Y-%m-%d').timestamp() * 1000) + (24 * 60 * 60 * 1000) - 1
-                    query += ' AND timestamp <= ?'
+                if end_timestamp is not None:
+                    where += ' AND timestamp <= ?'
                     params.append(end_timestamp)
                 
-                query += ' GROUP BY timestamp, arm, k ORDER BY timestamp DESC, arm ASC LIMIT ? OFFSET ?'
-                params.extend([page_size, (page - 1) * page_size])
-                
-                print(f"DEBUG database.py: Arm query: {query}")
-                print(f"DEBUG database.py: Arm params: {params}")
+                query = f'''
+                    SELECT 
+                        timestamp,
+                        arm,
+                        MAX(CASE WHEN dtype = 10 THEN data END) as current,
+                        MAX(CASE WHEN dtype = 11 THEN data END) as humidity,
+                        MAX(CASE WHEN dtype = 12 THEN data END) as module_temperature,
+                        MAX(CASE WHEN dtype = 13 THEN data END) as ambient_temperature
+                    FROM battery_data 
+                    WHERE {where}
+                '''
+                # k sabit 2, GROUP BY ile aynı sırada kalsın diye anahtara dahil
+                page_data = self._fetch_keyset_page(
+                    db_cursor, query, params,
+                    ['timestamp', 'arm', 'k'], lambda row: (row[0], row[1], 2),
+                    page_size, cursor, group_by=' GROUP BY timestamp, arm, k', ascending=('arm', 'k'),
+                    time_range=(start_timestamp, end_timestamp)
+                )
                 
-                cursor.execute(query, params)
-                rows = cursor.fetchall()
+                # Aynı periyot içinde kollar artan sırada gösterilir (sayfa sınırında da korunur)
+                rows = page_data['rows']
                 
                 # Verileri formatla
                 logs = []
@@ -2824,17 +3773,22 @@ class BatteryDatabase:
                         'ambient_temperature': row[5]
                     })
                 
-                # COUNT sorgusu kaldırıldı - performans için
-                # Eğer gelen kayıt sayısı page_size'dan azsa, son sayfadayız
-                has_more = len(logs) == page_size
-                
-                print(f"DEBUG database.py: {len(logs)} arm log verisi döndürüldü, sayfa: {page}, daha fazla var: {has_more}")
+                print(f"DEBUG database.py: {len(logs)} arm log verisi döndürüldü, sayfa: {page}, daha fazla var: {page_data['hasMore']}")
                 
-                return {
+                result = {
                     'logs': logs,
                     'currentPage': page,
-                    'hasMore': has_more  # Daha fazla kayıt var mı? (COUNT sorgusu yapılmıyor - performans için)
+                    'hasMore': page_data['hasMore'],
+                    'nextCursor': page_data['nextCursor'],
+                    'prevCursor': page_data['prevCursor']
                 }
+                if include_total:
+                    result['totalCount'] = self._approximate_reading_count(
+                        db_cursor, 'k = 2', 10, filters.get('arm'), None, start_timestamp, end_timestamp
+                    )
+                return result
+        except ValueError:
+            raise
         except Exception as e:
             print(f"DEBUG database.py: Arm logs hatası oluştu: {e}")
             import traceback
@@ -2844,7 +3798,7 @@ class BatteryDatabase:
     def get_passive_balance(self, arm=None):
         """Passive balance verilerini getir - Tüm kollar için tek kayıt"""
         try:
-            with self.get_connection() as conn:
+            with self.get_read_connection() as conn:
                 cursor = conn.cursor()
                 
                 # Tüm kollar için tek kayıt (arm=0)
@@ -2875,7 +3829,7 @@ class BatteryDatabase:
     def get_active_arms(self):
         """Tüm kolları getir - arm_slave_counts tablosundan"""
         try:
-            with self.get_connection() as conn:
+            with self.get_read_connection() as conn:
                 cursor = conn.cursor()
                 
                 # Her kol için en son slave_count'u al
@@ -2905,76 +3859,19 @@ class BatteryDatabase:
             return []
 
     def get_active_alarm_count(self):
-        """Aktif alarm sayısını getir (sadece geçerli alarmlar)"""
-        with self.get_connection() as conn:
+        """Aktif alarm sayısını getir (sadece geçerli alarmlar, partial index üzerinden)"""
+        with self.get_read_connection() as conn:
             cursor = conn.cursor()
-            # Tüm aktif alarmları çek
-            cursor.execute('''
-                SELECT error_code_msb, error_code_lsb
-                FROM alarms 
-                WHERE status = 'active'
-            ''')
-            rows = cursor.fetchall()
-            
-            # Geçerli alarmları say (is_valid_alarm kontrolü ile)
-            # web_app.py'deki is_valid_alarm fonksiyonunu burada da kullan
-            valid_count = 0
-            for row in rows:
-                error_msb = row[0]
-                error_lsb = row[1]
-                
-                # Geçerli alarm kontrolü
-                if self._is_valid_alarm(error_msb, error_lsb):
-                    valid_count += 1
-            
-            return valid_count
-    
-    def _is_valid_alarm(self, error_msb, error_lsb):
-        """Alarm geçerli mi kontrol et (web_app.py'deki is_valid_alarm ile aynı mantık)"""
-        # Kol alarmı kontrolü
-        if error_lsb == 9:
-            return self._get_arm_alarm_description(error_msb) is not None
-        # Batarya alarmı kontrolü
-        else:
-            return self._get_battery_alarm_description(error_msb, error_lsb) is not None
-    
-    def _get_arm_alarm_description(self, error_msb):
-        """Kol alarm açıklaması (web_app.py ile uyumlu)"""
-        if error_msb == 2:
-            return "Yüksek akım alarmı"
-        elif error_msb == 4:
-            return "Yüksek nem alarmı"
-        elif error_msb == 8:
-            return "Yüksek ortam sıcaklığı alarmı"
-        elif error_msb == 16:
-            return "Yüksek kol sıcaklığı alarmı"
-        elif error_msb == 266:
-            return "Kol verisi gelmiyor"
-        else:
-            return None
+            cursor.execute("SELECT COUNT(*) FROM alarms WHERE status = 'active' AND is_valid = 1")
+            return cursor.fetchone()[0]
     
-    def _get_battery_alarm_description(self, error_msb, error_lsb):
-        """Batarya alarm açıklaması (web_app.py ile uyumlu)"""
-        # MSB kontrolü (errorCodeLsb !== 1 && errorCodeMsb >= 1)
-        if error_lsb != 1 and error_msb >= 1:
-            if error_msb == 1:
-                return "Pozitif kutup başı alarmı"
-            elif error_msb == 2:
-                return "Negatif kutup başı sıcaklık alarmı"
-        
-        # LSB kontrolü (error_msb = 0 olan durumlar da dahil)
-        if error_lsb == 4:
-            return "Düşük batarya gerilim uyarısı"
-        elif error_lsb == 8:
-            return "Düşük batarya gerilimi alarmı"
-        elif error_lsb == 16:
-            return "Yüksek batarya gerilimi uyarısı"
-        elif error_lsb == 32:
-            return "Yüksek batarya gerilimi alarmı"
-        elif error_lsb == 64:
-            return "Modül sıcaklık alarmı"
-        
-        return None
+    def get_alarm_counter(self):
+        """Sayaç satırından (aktif alarm sayısı, versiyon) getir - tek satır PK okuması"""
+        with self.get_read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT active_count, version FROM alarm_counter WHERE id = 1')
+            row = cursor.fetchone()
+            return (row[0], row[1]) if row else None
     
     def create_missing_tables(self):
         """Eksik tabloları oluştur (migration)"""
@@ -3000,6 +3897,8 @@ class BatteryDatabase:
                 # Index'leri oluştur (eğer yoksa)
                 print("🔍 Index'ler kontrol ediliyor...")
                 cursor.execute('CREATE INDEX IF NOT EXISTS idx_alarm_timestamp ON alarms(timestamp)')
+                # Aktif alarm araması (arm, battery) - sadece aktif satırları içerir, geçmiş büyüdükçe büyümez
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_alarms_active ON alarms(arm, battery) WHERE status = 'active'")
                 cursor.execute('CREATE INDEX IF NOT EXISTS idx_k_arm_timestamp ON battery_data(k, arm, timestamp)')
                 cursor.execute('CREATE INDEX IF NOT EXISTS idx_arm_k_timestamp ON battery_data(arm, k, timestamp)')
                 cursor.execute('CREATE INDEX IF NOT EXISTS idx_timestamp_arm_k ON battery_data(timestamp, arm, k)')
@@ -3189,10 +4088,11 @@ class BatteryDatabase:
     def get_mail_server_config(self):
         """Mail sunucu konfigürasyonunu getir"""
         try:
-            with self.get_connection() as conn:
+            with self.get_read_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
-                    SELECT smtp_server, smtp_port, smtp_username, smtp_password, use_tls, is_active
+                    SELECT smtp_server, smtp_port, smtp_username, smtp_password, use_tls, is_active,
+                           digest_window_minutes, digest_critical_bypass
                     FROM mail_server_config 
                     WHERE id = 1
                 """)
@@ -3204,15 +4104,30 @@ class BatteryDatabase:
                         'smtp_username': result[2],
                         'smtp_password': result[3],
                         'use_tls': bool(result[4]),
-                        'is_active': bool(result[5])
+                        'is_active': bool(result[5]),
+                        'digest_window_minutes': result[6] or 0,
+                        'digest_critical_bypass': result[7] is None or bool(result[7])
                     }
                 return None
         except Exception as e:
             print(f"Mail sunucu konfigürasyonu getirilirken hata: {e}")
             return None
     
-    def save_mail_server_config(self, smtp_server, smtp_port, smtp_username, smtp_password, use_tls=True, is_active=True):
-        """Mail sunucu konfigürasyonunu kaydet veya güncelle"""
+    def get_mail_server_config_version(self):
+        """Mail sunucu konfigürasyonunun son güncellenme zamanı (önbellek geçerlilik kontrolü için)"""
+        try:
+            with self.get_read_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT updated_at FROM mail_server_config WHERE id = 1")
+                result = cursor.fetchone()
+                return result[0] if result else None
+        except Exception as e:
+            print(f"Mail sunucu konfigürasyon versiyonu getirilirken hata: {e}")
+            return None
+    
+    def save_mail_server_config(self, smtp_server, smtp_port, smtp_username, smtp_password, use_tls=True, is_active=True,
+                                digest_window_minutes=0, digest_critical_bypass=True):
+        """Mail sunucu konfigürasyonunu kaydet veya güncelle (digest_window_minutes=0 -> her alarm anında)"""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
@@ -3227,16 +4142,20 @@ class BatteryDatabase:
                         UPDATE mail_server_config 
                         SET smtp_server = ?, smtp_port = ?, smtp_username = ?, 
                             smtp_password = ?, use_tls = ?, is_active = ?, 
+                            digest_window_minutes = ?, digest_critical_bypass = ?,
                             updated_at = CURRENT_TIMESTAMP
                         WHERE id = 1
-                    """, (smtp_server, smtp_port, smtp_username, smtp_password, use_tls, is_active))
+                    """, (smtp_server, smtp_port, smtp_username, smtp_password, use_tls, is_active,
+                          digest_window_minutes, digest_critical_bypass))
                 else:
                     # Yeni kayıt oluştur
                     cursor.execute("""
                         INSERT INTO mail_server_config 
-                        (id, smtp_server, smtp_port, smtp_username, smtp_password, use_tls, is_active)
-                        VALUES (1, ?, ?, ?, ?, ?, ?)
-                    """, (smtp_server, smtp_port, smtp_username, smtp_password, use_tls, is_active))
+                        (id, smtp_server, smtp_port, smtp_username, smtp_password, use_tls, is_active,
+                         digest_window_minutes, digest_critical_bypass)
+                        VALUES (1, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """, (smtp_server, smtp_port, smtp_username, smtp_password, use_tls, is_active,
+                          digest_window_minutes, digest_critical_bypass))
                 
                 conn.commit()
                 return True
@@ -3244,10 +4163,76 @@ class BatteryDatabase:
             print(f"Mail sunucu konfigürasyonu kaydedilirken hata: {e}")
             return False
     
+    def enqueue_mail_retry(self, recipients_json, subject, body, next_attempt_at, attempts=0, last_error=None):
+        """Gönderilemeyen maili tekrar deneme kuyruğuna ekle"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    INSERT INTO mail_retry_queue (recipients, subject, body, attempts, next_attempt_at, last_error)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (recipients_json, subject, body, attempts, next_attempt_at, last_error))
+                conn.commit()
+                return cursor.lastrowid
+        except Exception as e:
+            print(f"Mail tekrar deneme kuyruğuna eklenirken hata: {e}")
+            return None
+    
+    def get_due_mail_retries(self, now_ms, limit=20):
+        """Zamanı gelmiş tekrar deneme kayıtlarını getir"""
+        try:
+            with self.get_read_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT id, recipients, subject, body, attempts
+                    FROM mail_retry_queue
+                    WHERE next_attempt_at <= ?
+                    ORDER BY next_attempt_at
+                    LIMIT ?
+                ''', (now_ms, limit))
+                return [{
+                    'id': row[0],
+                    'recipients': row[1],
+                    'subject': row[2],
+                    'body': row[3],
+                    'attempts': row[4]
+                } for row in cursor.fetchall()]
+        except Exception as e:
+            print(f"Mail tekrar deneme kayıtları getirilirken hata: {e}")
+            return []
+    
+    def reschedule_mail_retry(self, retry_id, recipients_json, attempts, next_attempt_at, last_error):
+        """Tekrar deneme kaydını sonraki denemeye ertele (kalan alıcılarla)"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    UPDATE mail_retry_queue
+                    SET recipients = ?, attempts = ?, next_attempt_at = ?, last_error = ?
+                    WHERE id = ?
+                ''', (recipients_json, attempts, next_attempt_at, last_error, retry_id))
+                conn.commit()
+                return True
+        except Exception as e:
+            print(f"Mail tekrar deneme kaydı güncellenirken hata: {e}")
+            return False
+    
+    def delete_mail_retry(self, retry_id):
+        """Gönderilen veya vazgeçilen tekrar deneme kaydını sil"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('DELETE FROM mail_retry_queue WHERE id = ?', (retry_id,))
+                conn.commit()
+                return True
+        except Exception as e:
+            print(f"Mail tekrar deneme kaydı silinirken hata: {e}")
+            return False
+    
     def get_ip_config(self):
         """IP konfigürasyonunu getir"""
         try:
-            with self.get_connection() as conn:
+            with self.get_read_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
                     SELECT ip_address, subnet_mask, gateway, dns_servers, is_assigned, is_active, use_dhcp
@@ -3343,7 +4328,7 @@ class BatteryDatabase:
     def get_last_reset_timestamp(self):
         """Son reset system tarihini getir"""
         try:
-            with self.get_connection() as conn:
+            with self.get_read_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("""
                     SELECT reset_timestamp FROM reset_system_log 
@@ -3383,105 +4368,332 @@ class BatteryDatabase:
     # BATTERY DETAIL CHARTS FUNCTIONS
     # ==============================================
     
+    # Batarya (k > 2) seri adları: 11 SOH (sağlık), 126 SOC (şarj) - RAM mapping'iyle aynı
+    BATTERY_SERIES_NAMES = {
+        10: 'gerilim',           # Gerilim (V)
+        11: 'soh',               # SOH (Sağlık Durumu) 0-100%
+        12: 'rimt',              # RIMT (Sağlık Durumu) 0-100%
+        126: 'soc',              # SOC (Şarj Durumu) 0-100%
+        13: 'modul_sicaklik',    # Modül Sıcaklığı (°C)
+        14: 'pozitif_kutup',     # Pozitif Kutup Sıcaklığı (°C)
+        15: 'negatif_kutup'      # Negatif Kutup Sıcaklığı (°C)
+    }
+    
+    # Kol (k = 2) seri adları
+    ARM_SERIES_NAMES = {
+        10: 'akim',              # Akım (A)
+        11: 'nem',               # Nem (%)
+        15: 'sicaklik'           # Sıcaklık (°C)
+    }
+    
+    # Zaman serisi kaynağı: bu aralığa kadar ham veri, sonra saatlik, çok uzun aralıklarda günlük rollup
+    TIMESERIES_RAW_SPAN_MS = 24 * 60 * 60 * 1000
+    TIMESERIES_HOURLY_SPAN_MS = 90 * 24 * 60 * 60 * 1000
+    
     def get_battery_detail_charts(self, arm, battery, hours=7):
         """Batarya detay grafikleri için veri getir (1 saat aralıklarla, en son 7 saat)"""
         try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                # Son 7 saatlik veri için timestamp hesapla
-                current_time = int(time.time() * 1000)
-                start_time = current_time - (hours * 60 * 60 * 1000)  # 7 saat öncesi
-                
-                # Dtype'lar ve anlamları
-                dtype_mapping = {
-                    10: 'gerilim',      # Gerilim (V)
-                    11: 'soc',          # SOC (Şarj Durumu) 0-100%
-                    12: 'rimt',         # RIMT (Sağlık Durumu) 0-100%
-                    126: 'soh',         # SOH (Sağlık Durumu) 0-100%
-                    13: 'modul_sicaklik',    # Modül Sıcaklığı (°C)
-                    14: 'pozitif_kutup',     # Pozitif Kutup Sıcaklığı (°C)
-                    15: 'negatif_kutup'      # Negatif Kutup Sıcaklığı (°C)
-                }
-                
-                charts_data = {}
-                
-                # Her dtype için veri getir
-                for dtype, chart_name in dtype_mapping.items():
-                    cursor.execute("""
-                        SELECT 
-                            data,
-                            timestamp,
-                            created_at
-                        FROM battery_data 
-                        WHERE arm = ? AND k = ? AND dtype = ? 
-                        AND timestamp >= ?
-                        ORDER BY timestamp ASC
-                    """, (arm, battery, dtype, start_time))
-                    
-                    raw_data = cursor.fetchall()
-                    
-                    if raw_data:
-                        # 1 saat aralıklarla veri grupla
-                        hourly_data = self._group_data_by_hour(raw_data, hours)
-                        charts_data[chart_name] = hourly_data
-                    else:
-                        # Veri yoksa boş array
-                        charts_data[chart_name] = []
-                
-                return charts_data
-                
+            # Dtype'lar ve anlamları
+            dtype_mapping = self.BATTERY_SERIES_NAMES
+            
+            # Son 7 saatlik veri (içinde bulunulan saat dahil)
+            current_time = int(time.time() * 1000)
+            start_time = self._hour_bucket(current_time) - ((hours - 1) * self.HOUR_MS)
+            
+            series = self.get_rollup_series(arm, battery, list(dtype_mapping.keys()),
+                                            start_time, current_time, resolution='hourly')
+            
+            charts_data = {}
+            for dtype, chart_name in dtype_mapping.items():
+                charts_data[chart_name] = [
+                    {
+                        'timestamp': point['timestamp'],
+                        'value': round(point['avg'], 2),
+                        'count': point['count'],
+                        'time_label': datetime.fromtimestamp(point['timestamp'] / 1000).strftime('%d/%m %H:%M')
+                    }
+                    for point in series.get(dtype, [])
+                ]
+            
+            return charts_data
+            
         except Exception as e:
             print(f"Batarya detay grafik verisi getirilirken hata: {e}")
             return {}
     
-    def _group_data_by_hour(self, raw_data, hours):
-        """Veriyi 1 saat aralıklarla grupla (maksimum 7 nokta)"""
-        if not raw_data:
-            return []
+    def get_raw_series(self, arm, k, dtypes, start_time, end_time):
+        """Ham battery_data'dan dtype başına zaman serisi getir ({dtype: [(timestamp, değer), ...]})"""
+        if not dtypes:
+            return {}
         
-        # Saatlik gruplar oluştur
-        hourly_groups = {}
-        current_time = int(time.time() * 1000)
-        
-        for i in range(hours):
-            hour_start = current_time - ((hours - i) * 60 * 60 * 1000)
-            hour_end = current_time - ((hours - i - 1) * 60 * 60 * 1000)
-            hourly_groups[i] = {
-                'timestamp': hour_start,
-                'data': None,
-                'count': 0
+        placeholders = ','.join('?' * len(dtypes))
+        with self.get_read_connection() as conn:
+            cursor = conn.cursor()
+            query = self.route_battery_data(conn, f'''
+                SELECT dtype, timestamp, data
+                FROM battery_data
+                WHERE arm = ? AND k = ? AND dtype IN ({placeholders})
+                AND timestamp >= ? AND timestamp <= ?
+                ORDER BY dtype, timestamp
+            ''', start_time, end_time)
+            cursor.execute(query, (arm, k, *dtypes, start_time, end_time))
+            
+            series = {}
+            for dtype, timestamp, value in cursor.fetchall():
+                if value is not None:
+                    series.setdefault(dtype, []).append((timestamp, value))
+            return series
+    
+    def get_timeseries(self, arm, k, dtypes, start_time, end_time, points=500, method='lttb', resolution=None):
+        """Grafik için örneklenmiş zaman serileri (dtype başına en fazla points nokta)
+        
+        resolution verilmezse aralığa göre seçilir: kısa aralıklar ham veriden, uzunlar rollup'tan.
+        Ham veri retention ile silinmişse saatlik rollup'a düşülür.
+        """
+        span = end_time - start_time
+        if resolution is None:
+            if span <= self.TIMESERIES_RAW_SPAN_MS:
+                resolution = 'raw'
+            elif span <= self.TIMESERIES_HOURLY_SPAN_MS:
+                resolution = 'hourly'
+            else:
+                resolution = 'daily'
+            auto = True
+        else:
+            auto = False
+        
+        if resolution == 'raw':
+            raw = self.get_raw_series(arm, k, dtypes, start_time, end_time)
+            source = {
+                dtype: [(timestamp, value, value, value) for timestamp, value in rows]
+                for dtype, rows in raw.items()
+            }
+            if not source and auto:
+                resolution = 'hourly'
+        if resolution != 'raw':
+            rollup = self.get_rollup_series(arm, k, dtypes, start_time, end_time, resolution=resolution)
+            source = {
+                dtype: [(point['timestamp'], point['avg'], point['min'], point['max'])
+                        for point in rows if point['avg'] is not None]
+                for dtype, rows in rollup.items()
             }
         
-        # Verileri saatlik gruplara dağıt
-        for data_point in raw_data:
-            data_value, timestamp, created_at = data_point
-            
-            # Hangi saate ait olduğunu bul
-            for hour_key, hour_info in hourly_groups.items():
-                if hour_info['timestamp'] <= timestamp < hour_info['timestamp'] + (60 * 60 * 1000):
-                    if hour_info['data'] is None:
-                        hour_info['data'] = data_value
-                    else:
-                        # Aynı saatte birden fazla veri varsa ortalama al
-                        hour_info['data'] = (hour_info['data'] + data_value) / 2
-                    hour_info['count'] += 1
-                    break
+        names = self.ARM_SERIES_NAMES if k == 2 else self.BATTERY_SERIES_NAMES
+        series = {}
+        for dtype in dtypes:
+            rows = source.get(dtype, [])
+            sampled = downsampling.downsample(rows, points, method)
+            series[str(dtype)] = {
+                'name': names.get(dtype, str(dtype)),
+                'sourcePoints': len(rows),
+                'timestamps': [point[0] for point in sampled],
+                'values': [round(point[1], 3) for point in sampled],
+                'min': [round(point[2], 3) for point in sampled],
+                'max': [round(point[3], 3) for point in sampled]
+            }
+        
+        return {
+            'arm': arm,
+            'k': k,
+            'start': start_time,
+            'end': end_time,
+            'resolution': resolution,
+            'method': method,
+            'series': series
+        }
+    
+    def get_rollup_series(self, arm, k, dtypes, start_time, end_time, resolution='hourly'):
+        """Rollup tablosundan dtype başına zaman serisi getir ({dtype: [nokta, ...]})"""
+        table = self.ROLLUP_TABLES.get(resolution)
+        if table is None:
+            raise ValueError(f"Geçersiz rollup çözünürlüğü: {resolution}")
+        if not dtypes:
+            return {}
         
-        # Sonuç formatına çevir
-        result = []
-        for hour_key in sorted(hourly_groups.keys()):
-            hour_info = hourly_groups[hour_key]
-            if hour_info['data'] is not None:
-                result.append({
-                    'timestamp': hour_info['timestamp'],
-                    'value': round(hour_info['data'], 2),
-                    'count': hour_info['count'],
-                    'time_label': datetime.fromtimestamp(hour_info['timestamp'] / 1000).strftime('%d/%m %H:%M')
+        placeholders = ','.join('?' * len(dtypes))
+        with self.get_read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT dtype, bucket, value_count, value_sum, value_min, value_max, last_value
+                FROM {table}
+                WHERE arm = ? AND k = ? AND dtype IN ({placeholders})
+                AND bucket >= ? AND bucket <= ?
+                ORDER BY dtype, bucket
+            ''', (arm, k, *dtypes, start_time, end_time))
+            
+            series = {}
+            for dtype, bucket, count, total, vmin, vmax, last_value in cursor.fetchall():
+                series.setdefault(dtype, []).append({
+                    'timestamp': bucket,
+                    'avg': total / count if count else None,
+                    'min': vmin,
+                    'max': vmax,
+                    'last': last_value,
+                    'count': count
                 })
+            return series
+    
+    def rebuild_rollups(self, start_ts=None):
+        """Rollup tablolarını ham veriden yeniden oluştur (gün gün, her gün ayrı transaction)
+        
+        Ham veri saat başından itibaren yeniden işlenir: retention sonrası en eski gün yarımdır, kesimden
+        önceki saatlik satırlar korunur ve o günün günlük satırı saatlik tablodan tamamlanır.
+        """
+        hourly_table = self.ROLLUP_TABLES['hourly']
+        daily_table = self.ROLLUP_TABLES['daily']
+        day_expr = self.DAY_BUCKET_SQL.format(col='bucket')
         
-        return result
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            self._create_rollup_tables(cursor)
+            conn.commit()
+            
+            min_ts, max_ts = self.battery_data_bounds(conn)
+            if min_ts is None:
+                print("⚠️ battery_data boş, rollup oluşturulacak veri yok")
+                return 0
+            
+            first_hour = self._hour_bucket(max(min_ts, start_ts or min_ts))
+            day_start = self._day_bucket(first_hour)
+            total_buckets = 0
+            
+            while day_start <= max_ts:
+                # Yaz saati geçişlerinde de doğru çalışsın diye sonraki günü takvimden hesapla
+                next_day = self._day_bucket(day_start + 26 * self.HOUR_MS)
+                raw_start = max(day_start, first_hour)
+                
+                # Ham veri sorguları sadece o günün partition'ına yönlendirilir (ATTACH transaction dışında)
+                raw_hourly_sql = self.route_battery_data(conn, f'''
+                    INSERT INTO {hourly_table} (arm, k, dtype, bucket, value_count, value_sum,
+                                                value_min, value_max, last_value, last_ts)
+                    SELECT arm, k, dtype, (timestamp / {self.HOUR_MS}) * {self.HOUR_MS} AS hour_bucket,
+                           COUNT(data), SUM(data), MIN(data), MAX(data), NULL, MAX(timestamp)
+                    FROM battery_data
+                    WHERE timestamp >= ? AND timestamp < ? AND data IS NOT NULL
+                    GROUP BY arm, k, dtype, hour_bucket
+                ''', raw_start, next_day - 1)
+                raw_last_sql = self.route_battery_data(conn, f'''
+                    UPDATE {hourly_table} SET last_value = (
+                        SELECT bd.data FROM battery_data bd
+                        WHERE bd.arm = {hourly_table}.arm AND bd.k = {hourly_table}.k
+                        AND bd.dtype = {hourly_table}.dtype AND bd.timestamp = {hourly_table}.last_ts
+                        AND bd.data IS NOT NULL
+                        LIMIT 1
+                    )
+                    WHERE bucket >= ? AND bucket < ?
+                ''', raw_start, next_day - 1)
+                
+                cursor.execute("BEGIN IMMEDIATE")
+                try:
+                    cursor.execute(f"DELETE FROM {hourly_table} WHERE bucket >= ? AND bucket < ?",
+                                   (raw_start, next_day))
+                    cursor.execute(f"DELETE FROM {daily_table} WHERE bucket = ?", (day_start,))
+                    
+                    # Saatlik: ham veriden
+                    cursor.execute(raw_hourly_sql, (raw_start, next_day))
+                    total_buckets += cursor.rowcount
+                    
+                    cursor.execute(raw_last_sql, (raw_start, next_day))
+                    
+                    # Günlük: saatlik rollup'tan (ham verisi silinmiş saatler dahil tüm gün)
+                    cursor.execute(f'''
+                        INSERT INTO {daily_table} (arm, k, dtype, bucket, value_count, value_sum,
+                                                   value_min, value_max, last_value, last_ts)
+                        SELECT arm, k, dtype, {day_expr} AS day_bucket,
+                               SUM(value_count), SUM(value_sum), MIN(value_min), MAX(value_max), NULL, MAX(last_ts)
+                        FROM {hourly_table}
+                        WHERE bucket >= ? AND bucket < ?
+                        GROUP BY arm, k, dtype, day_bucket
+                    ''', (day_start, next_day))
+                    
+                    cursor.execute(f'''
+                        UPDATE {daily_table} SET last_value = (
+                            SELECT h.last_value FROM {hourly_table} h
+                            WHERE h.arm = {daily_table}.arm AND h.k = {daily_table}.k
+                            AND h.dtype = {daily_table}.dtype AND h.last_ts = {daily_table}.last_ts
+                            LIMIT 1
+                        )
+                        WHERE bucket = ?
+                    ''', (day_start,))
+                    
+                    conn.commit()
+                except Exception as e:
+                    conn.rollback()
+                    print(f"❌ Rollup yeniden oluşturma hatası ({datetime.fromtimestamp(day_start / 1000):%Y-%m-%d}): {e}")
+                    raise
+                
+                day_start = next_day
+            
+            print(f"✅ Rollup tabloları yeniden oluşturuldu ({total_buckets} saatlik kayıt)")
+            return total_buckets
 
+    # ==============================================
+    # RETENTION (Veri Saklama) FUNCTIONS
+    # ==============================================
+    
+    def get_retention_config(self):
+        """Retention politikasını getir (daily_days None ise günlük veri süresiz saklanır)"""
+        try:
+            with self.get_read_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT raw_days, hourly_days, daily_days, chunk_size, max_run_seconds,
+                           run_interval_hours, is_active, last_run_at, last_report
+                    FROM retention_config WHERE id = 1
+                ''')
+                row = cursor.fetchone()
+                if row:
+                    return {
+                        'raw_days': row[0],
+                        'hourly_days': row[1],
+                        'daily_days': row[2],
+                        'chunk_size': row[3],
+                        'max_run_seconds': row[4],
+                        'run_interval_hours': row[5],
+                        'is_active': bool(row[6]),
+                        'last_run_at': row[7],
+                        'last_report': row[8]
+                    }
+                return None
+        except Exception as e:
+            print(f"Retention config getirilirken hata: {e}")
+            return None
+    
+    def save_retention_config(self, raw_days, hourly_days, daily_days=None, chunk_size=5000,
+                              max_run_seconds=60, run_interval_hours=24, is_active=True):
+        """Retention politikasını kaydet"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                self._create_retention_config_table(cursor)
+                cursor.execute('''
+                    UPDATE retention_config
+                    SET raw_days = ?, hourly_days = ?, daily_days = ?, chunk_size = ?,
+                        max_run_seconds = ?, run_interval_hours = ?, is_active = ?,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE id = 1
+                ''', (raw_days, hourly_days, daily_days, chunk_size, max_run_seconds,
+                      run_interval_hours, is_active))
+                conn.commit()
+                return {'success': True, 'message': 'Retention ayarları kaydedildi'}
+        except Exception as e:
+            print(f"Retention config kaydedilirken hata: {e}")
+            return {'success': False, 'message': str(e)}
+    
+    def save_retention_report(self, report_json):
+        """Son retention çalışmasının raporunu kaydet"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    UPDATE retention_config
+                    SET last_run_at = CURRENT_TIMESTAMP, last_report = ?
+                    WHERE id = 1
+                ''', (report_json,))
+                conn.commit()
+        except Exception as e:
+            print(f"Retention raporu kaydedilirken hata: {e}")
+    
     # ==============================================
     # TRAP TARGETS (Trap Hedefleri) FUNCTIONS
     # ==============================================
@@ -3489,7 +4701,7 @@ class BatteryDatabase:
     def get_trap_targets(self):
         """Tüm trap hedeflerini getir"""
         try:
-            with self.get_connection() as conn:
+            with self.get_read_connection() as conn:
                 cursor = conn.cursor()
                 # Önce kolonları kontrol et
                 cursor.execute("PRAGMA table_info(trap_targets)")
@@ -3655,7 +4867,7 @@ class BatteryDatabase:
     def get_trap_target(self):
         """Tek trap hedefini getir (id=1)"""
         try:
-            with self.get_connection() as conn:
+            with self.get_read_connection() as conn:
                 cursor = conn.cursor()
                 # Önce kolonları kontrol et
                 cursor.execute("PRAGMA table_info(trap_targets)")
@@ -3781,7 +4993,7 @@ class BatteryDatabase:
     def get_ftp_config(self):
         """FTP konfigürasyonunu getir"""
         try:
-            with self.get_connection() as conn:
+            with self.get_read_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT ftp_host, ftp_port, ftp_username, ftp_password, is_active, last_sent_at
@@ -3840,7 +5052,7 @@ class BatteryDatabase:
     def get_trap_settings(self):
         """Trap ayarlarını getir"""
         try:
-            with self.get_connection() as conn:
+            with self.get_read_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     SELECT trap_enabled, trap_server, trap_port, trap_community, trap_version, trap_interval
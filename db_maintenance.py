@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+import sys
+from datetime import datetime
+
+from database import BatteryDatabase
+from retention import RetentionEngine
+from bulk_export import BulkExporter, FORMATS
+
+USAGE = ("Kullanım: python db_maintenance.py [rebuild-rollups [YYYY-MM-DD]|retention|"
+         "export npz|csv.gz ÇIKTI_KLASÖRÜ [BAŞLANGIÇ YYYY-MM] [BİTİŞ YYYY-MM]]")
+
+def rebuild_rollups(db, start_date=None):
+    """Rollup tablolarını ham veriden yeniden oluştur (opsiyonel başlangıç tarihinden itibaren)"""
+    start_ts = None
+    if start_date:
+        try:
+            start_ts = int(datetime.strptime(start_date, '%Y-%m-%d').timestamp() * 1000)
+        except ValueError:
+            print(f"❌ Geçersiz tarih: {start_date} (beklenen format: YYYY-MM-DD)")
+            return False
+
+    try:
+        print(f"🔄 Rollup tabloları yeniden oluşturuluyor{' (' + start_date + ' itibarıyla)' if start_date else ''}...")
+        db.rebuild_rollups(start_ts)
+        return True
+    except Exception as e:
+        print(f"❌ Rollup yeniden oluşturma başarısız: {e}")
+        return False
+
+def bulk_export(db, fmt, output_dir, start_month=None, end_month=None):
+    """Ham veriyi ay ay kolon bazlı dosyalara aktar"""
+    exporter = BulkExporter(db)
+    try:
+        for month in (start_month, end_month):
+            if month:
+                exporter.parse_month(month)
+        print(f"🔄 Toplu export ({fmt}) -> {output_dir}")
+        written = exporter.export_range(output_dir, fmt, start_month, end_month)
+        print(f"✅ {len(written)} ay, toplam {sum(rows for _, rows in written)} satır yazıldı")
+        return True
+    except Exception as e:
+        print(f"❌ Toplu export başarısız: {e}")
+        return False
+
+def main():
+    """Ana fonksiyon"""
+    if len(sys.argv) < 2:
+        print(USAGE)
+        sys.exit(1)
+
+    command = sys.argv[1]
+    db = BatteryDatabase()
+
+    if command == "rebuild-rollups":
+        # Saatlik/günlük rollup tablolarını ham veriden doldur
+        start_date = sys.argv[2] if len(sys.argv) > 2 else None
+        success = rebuild_rollups(db, start_date)
+        sys.exit(0 if success else 1)
+
+    elif command == "retention":
+        # Retention politikasını hemen bir kez uygula
+        try:
+            report = RetentionEngine(db).run_once()
+            sys.exit(0 if report.get('completed', True) else 1)
+        except Exception as e:
+            print(f"❌ Retention başarısız: {e}")
+            sys.exit(1)
+
+    elif command == "export":
+        # Analiz için kolon bazlı (NPZ / CSV.gz) aylık dosyalar
+        if len(sys.argv) < 4 or sys.argv[2] not in FORMATS:
+            print(USAGE)
+            sys.exit(1)
+        start_month = sys.argv[4] if len(sys.argv) > 4 else None
+        end_month = sys.argv[5] if len(sys.argv) > 5 else None
+        success = bulk_export(db, sys.argv[2], sys.argv[3], start_month, end_month)
+        sys.exit(0 if success else 1)
+
+    else:
+        print(f"Geçersiz komut. {USAGE}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+# Noktalar zamana göre sıralı (timestamp, değer, min, max) demetleridir: ham veride min = max = değer,
+# rollup kovalarında değer ortalama, min/max kovanın uç değerleridir
+
+METHODS = ('lttb', 'minmax')
+
+def lttb(points, threshold):
+    """Largest-Triangle-Three-Buckets: eğrinin şeklini koruyan threshold adet gerçek nokta seç
+
+    İlk ve son nokta her zaman kalır; aradaki her kovadan, bir önceki seçilen nokta ile sonraki
+    kovanın ortalaması arasında en büyük üçgeni oluşturan nokta alınır.
+    """
+    count = len(points)
+    if threshold >= count or threshold < 3:
+        return list(points)
+
+    sampled = [points[0]]
+    every = (count - 2) / (threshold - 2)
+    selected = 0
+    for i in range(threshold - 2):
+        # Sonraki kovanın ortalama noktası
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(int((i + 2) * every) + 1, count)
+        span = avg_end - avg_start
+        avg_x = sum(point[0] for point in points[avg_start:avg_end]) / span
+        avg_y = sum(point[1] for point in points[avg_start:avg_end]) / span
+
+        # Bu kovada üçgen alanı en büyük olan nokta
+        ax, ay = points[selected][0], points[selected][1]
+        best_area = -1
+        best = selected
+        for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+            area = abs((ax - avg_x) * (points[j][1] - ay) - (ax - points[j][0]) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                best = j
+        sampled.append(points[best])
+        selected = best
+
+    sampled.append(points[-1])
+    return sampled
+
+def minmax(points, buckets):
+    """Zaman eksenini eşit kovalara böl, her kovadan tek nokta: ilk timestamp, ortalama, min ve max
+
+    Ortalama çizgi ile birlikte min/max bandı çizilirse kısa süreli sıçramalar kaybolmaz.
+    """
+    if buckets >= len(points) or buckets < 1:
+        return list(points)
+
+    first = points[0][0]
+    width = (points[-1][0] - first + 1) / buckets
+    sampled = []
+    current = None
+    for timestamp, value, vmin, vmax in points:
+        bucket = int((timestamp - first) / width)
+        if current is None or bucket != current[0]:
+            if current is not None:
+                sampled.append((current[1], current[2] / current[3], current[4], current[5]))
+            current = [bucket, timestamp, value, 1, vmin, vmax]
+        else:
+            current[2] += value
+            current[3] += 1
+            current[4] = min(current[4], vmin)
+            current[5] = max(current[5], vmax)
+    sampled.append((current[1], current[2] / current[3], current[4], current[5]))
+    return sampled
+
+def downsample(points, target, method='lttb'):
+    if method == 'minmax':
+        return minmax(points, target)
+    if method == 'lttb':
+        return lttb(points, target)
+    raise ValueError(f"Geçersiz örnekleme yöntemi: {method}")
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+
+import json
+import queue
+import threading
+import time
+
+import live_view
+
+class LiveSubscriber:
+    """Tek SSE istemcisi: kol filtresi ve sınırlı olay kuyruğu"""
+
+    def __init__(self, arms=None, max_pending=50):
+        self.arms = set(arms) if arms else None  # None -> tüm kollar
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.closed = False
+
+    def wants(self, arm):
+        return arm is None or self.arms is None or arm in self.arms
+
+    def put(self, message):
+        """Olayı kuyruğa ekle, istemci yetişemiyorsa bağlantıyı kapatılmak üzere işaretle"""
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            self.closed = True  # EventSource yeniden bağlanıp güncel durumu alır
+
+class LiveStreamHub:
+    """Canlı görünümü ve alarm sayacını tek thread'de izleyip değişiklikleri abonelere dağıt
+
+    Sunucu işi açık sekme sayısından bağımsızdır: değişiklik yoksa hiçbir şey hesaplanmaz.
+    """
+
+    def __init__(self, reader, get_alarm_counter, interval=1.0, heartbeat_seconds=15, max_subscribers=None):
+        self.reader = reader
+        self.get_alarm_counter = get_alarm_counter
+        self.interval = interval
+        self.heartbeat_seconds = heartbeat_seconds  # İstemci bağlantısı bu sürede bir ping alır
+        self.max_subscribers = max_subscribers  # Her abone bir sunucu thread'i tutar (None = sınırsız)
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._last_snapshot = None
+        self._last_counter = None
+
+    def stream(self, subscriber):
+        """Abonenin SSE mesajlarını üret (boşta ping), bağlantı kapanınca aboneliği bitir"""
+        try:
+            yield 'retry: 5000\n\n'
+            yield format_event('hello', self.current_state())
+            while not subscriber.closed:
+                try:
+                    yield subscriber.queue.get(timeout=self.heartbeat_seconds)
+                except queue.Empty:
+                    yield format_event(None, None)
+        finally:
+            self.unsubscribe(subscriber)
+
+    def subscribe(self, arms=None):
+        """Yeni abone oluştur (abone sınırı doluysa None, istemci polling'e döner)"""
+        subscriber = LiveSubscriber(arms)
+        with self._lock:
+            if self.max_subscribers is not None and len(self._subscribers) >= self.max_subscribers:
+                return None
+            self._subscribers.add(subscriber)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='live-stream', daemon=True)
+                self._thread.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, event, data, arm=None):
+        """Olayı (varsa kol filtresine uyan) abonelere gönder"""
+        message = format_event(event, data)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            if subscriber.wants(arm):
+                subscriber.put(message)
+
+    def current_state(self):
+        """Yeni bağlanan istemci için başlangıç olayı verisi"""
+        snapshot = self._last_snapshot or self.reader.snapshot()
+        return {
+            'generation': snapshot.generation if snapshot else None,
+            'live': snapshot is not None,
+            'alarmVersion': self._last_counter[1] if self._last_counter else None
+        }
+
+    def _check_snapshot(self):
+        snapshot = self.reader.snapshot()
+        previous = self._last_snapshot
+        if snapshot is None or (previous is not None and snapshot.generation == previous.generation):
+            return
+        self._last_snapshot = snapshot
+        if previous is None:
+            return  # İlk okuma: istemciler başlangıç verisini REST API'den alır
+
+        changed, _ = live_view.changed_slots(previous, snapshot)
+        for arm, keys in changed.items():
+            passive_slave = snapshot.passive_slaves.get(arm) or None
+            rows = [live_view.battery_row(snapshot, arm, k, passive_slave) for k in keys if k > live_view.K_MIN]
+            self.publish('batteries', {
+                'generation': snapshot.generation,
+                'arm': arm,
+                'batteries': [row for row in rows if row],
+                'slaveCount': snapshot.slave_counts.get(arm, 0)
+            }, arm)
+        if changed:
+            self.publish('summary', {
+                'generation': snapshot.generation,
+                'summary': live_view.summary_data(snapshot)
+            })
+
+    def _check_alarms(self):
+        counter = self.get_alarm_counter()
+        if counter is None or counter == self._last_counter:
+            return
+        first = self._last_counter is None
+        self._last_counter = counter
+        if not first:
+            count, version = counter
+            self.publish('alarms', {'count': count, 'version': version})
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._thread = None
+                    self._last_snapshot = None
+                    self._last_counter = None
+                    return  # Abone kalmadı, thread kapanır (ilk abonelikte yeniden başlar)
+            try:
+                self._check_snapshot()
+                self._check_alarms()
+            except Exception as e:
+                print(f"❌ Canlı yayın hatası: {e}")
+            time.sleep(self.interval)
+
+def format_event(event, data):
+    """SSE mesaj formatı (olay yoksa bağlantıyı canlı tutan yorum satırı)"""
+    if event is None:
+        return ': ping\n\n'
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, separators=(',', ':'))}\n\n"
@@ -0,0 +1,358 @@
+# -*- coding: utf-8 -*-
+
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+
+# main.py'nin RAM'deki canlı verisini web_app'e veritabanına uğramadan aktaran paylaşımlı bellek dosyası.
+#
+# Yerleşim (little-endian, sabit boyut):
+#   Başlık (64 byte)
+#     0  4s  magic            b'BLV1'
+#     4  H   layout_version   LAYOUT_VERSION
+#     6  H   arm_count        ARM_COUNT
+#     8  Q   seq              seqlock sayacı (tek = yazım sürüyor)
+#     16 Q   generation       içerik her değiştiğinde artar
+#     24 q   published_at     son yayın zamanı (ms, içerik değişmese de güncellenir)
+#     32 I   crc              META + gövdenin crc32'si
+#     36 H   k_slots          K_SLOTS
+#     38 H   reg_slots        REG_SLOTS
+#     40 4H  slave_counts     kol başına batarya sayısı
+#     48 4B  passive_slaves   kol başına pasif balanstaki k (0 = yok)
+#     52 q   balance_at       son pasif balans kaydının zamanı (ms, durum değişince generation artar)
+#   Değerler: [kol 1-4][k 2-122][RAM indeksi 1-7] -> (d değer, q timestamp ms, 0 = veri yok)
+#     Batarya: 1=Gerilim, 2=SOC, 3=RIMT, 4=SOH, 5=NTC1, 6=NTC2, 7=NTC3
+#     Kol (k=2): 1=Akım, 2=Nem, 3=Modül sıcaklığı, 4=Ortam sıcaklığı
+#   Durum: [kol 1-4][batarya 0-120] -> B  bit0 = veri var, bit1-7 = alarm tipi 1-7 aktif
+
+LIVE_VIEW_PATH = os.environ.get(
+    'LIVE_VIEW_PATH',
+    os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), 'battery_live_view')
+)
+
+MAGIC = b'BLV1'
+LAYOUT_VERSION = 2
+ARM_COUNT = 4
+K_MIN = 2
+K_SLOTS = 121  # k = 2 (kol) ... 122 (120. batarya)
+REG_SLOTS = 7
+
+HEADER_SIZE = 64
+SEQ_OFFSET = 8
+META_OFFSET = 36
+META_FORMAT = '<HH4H4Bq'
+META_SIZE = struct.calcsize(META_FORMAT)
+VALUE_FORMAT = '<dq'
+VALUE_SIZE = struct.calcsize(VALUE_FORMAT)
+VALUES_SIZE = ARM_COUNT * K_SLOTS * REG_SLOTS * VALUE_SIZE
+FLAGS_SIZE = ARM_COUNT * K_SLOTS
+SEGMENT_SIZE = HEADER_SIZE + VALUES_SIZE + FLAGS_SIZE
+
+def _value_offset(arm, k, reg=1):
+    return (((arm - 1) * K_SLOTS + (k - K_MIN)) * REG_SLOTS + (reg - 1)) * VALUE_SIZE
+
+def _flag_offset(arm, battery):
+    return VALUES_SIZE + (arm - 1) * K_SLOTS + battery
+
+class LiveViewWriter:
+    """main.py tarafı: RAM yapılarını seqlock ile paylaşımlı belleğe yaz"""
+
+    def __init__(self, path=LIVE_VIEW_PATH):
+        self.path = path
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            os.ftruncate(fd, SEGMENT_SIZE)
+            self._mm = mmap.mmap(fd, SEGMENT_SIZE)
+        finally:
+            os.close(fd)
+        self._seq = 0
+        self._generation = 0
+        self._crc = None
+        self._mm[:SEQ_OFFSET] = struct.pack('<4sHH', MAGIC, LAYOUT_VERSION, ARM_COUNT)
+        struct.pack_into('<QQqI', self._mm, SEQ_OFFSET, 0, 0, 0, 0)
+
+    @staticmethod
+    def pack(slave_counts, battery_data, status, alarms, passive_slaves, balance_at=0):
+        """RAM sözlüklerinden META ve gövde byte'larını oluştur"""
+        meta = struct.pack(
+            META_FORMAT, K_SLOTS, REG_SLOTS,
+            *(min(slave_counts.get(arm, 0) or 0, K_SLOTS - 1) for arm in range(1, ARM_COUNT + 1)),
+            *((passive_slaves.get(arm) or 0) for arm in range(1, ARM_COUNT + 1)),
+            int(balance_at or 0)
+        )
+
+        body = bytearray(VALUES_SIZE + FLAGS_SIZE)
+        for arm, arm_data in battery_data.items():
+            if not 1 <= arm <= ARM_COUNT:
+                continue
+            for k, registers in arm_data.items():
+                if not K_MIN <= k < K_MIN + K_SLOTS:
+                    continue
+                for reg, reading in registers.items():
+                    if 1 <= reg <= REG_SLOTS and reading.get('value') is not None:
+                        struct.pack_into(VALUE_FORMAT, body, _value_offset(arm, k, reg),
+                                         float(reading['value']), int(reading.get('timestamp') or 0) or 1)
+
+        for arm, batteries in status.items():
+            if 1 <= arm <= ARM_COUNT:
+                for battery, has_data in batteries.items():
+                    if 0 <= battery < K_SLOTS and has_data:
+                        body[_flag_offset(arm, battery)] |= 1
+
+        for arm, batteries in alarms.items():
+            if 1 <= arm <= ARM_COUNT:
+                for battery, alarm_types in batteries.items():
+                    if 0 <= battery < K_SLOTS:
+                        for alarm_type, active in alarm_types.items():
+                            if active and 1 <= alarm_type <= 7:
+                                body[_flag_offset(arm, battery)] |= 1 << alarm_type
+
+        return meta, bytes(body)
+
+    def publish(self, slave_counts, battery_data, status, alarms, passive_slaves, balance_at=0):
+        """Anlık görüntüyü yayınla, içerik değiştiyse True döndür"""
+        meta, body = self.pack(slave_counts, battery_data, status, alarms, passive_slaves, balance_at)
+        crc = zlib.crc32(body, zlib.crc32(meta))
+        changed = crc != self._crc
+        now_ms = int(time.time() * 1000)
+
+        # Seqlock: tek sayı -> okuyucular bekler/yeniden dener
+        self._seq += 1
+        struct.pack_into('<Q', self._mm, SEQ_OFFSET, self._seq)
+        if changed:
+            self._generation += 1
+            self._crc = crc
+            self._mm[META_OFFSET:META_OFFSET + META_SIZE] = meta
+            self._mm[HEADER_SIZE:] = body
+        struct.pack_into('<QqI', self._mm, 16, self._generation, now_ms, self._crc)
+        self._seq += 1
+        struct.pack_into('<Q', self._mm, SEQ_OFFSET, self._seq)
+        return changed
+
+    def close(self):
+        self._mm.close()
+
+class LiveSnapshot:
+    """Tutarlı okunmuş tek bir kopya (byte'lar üzerinden erişim)"""
+
+    def __init__(self, data):
+        self._data = data
+        self.generation, self.published_at = struct.unpack_from('<Qq', data, 16)
+        meta = struct.unpack_from(META_FORMAT, data, META_OFFSET)
+        self.slave_counts = dict(zip(range(1, ARM_COUNT + 1), meta[2:2 + ARM_COUNT]))
+        self.passive_slaves = dict(zip(range(1, ARM_COUNT + 1), meta[2 + ARM_COUNT:2 + 2 * ARM_COUNT]))
+        self.balance_at = meta[-1]
+
+    def readings(self, arm, k):
+        """(kol, k) için {RAM indeksi: (değer, timestamp)} - veri olmayan indeksler hariç"""
+        start = HEADER_SIZE + _value_offset(arm, k)
+        values = struct.iter_unpack(VALUE_FORMAT, self._data[start:start + REG_SLOTS * VALUE_SIZE])
+        return {reg: (value, timestamp) for reg, (value, timestamp) in enumerate(values, 1) if timestamp}
+
+    def slot_bytes(self, arm, k):
+        """(kol, k) slotunun ham değer + durum byte'ları (değişiklik karşılaştırması için)"""
+        start = HEADER_SIZE + _value_offset(arm, k)
+        flag = HEADER_SIZE + _flag_offset(arm, k - K_MIN)
+        return self._data[start:start + REG_SLOTS * VALUE_SIZE] + self._data[flag:flag + 1]
+
+    def has_data(self, arm, battery):
+        return bool(self._data[HEADER_SIZE + _flag_offset(arm, battery)] & 1)
+
+    def active_alarm_types(self, arm, battery):
+        flags = self._data[HEADER_SIZE + _flag_offset(arm, battery)]
+        return [alarm_type for alarm_type in range(1, 8) if flags & (1 << alarm_type)]
+
+class LiveViewReader:
+    """web_app tarafı: paylaşımlı belleği seqlock + crc kontrolüyle oku"""
+
+    def __init__(self, path=LIVE_VIEW_PATH, max_age_seconds=10, retries=5):
+        self.path = path
+        self.max_age_seconds = max_age_seconds  # Daha eski yayın -> main.py çalışmıyor sayılır
+        self.retries = retries
+        self._mm = None
+
+    def _open(self):
+        if self._mm is None:
+            with open(self.path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size < SEGMENT_SIZE:
+                    return None
+                self._mm = mmap.mmap(f.fileno(), SEGMENT_SIZE, access=mmap.ACCESS_READ)
+        return self._mm
+
+    def snapshot(self):
+        """Tutarlı ve güncel kopya döndür (dosya yok, eski veya tutarsızsa None)"""
+        try:
+            mm = self._open()
+        except OSError:
+            return None
+        if mm is None:
+            return None
+
+        for _ in range(self.retries):
+            seq_before = struct.unpack_from('<Q', mm, SEQ_OFFSET)[0]
+            if seq_before & 1:
+                time.sleep(0)  # Yazıcıya sıra ver
+                continue
+            data = mm[:SEGMENT_SIZE]
+            if struct.unpack_from('<Q', mm, SEQ_OFFSET)[0] != seq_before:
+                continue
+            if data[:4] != MAGIC or struct.unpack_from('<H', data, 4)[0] != LAYOUT_VERSION:
+                return None
+            crc = struct.unpack_from('<I', data, 32)[0]
+            if zlib.crc32(data[HEADER_SIZE:], zlib.crc32(data[META_OFFSET:META_OFFSET + META_SIZE])) != crc:
+                continue  # Yırtık okuma (bellek sıralaması), tekrar dene
+            snapshot = LiveSnapshot(data)
+            if time.time() * 1000 - snapshot.published_at > self.max_age_seconds * 1000:
+                return None
+            return snapshot
+        return None
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+def changed_slots(previous, snapshot):
+    """İki kopya arasında kol bazında değişen k değerleri (k=2 kol verisi dahil)
+
+    Batarya sayısı veya pasif balans değişen kollar yapısal değişiklik sayılır ve tüm k'leri döner.
+    Dönüş: ({kol: [k, ...]}, {yapısal değişen kollar})
+    """
+    changed = {}
+    structural = set()
+    for arm in range(1, ARM_COUNT + 1):
+        addresses = range(K_MIN, K_MIN + 1 + snapshot.slave_counts.get(arm, 0))
+        if previous is None or previous.slave_counts.get(arm) != snapshot.slave_counts.get(arm) \
+                or previous.passive_slaves.get(arm) != snapshot.passive_slaves.get(arm):
+            structural.add(arm)
+            keys = list(addresses)
+        else:
+            keys = [k for k in addresses if previous.slot_bytes(arm, k) != snapshot.slot_bytes(arm, k)]
+        if keys:
+            changed[arm] = keys
+    return changed, structural
+
+class ChangeTracker:
+    """Her (kol, k) slotunun son değiştiği generation'ı tut (since_generation delta sorguları için)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._baseline = None  # Bu generation'dan eski sorgular tam yanıt alır
+        self._changed_at = {}  # (kol, k) -> generation
+        self._structural_at = {}  # kol -> generation
+
+    def update(self, snapshot):
+        """Yeni kopyayı işle (aynı generation tekrar gelirse bir şey yapmaz)"""
+        with self._lock:
+            previous = self._snapshot
+            if previous is not None and snapshot.generation == previous.generation:
+                return
+            if previous is None or snapshot.generation < previous.generation:
+                # İlk okuma veya main.py yeniden başladı (generation sıfırlandı)
+                self._baseline = snapshot.generation
+                self._changed_at.clear()
+                self._structural_at.clear()
+            else:
+                changed, structural = changed_slots(previous, snapshot)
+                for arm, keys in changed.items():
+                    for k in keys:
+                        self._changed_at[(arm, k)] = snapshot.generation
+                for arm in structural:
+                    self._structural_at[arm] = snapshot.generation
+            self._snapshot = snapshot
+
+    def changed_since(self, arm, since_generation):
+        """since_generation'dan sonra değişen k'ler (delta mümkün değilse None -> tam yanıt)"""
+        with self._lock:
+            if self._snapshot is None or since_generation is None \
+                    or since_generation < self._baseline or since_generation > self._snapshot.generation \
+                    or self._structural_at.get(arm, -1) > since_generation:
+                return None
+            return {k for (changed_arm, k), generation in self._changed_at.items()
+                    if changed_arm == arm and generation > since_generation}
+
+# Batteries/özet sayfaları için RAM indeksi -> alan adı (veritabanı yolundaki dtype eşlemesiyle aynı)
+BATTERY_FIELDS = (
+    (1, 10, 'voltage'),      # Gerilim
+    (4, 11, 'health'),       # Sağlık durumu (SOH)
+    (6, 12, 'temperature'),  # Sıcaklık (NTC2)
+    (2, 126, 'charge')       # Şarj durumu (SOC)
+)
+
+def battery_row(snapshot, arm, k, passive_slave=None, dtype_names=None):
+    """Tek batarya kaydı (veri yoksa None, dtype_names verilmezse *_name alanları eklenmez)"""
+    readings = snapshot.readings(arm, k)
+    if not readings:
+        return None
+    passive_balance_status = passive_slave == k
+    battery = {
+        'arm': arm,
+        'batteryAddress': k,
+        'timestamp': max(timestamp for _, timestamp in readings.values()),
+        'isActive': not passive_balance_status,
+        'passiveBalance': passive_balance_status
+    }
+    for reg, dtype, field in BATTERY_FIELDS:
+        reading = readings.get(reg)
+        battery[field] = reading[0] if reading else 0
+        if reading and dtype_names is not None:
+            battery[f'{field}_name'] = dtype_names.get(dtype)
+    return battery
+
+def battery_addresses(snapshot, arm):
+    """Kolun batarya k değerleri (3 ... 2 + batarya sayısı)"""
+    return range(K_MIN + 1, K_MIN + 1 + snapshot.slave_counts.get(arm, 0))
+
+def batteries_for_display(snapshot, page, page_size, arm, dtype_names):
+    """get_batteries_for_display ile aynı yapıda sayfa verisi (dtype_names: {dtype: çevrilmiş ad})"""
+    passive_slave = snapshot.passive_slaves.get(arm) or None
+    rows = [row for row in (battery_row(snapshot, arm, k, passive_slave, dtype_names)
+                            for k in battery_addresses(snapshot, arm)) if row]
+
+    start_idx = (page - 1) * page_size
+    return {
+        'batteries': rows[start_idx:start_idx + page_size],
+        'totalPages': (len(rows) + page_size - 1) // page_size if rows else 1,
+        'currentPage': 1
+    }
+
+def summary_data(snapshot):
+    """get_summary_data ile aynı yapıda kol özetleri"""
+    def average(values):
+        return sum(values) / len(values) if values else 0
+
+    summary = []
+    for arm in range(1, ARM_COUNT + 1):
+        slave_count = snapshot.slave_counts.get(arm, 0)
+        if not slave_count:
+            continue
+        arm_readings = snapshot.readings(arm, K_MIN)
+        battery_readings = [snapshot.readings(arm, k) for k in battery_addresses(snapshot, arm)]
+        timestamps = [timestamp for readings in [arm_readings] + battery_readings
+                      for _, timestamp in readings.values()]
+        if not timestamps:
+            continue
+
+        def battery_average(reg):
+            return average([readings[reg][0] for readings in battery_readings if reg in readings])
+
+        avg_voltage = battery_average(1)
+        avg_health = battery_average(4)
+        avg_charge = battery_average(2)
+        summary.append({
+            'arm': arm,
+            'timestamp': max(timestamps),
+            'current': arm_readings.get(1, (0,))[0] or 0,      # Akım
+            'humidity': arm_readings.get(2, (0,))[0] or 0,     # Nem
+            'temperature': arm_readings.get(3, (0,))[0] or 0,  # Modül sıcaklığı (dtype=12, k=2)
+            'battery_count': slave_count,
+            'avg_voltage': round(avg_voltage, 3) if avg_voltage else 0,
+            'avg_health': round(avg_health, 3) if avg_health else 0,
+            'avg_charge': round(avg_charge, 3) if avg_charge else 0
+        })
+    return summary
@@ -5,82 +5,234 @@ import ssl
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
+from contextlib import contextmanager
 import threading
+import queue
+import json
 import time
 from database import BatteryDatabase
 
+ALARM_SUBJECT = "🚨 Akü İzleme Sistemi - Alarm Bildirimi"
+
+# Oturumu bozmayan, sadece o alıcıyı/mesajı etkileyen SMTP hataları
+RECIPIENT_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError, smtplib.SMTPSenderRefused)
+
 class MailSender:
-    def __init__(self):
+    CONFIG_CHECK_SECONDS = 30  # Konfigürasyon değişikliği en fazla bu sıklıkla kontrol edilir
+    RETRY_BASE_SECONDS = 60  # İlk tekrar deneme gecikmesi (her denemede iki katı)
+    RETRY_MAX_SECONDS = 3600
+    RETRY_MAX_ATTEMPTS = 8
+    
+    def __init__(self, db=None, smtp_factory=smtplib.SMTP):
         # Veritabanı bağlantısı
-        self.db = BatteryDatabase()
+        self.db = db or BatteryDatabase()
         
         # SSL/TLS ayarları
         self.context = ssl.create_default_context()
+        
+        # Test için yerel SMTP sunucusu/sahte sınıf verilebilir
+        self.smtp_factory = smtp_factory
+        
+        # Konfigürasyon önbelleği (updated_at değişene kadar geçerli)
+        self._config_lock = threading.Lock()
+        self._config = None
+        self._config_version = None
+        self._config_checked_at = None
     
     def get_mail_config(self):
-        """Veritabanından mail konfigürasyonunu al"""
+        """Mail konfigürasyonunu önbellekten al (değiştiyse veritabanından yenile)"""
         try:
-            config = self.db.get_mail_server_config()
-            if config and config.get('is_active', False):
-                return config
-            return None
+            with self._config_lock:
+                now = time.monotonic()
+                if self._config_checked_at is not None and now - self._config_checked_at < self.CONFIG_CHECK_SECONDS:
+                    return self._config
+                
+                version = self.db.get_mail_server_config_version()
+                if self._config_checked_at is None or version != self._config_version:
+                    config = self.db.get_mail_server_config()
+                    self._config = config if config and config.get('is_active', False) else None
+                    self._config_version = version
+                self._config_checked_at = now
+                return self._config
         except Exception as e:
             print(f"Mail konfigürasyonu alınırken hata: {e}")
             return None
-        
-    def send_alarm_email(self, recipients, alarm_data):
-        """Alarm maili gönder"""
+    
+    def get_digest_settings(self):
+        """Özet mail ayarları: (pencere saniyesi, kritik alarmlar beklemeden gönderilsin mi)"""
+        config = self.get_mail_config() or {}
+        return (config.get('digest_window_minutes') or 0) * 60, config.get('digest_critical_bypass', True)
+    
+    def invalidate_config(self):
+        """Bir sonraki gönderimde konfigürasyonu yeniden kontrol et"""
+        with self._config_lock:
+            self._config_checked_at = None
+    
+    @contextmanager
+    def smtp_session(self, config):
+        """Tek bir kimliği doğrulanmış SMTP oturumu (batch boyunca kullanılır)"""
+        server = self.smtp_factory(config['smtp_server'], config['smtp_port'], timeout=30)
         try:
-            # Mail konfigürasyonunu kontrol et
-            config = self.get_mail_config()
-            if not config:
-                print("❌ Mail sunucu konfigürasyonu bulunamadı veya aktif değil")
-                return False
+            if config.get('use_tls', True):
+                server.starttls(context=self.context)
             
-            # Mail içeriği oluştur
-            subject = "🚨 Akü İzleme Sistemi - Alarm Bildirimi"
-            body = self.create_alarm_email_body(alarm_data)
-            
-            # Her alıcıya mail gönder
-            for recipient in recipients:
-                self.send_single_email(recipient['email'], recipient['name'], subject, body, config)
-                
-            print(f"✅ Alarm maili {len(recipients)} alıcıya gönderildi")
-            return True
+            # Kullanıcı adı ve şifre varsa giriş yap
+            if config.get('smtp_username') and config.get('smtp_password'):
+                server.login(config['smtp_username'], config['smtp_password'])
             
+            yield server
+        finally:
+            try:
+                server.quit()
+            except Exception:
+                server.close()
+    
+    def build_message(self, recipient_email, subject, body, config):
+        """Tek alıcı için MIME mesajı oluştur"""
+        message = MIMEMultipart("alternative")
+        message["Subject"] = subject
+        message["From"] = config['smtp_username']
+        message["To"] = recipient_email
+        
+        # HTML içerik
+        message.attach(MIMEText(body, "html", "utf-8"))
+        return message.as_string()
+    
+    def send_batch(self, jobs):
+        """Mail işlerini tek SMTP oturumunda gönder, başarısızları [(iş, alıcılar, hata)] olarak döndür
+        
+        jobs: {'recipients': [{'name', 'email'}], 'subject', 'body'} sözlükleri (opsiyonel 'retry_id', 'attempts')
+        """
+        config = self.get_mail_config()
+        if not config:
+            print("❌ Mail sunucu konfigürasyonu bulunamadı veya aktif değil")
+            return []
+        
+        pending = {id(job): list(job['recipients']) for job in jobs}
+        refused = {id(job): [] for job in jobs}
+        session_error = None
+        try:
+            with self.smtp_session(config) as server:
+                for job in jobs:
+                    remaining = pending[id(job)]
+                    while remaining:
+                        recipient = remaining[0]
+                        try:
+                            message = self.build_message(recipient['email'], job['subject'], job['body'], config)
+                            server.sendmail(config['smtp_username'], recipient['email'], message)
+                            print(f"✅ Mail gönderildi: {recipient['name']} ({recipient['email']})")
+                        except RECIPIENT_ERRORS as e:
+                            if self._is_permanent_error(e):
+                                # 5xx: tekrar denemek sonucu değiştirmez
+                                print(f"🗑️ Mail kalıcı olarak reddedildi, tekrar denenmeyecek ({recipient['email']}): {e}")
+                            else:
+                                print(f"❌ Mail gönderme hatası ({recipient['email']}): {e}")
+                                refused[id(job)].append((recipient, str(e)))
+                        remaining.pop(0)
         except Exception as e:
-            print(f"❌ Mail gönderme hatası: {e}")
-            return False
+            # Bağlantı/oturum hatası: henüz gönderilmemiş tüm alıcılar tekrar denenecek
+            print(f"❌ SMTP oturum hatası: {e}")
+            session_error = str(e)
+        
+        # Oturum koptuğunda yarıda kalan işin daha önce reddedilen alıcıları da kuyruğa girer
+        failures = []
+        for job in jobs:
+            job_refused = refused[id(job)]
+            recipients = [recipient for recipient, _ in job_refused] + pending[id(job)]
+            if recipients:
+                error = session_error if pending[id(job)] else job_refused[-1][1]
+                failures.append((job, recipients, error))
+        
+        self._handle_results(jobs, failures)
+        return failures
+    
+    @staticmethod
+    def _is_permanent_error(error):
+        """SMTP hatası kalıcı mı (5xx)"""
+        if isinstance(error, smtplib.SMTPRecipientsRefused):
+            codes = [code for code, _ in error.recipients.values()]
+        else:
+            codes = [error.smtp_code]
+        return bool(codes) and all(500 <= code < 600 for code in codes)
+    
+    def _retry_delay_ms(self, attempts):
+        """Üstel geri çekilme gecikmesi (ms)"""
+        return int(min(self.RETRY_BASE_SECONDS * (2 ** attempts), self.RETRY_MAX_SECONDS) * 1000)
+    
+    def _handle_results(self, jobs, failures):
+        """Başarısız alıcıları tekrar deneme kuyruğuna yaz, tamamlanan tekrar denemeleri sil"""
+        failed_jobs = {id(job) for job, _, _ in failures}
+        now_ms = int(time.time() * 1000)
+        
+        for job in jobs:
+            if job.get('retry_id') and id(job) not in failed_jobs:
+                self.db.delete_mail_retry(job['retry_id'])
+        
+        for job, recipients, error in failures:
+            self.enqueue_retry(job, recipients, error, now_ms)
+    
+    def enqueue_retry(self, job, recipients, error=None, now_ms=None):
+        """İşi (kalan alıcılarla) kalıcı tekrar deneme kuyruğuna yaz"""
+        now_ms = now_ms or int(time.time() * 1000)
+        recipients_json = json.dumps(recipients, ensure_ascii=False)
+        
+        if job.get('retry_id'):
+            attempts = job.get('attempts', 0) + 1
+            if attempts >= self.RETRY_MAX_ATTEMPTS:
+                print(f"🗑️ Mail {attempts} denemede gönderilemedi, kuyruktan çıkarıldı: {error}")
+                self.db.delete_mail_retry(job['retry_id'])
+                return
+            delay_ms = self._retry_delay_ms(attempts)
+            self.db.reschedule_mail_retry(job['retry_id'], recipients_json, attempts, now_ms + delay_ms, error)
+        else:
+            delay_ms = self._retry_delay_ms(0)
+            self.db.enqueue_mail_retry(recipients_json, job['subject'], job['body'], now_ms + delay_ms, 0, error)
+        print(f"🔄 {len(recipients)} alıcı tekrar deneme kuyruğunda ({delay_ms // 1000}s sonra)")
     
-    def send_single_email(self, recipient_email, recipient_name, subject, body, config):
-        """Tek alıcıya mail gönder"""
+    def process_retries(self, limit=20):
+        """Zamanı gelmiş tekrar denemeleri tek oturumda gönder, denenen iş sayısını döndür"""
+        due = self.db.get_due_mail_retries(int(time.time() * 1000), limit)
+        if not due:
+            return 0
+        
+        jobs = [{
+            'recipients': json.loads(retry['recipients']),
+            'subject': retry['subject'],
+            'body': retry['body'],
+            'retry_id': retry['id'],
+            'attempts': retry['attempts']
+        } for retry in due]
+        print(f"🔄 {len(jobs)} mail tekrar deneniyor...")
+        self.send_batch(jobs)
+        return len(jobs)
+    
+    def create_alarm_job(self, recipients, alarm_data):
+        """Alarm listesinden gönderilecek mail işini oluştur"""
+        return {
+            'recipients': [{'name': recipient.get('name'), 'email': recipient['email']} for recipient in recipients],
+            'subject': ALARM_SUBJECT,
+            'body': self.create_alarm_email_body(alarm_data)
+        }
+        
+    def send_alarm_email(self, recipients, alarm_data):
+        """Alarm maili gönder (senkron, tüm alıcılar tek oturumda)"""
         try:
-            # Mail mesajı oluştur
-            message = MIMEMultipart("alternative")
-            message["Subject"] = subject
-            message["From"] = config['smtp_username']
-            message["To"] = recipient_email
-            
-            # HTML içerik
-            html_body = MIMEText(body, "html", "utf-8")
-            message.attach(html_body)
-            
-            # SMTP bağlantısı ve mail gönderme
-            with smtplib.SMTP(config['smtp_server'], config['smtp_port']) as server:
-                if config.get('use_tls', True):
-                    server.starttls(context=self.context)
-                
-                # Kullanıcı adı ve şifre varsa giriş yap
-                if config.get('smtp_username') and config.get('smtp_password'):
-                    server.login(config['smtp_username'], config['smtp_password'])
-                
-                server.sendmail(config['smtp_username'], recipient_email, message.as_string())
-                
-            print(f"✅ Mail gönderildi: {recipient_name} ({recipient_email})")
+            failures = self.send_batch([self.create_alarm_job(recipients, alarm_data)])
+            if not failures:
+                print(f"✅ Alarm maili {len(recipients)} alıcıya gönderildi")
+            return not failures
             
         except Exception as e:
-            print(f"❌ Mail gönderme hatası ({recipient_email}): {e}")
-            raise
+            print(f"❌ Mail gönderme hatası: {e}")
+            return False
+    
+    @staticmethod
+    def _alarm_cells(alarm):
+        """Açıklama ve tarih hücreleri (özette tekrar eden alarm için sayı ve ilk-son zaman)"""
+        count = alarm.get('count', 1)
+        if count > 1:
+            return f"{alarm['description']} ({count} kez)", f"{alarm['first_timestamp']} - {alarm['timestamp']}"
+        return alarm['description'], alarm['timestamp']
     
     def create_alarm_email_body(self, alarm_data):
         """Alarm mail içeriği oluştur"""
@@ -138,11 +290,12 @@ class MailSender:
                             <tbody>
             """
             for alarm in arm_alarms:
+                description, timestamp = self._alarm_cells(alarm)
                 html += f"""
                                 <tr class="arm-alarm">
                                     <td>Kol {alarm['arm']}</td>
-                                    <td>{alarm['description']}</td>
-                                    <td>{alarm['timestamp']}</td>
+                                    <td>{description}</td>
+                                    <td>{timestamp}</td>
                                 </tr>
                 """
             html += """
@@ -168,12 +321,13 @@ class MailSender:
                             <tbody>
             """
             for alarm in battery_alarms:
+                description, timestamp = self._alarm_cells(alarm)
                 html += f"""
                                 <tr class="battery-alarm">
                                     <td>Kol {alarm['arm']}</td>
                                     <td>{alarm['battery']}</td>
-                                    <td>{alarm['description']}</td>
-                                    <td>{alarm['timestamp']}</td>
+                                    <td>{description}</td>
+                                    <td>{timestamp}</td>
                                 </tr>
                 """
             html += """
@@ -196,18 +350,133 @@ class MailSender:
         
         return html
 
+class MailDispatcher:
+    """Tek worker thread ile sıralı mail gönderimi (sınırlı kuyruk, batch başına tek SMTP oturumu)"""
+    
+    def __init__(self, sender, max_pending=100, batch_size=20, retry_check_seconds=60):
+        self.sender = sender
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.batch_size = batch_size
+        self.retry_check_seconds = retry_check_seconds
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._last_retry_check = 0
+    
+    def _ensure_worker(self):
+        """Worker thread'i ilk kullanımda başlat"""
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker, name='mail-dispatcher', daemon=True)
+                self._thread.start()
+    
+    def submit(self, recipients, alarm_data):
+        """Alarm mailini kuyruğa ekle (kuyruk doluysa doğrudan tekrar deneme kuyruğuna yaz)"""
+        job = self.sender.create_alarm_job(recipients, alarm_data)
+        try:
+            self.queue.put_nowait(job)
+        except queue.Full:
+            print("⚠️ Mail kuyruğu dolu, mail tekrar deneme kuyruğuna yazıldı")
+            self.sender.enqueue_retry(job, job['recipients'], 'Mail kuyruğu dolu')
+        self._ensure_worker()
+    
+    def _worker(self):
+        """Kuyruktaki işleri batch'ler halinde gönder, boşta tekrar denemeleri işle"""
+        while True:
+            try:
+                jobs = [self.queue.get(timeout=self.retry_check_seconds)]
+                # Alarm fırtınasında biriken işleri aynı oturumda gönder
+                while len(jobs) < self.batch_size:
+                    try:
+                        jobs.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+                try:
+                    self.sender.send_batch(jobs)
+                except Exception as e:
+                    print(f"❌ Mail dispatcher hatası: {e}")
+                finally:
+                    for _ in jobs:
+                        self.queue.task_done()
+            except queue.Empty:
+                pass
+            
+            if time.monotonic() - self._last_retry_check >= self.retry_check_seconds:
+                self._last_retry_check = time.monotonic()
+                try:
+                    self.sender.process_retries()
+                except Exception as e:
+                    print(f"❌ Mail tekrar deneme hatası: {e}")
+    
+    def flush(self):
+        """Kuyruktaki tüm işler gönderilene kadar bekle"""
+        self.queue.join()
+
+class MailDigest:
+    """Alarmları pencere boyunca biriktirip tek özet mail olarak gönder (aynı alarm sayılarak tekilleşir)"""
+    
+    def __init__(self, sender, dispatcher):
+        self.sender = sender
+        self.dispatcher = dispatcher
+        self._lock = threading.Lock()
+        self._entries = {}  # (tür, kol, batarya, açıklama) -> özet alarm
+        self._timer = None
+    
+    def add(self, alarm_data, window_seconds):
+        """İşlenmiş alarmları özete ekle, pencere ilk alarmla başlar"""
+        with self._lock:
+            for alarm in alarm_data:
+                key = (alarm['type'], alarm['arm'], alarm['battery'], alarm['description'])
+                entry = self._entries.get(key)
+                if entry:
+                    entry['count'] += 1
+                    entry['timestamp'] = alarm['timestamp']
+                else:
+                    self._entries[key] = dict(alarm, count=1, first_timestamp=alarm['timestamp'])
+            
+            if self._timer is None:
+                self._timer = threading.Timer(window_seconds, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+                print(f"📨 Özet mail penceresi başladı ({int(window_seconds // 60)} dk)")
+    
+    def flush(self):
+        """Biriken alarmları tek mail olarak kuyruğa ver, gönderilen alarm sayısını döndür"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            entries, self._entries = list(self._entries.values()), {}
+        
+        if not entries:
+            return 0
+        try:
+            recipients = self.sender.db.get_mail_recipients()
+            if not recipients:
+                print("⚠️ Mail alıcısı bulunamadı, özet mail gönderilmedi")
+                return 0
+            self.dispatcher.submit(recipients, entries)
+            repeats = sum(entry['count'] for entry in entries)
+            print(f"✅ Özet mail kuyruğa eklendi: {len(entries)} alarm ({repeats} tekrar) {len(recipients)} alıcıya")
+            return len(entries)
+        except Exception as e:
+            print(f"❌ Özet mail hatası: {e}")
+            return 0
+
 # Global mail sender instance
 mail_sender = MailSender()
+mail_dispatcher = MailDispatcher(mail_sender)
+mail_digest = MailDigest(mail_sender, mail_dispatcher)
 
 def send_alarm_notification(recipients, alarm_data):
-    """Alarm bildirimi gönder (thread-safe)"""
-    def send_in_thread():
-        try:
-            mail_sender.send_alarm_email(recipients, alarm_data)
-        except Exception as e:
-            print(f"❌ Mail gönderme thread hatası: {e}")
-    
-    # Arka planda mail gönder
-    thread = threading.Thread(target=send_in_thread)
-    thread.daemon = True
-    thread.start()
+    """Alarm bildirimi gönder (thread-safe, tek worker kuyruğu üzerinden)"""
+    try:
+        mail_dispatcher.submit(recipients, alarm_data)
+    except Exception as e:
+        print(f"❌ Mail kuyruğa eklenemedi: {e}")
+
+def queue_alarm_digest(alarm_data, window_seconds):
+    """Alarmları özet mail penceresine ekle"""
+    try:
+        mail_digest.add(alarm_data, window_seconds)
+    except Exception as e:
+        print(f"❌ Alarm özete eklenemedi: {e}")
@@ -14,6 +14,9 @@ import sys
 from collections import defaultdict
 from database import BatteryDatabase
 from alarm_processor import AlarmProcessor
+from retention import RetentionEngine
+from command_channel import CommandServer, read_fallback
+from live_view import LiveViewWriter
 #DEĞİŞİKLİK33322222
 #yenilik
 #BAKALIM NE OLACAK
@@ -81,6 +84,12 @@ read_all_arm = None
 status_ram = {}  # {arm: {battery: bool}} - True=veri var, False=veri yok
 status_lock = threading.RLock()  # Thread-safe erişim için
 
+# Pasif balans durumu (son gelen balans verisi)
+passive_balance_ram = {}  # {'arm': int, 'slave': int, 'status': int, 'timestamp': int}
+
+# web_app canlı görünümü (paylaşımlı bellek) yayın aralığı
+LIVE_VIEW_INTERVAL = 0.5
+
 # Trap hedefleri için RAM yapısı
 trap_targets_ram = []  # [{'id': int, 'name': str, 'ip_address': str, 'port': int, 'is_active': bool}]
 trap_targets_lock = threading.Lock()  # Thread-safe erişim için
@@ -288,36 +297,9 @@ def capture_data_for_retrieval(arm_value, k_value, dtype, salt_data):
     if not config:
         return
     
-    # Veriyi dosyaya yaz
-    data_entry = {
-        'timestamp': datetime.datetime.now().strftime('%H:%M:%S'),
-        'arm': arm_value,
-        'k': k_value,
-        'dtype': dtype,
-        'value': salt_data,
-        'requested_value': config['valueText']
-    }
-    
-    # pending_config.json dosyasına veri ekle
-    try:
-        if os.path.exists('pending_config.json'):
-            with open('pending_config.json', 'r', encoding='utf-8') as f:
-                existing_data = json.load(f)
-        else:
-            existing_data = {}
-        
-        if 'retrieved_data' not in existing_data:
-            existing_data['retrieved_data'] = []
-        
-        existing_data['retrieved_data'].append(data_entry)
-        
-        with open('pending_config.json', 'w', encoding='utf-8') as f:
-            json.dump(existing_data, f, indent=2, ensure_ascii=False)
-        
-        print(f"📊 Veri yakalandı: Kol {arm_value}, k={k_value}, dtype={dtype}, değer={salt_data}")
-        
-    except Exception as e:
-        print(f"❌ Veri yakalama hatası: {e}")
+    # Yakalanan veri web_app'e veritabanı üzerinden ulaşır (/api/get-retrieved-data),
+    # komut dosyasına yazılmaz
+    print(f"📊 Veri yakalandı: Kol {arm_value}, k={k_value}, dtype={dtype}, değer={salt_data} ({config['valueText']})")
 
 
 def is_valid_arm_data(arm_value, k_value):
@@ -1361,6 +1343,7 @@ def db_worker():
                             
                             with db_lock:
                                 db.update_or_insert_passive_balance(arm_value, k_value, status_value, balance_timestamp)  # k_value kaydet
+                            passive_balance_ram.update(arm=arm_value, slave=k_value, status=status_value, timestamp=balance_timestamp)
                             print(f"✓ Balans güncellendi: Arm={arm_value}, k={k_value}, Battery={battery_value}, Status={status_value}")
                             program_start_time = updated_at
                     except Exception as e:
@@ -1706,131 +1689,193 @@ def send_read_all_command(command):
     except Exception as e:
         print(f"❌ Tümünü oku komutu gönderilirken hata: {e}")
 
-def config_worker():
-    """Konfigürasyon değişikliklerini işle"""
+def retention_worker():
+    """Retention politikasını periyodik olarak uygula (zaman bütçeli, sınırlı chunk'lar)"""
+    engine = RetentionEngine(db)
+    time.sleep(600)  # Açılışta seri okuma/DB yazma ile yarışmasın
+    while True:
+        interval_hours = 24
+        try:
+            config = db.get_retention_config() or {}
+            interval_hours = config.get('run_interval_hours') or 24
+            report = engine.run_once()
+            if not report.get('completed', True):
+                # Bütçe doldu, kalan kısmı kısa süre sonra işle
+                interval_hours = min(interval_hours, 0.25)
+        except Exception as e:
+            print(f"❌ Retention hatası: {e}")
+        time.sleep(interval_hours * 3600)
+
+def handle_command(config_data):
+    """web_app'ten gelen tek bir komutu işle (komut kanalı ve uyumluluk dosyası ortak)"""
     global read_all_mode, read_all_arm
+    if config_data.get('type') == 'batconfig':
+        # Database'deki yeni fonksiyonu kullan
+        data = config_data['data']
+        db.save_battery_config(
+            data['armValue'], data['Vmin'], data['Vmax'], data['Vnom'],
+            data['Rintnom'], data['Tempmin_D'], data['Tempmax_D'],
+            data['Tempmin_PN'], data['Tempmax_PN'], data['Socmin'], data['Sohmin']
+        )
+        # Cihaza da gönder
+        send_batconfig_to_device(data)
+    elif config_data.get('type') == 'armconfig':
+        # Database'deki yeni fonksiyonu kullan
+        data = config_data['data']
+        db.save_arm_config(
+            data['armValue'], data['akimKats'], data['akimMax'],
+            data['nemMax'], data['nemMin'], data['tempMax'], data['tempMin']
+        )
+        # Cihaza da gönder
+        send_armconfig_to_device(data)
+    elif config_data.get('type') == 'send_to_device':
+        # Tümünü oku komutu gönder
+        command = config_data.get('command', '5 5 0x7A')
+        send_read_all_command(command)
+    elif config_data.get('type') == 'manual_set':
+        # Manuel kol set komutu gönder
+        arm = config_data.get('arm')
+        slave = config_data.get('slave', 0)
+        command = config_data.get('command')
+        if command:
+            print(f"*** MANUEL KOL SET KOMUTU GÖNDERİLİYOR ***")
+            print(f"Arm: {arm}, Slave: {slave}, Komut: {command} (Hex: {[hex(x) for x in command]})")
+            wave_uart_send(pi, TX_PIN, command, int(1e6 / BAUD_RATE))
+            print(f"✓ Kol {arm}, Batarya {slave} manuel set komutu cihaza gönderildi")
+    elif config_data.get('type') == 'command':
+        # Toplu komut gönder (readAll, resetAll)
+        command = config_data.get('command')
+        arm = config_data.get('arm')
+        packet = config_data.get('packet')
+        if packet:
+            print(f"*** TOPLU KOMUT GÖNDERİLİYOR ***")
+            print(f"Komut: {command}, Kol: {arm}, Paket: {packet} (Hex: {[hex(x) for x in packet]})")
+            wave_uart_send(pi, TX_PIN, packet, int(1e6 / BAUD_RATE))
+            print(f"✓ {command} komutu cihaza gönderildi")
+
+            # "Tümünü Oku" komutu gönderildiğinde flag'i True yap ve veri alma modunu başlat
+            if command == 'readAll':
+                read_all_mode = True
+                read_all_arm = arm
+                print(f"🔍 TÜMÜNÜ OKU MODU AKTİF - Kol {arm}")
+
+                # Veri alma modunu da başlat
+                config = {
+                    'arm': arm,
+                    'address': 0,  # Tümünü Oku için adres 0
+                    'value': 0,    # Tümünü Oku için değer 0
+                    'valueText': 'Tüm Veriler'
+                }
+                set_data_retrieval_mode(True, config)
+                print(f"🔧 VERİ ALMA MODU BAŞLATILDI - Tümünü Oku için")
+    elif config_data.get('type') == 'dataget':
+        # Veri alma komutu gönder
+        arm_value = config_data.get('armValue')
+        slave_address = config_data.get('slaveAddress')
+        slave_command = config_data.get('slaveCommand')
+        packet = config_data.get('packet')
+        if packet:
+            print(f"*** VERİ ALMA KOMUTU GÖNDERİLİYOR ***")
+            print(f"Kol: {arm_value}, Adres: {slave_address}, Komut: {slave_command}, Paket: {packet} (Hex: {[hex(x) for x in packet]})")
+            wave_uart_send(pi, TX_PIN, packet, int(1e6 / BAUD_RATE))
+            print(f"✓ Veri alma komutu cihaza gönderildi")
+    elif config_data.get('type') == 'data_retrieval_start':
+        # Veri alma modunu başlat (JSON dosyasından)
+        config = config_data.get('config')
+        if config:
+            set_data_retrieval_mode(True, config)
+            print(f"🔧 VERİ ALMA MODU BAŞLATILDI (JSON'dan): {config}")
+
+            # Eğer "Tümünü Oku" (address=0) ise, UART'a komut gönder
+            if config.get('address') == 0:
+                arm = config.get('arm')
+                if arm:
+                    # Tümünü Oku komutu paketini hazırla
+                    if arm == 5:  # Tüm kollar
+                        command_packet = [0x81, 5, 0x7A]  # 0x81 0x05 0x7A
+                    else:  # Belirli kol
+                        command_packet = [0x81, arm, 0x7A]  # 0x81 0xkol 0x7A
+
+                    print(f"*** TÜMÜNÜ OKU KOMUTU GÖNDERİLİYOR (Veri Alma Modu) ***")
+                    print(f"Kol: {arm}, Paket: {[f'0x{b:02X}' for b in command_packet]}")
+                    wave_uart_send(pi, TX_PIN, command_packet, int(1e6 / BAUD_RATE))
+                    print(f"✓ Tümünü oku komutu cihaza gönderildi (Veri Alma Modu)")
+
+                    # read_all_mode flag'ini de set et
+                    read_all_mode = True
+                    read_all_arm = arm
+                    print(f"🔍 TÜMÜNÜ OKU MODU AKTİF - Kol {arm}")
+    elif config_data.get('type') == 'data_retrieval_stop':
+        # Veri alma modunu durdur (JSON dosyasından)
+        set_data_retrieval_mode(False, None)
+        print(f"🛑 VERİ ALMA MODU DURDURULDU (JSON'dan)")
+    elif config_data.get('type') == 'reload_trap_targets':
+        # Trap hedeflerini yeniden yükle
+        load_trap_targets_to_ram()
+        print(f"🔄 Trap hedefleri yeniden yüklendi")
+
+def load_passive_balance_to_ram():
+    """Son pasif balans durumunu DB'den RAM'e al"""
+    try:
+        with db.get_read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT arm, slave, status, timestamp FROM passive_balance ORDER BY timestamp DESC LIMIT 1")
+            row = cursor.fetchone()
+            if row:
+                passive_balance_ram.update(arm=row[0], slave=row[1], status=row[2], timestamp=row[3])
+    except Exception as e:
+        print(f"❌ Pasif balans RAM'e yüklenirken hata: {e}")
+
+def live_view_worker():
+    """RAM verisini web_app için paylaşımlı belleğe yayınla (web_app DB'ye gitmeden okur)"""
+    try:
+        writer = LiveViewWriter()
+        print(f"✓ Canlı görünüm yayınlanıyor: {writer.path}")
+    except Exception as e:
+        print(f"❌ Canlı görünüm başlatılamadı, web_app veritabanından okuyacak: {e}")
+        return
+    
+    load_passive_balance_to_ram()
     while True:
         try:
-            config_file = "pending_config.json"
-            if os.path.exists(config_file):
+            with data_lock:
+                battery_data = {arm: {k: dict(registers) for k, registers in arm_data.items()}
+                                for arm, arm_data in battery_data_ram.items()}
+                slave_counts = dict(arm_slave_counts_ram)
+            with status_lock:
+                status = {arm: dict(batteries) for arm, batteries in status_ram.items()}
+            with alarm_lock:
+                alarms = {arm: {battery: dict(types) for battery, types in batteries.items()}
+                          for arm, batteries in alarm_ram.items()}
+            
+            passive_slaves = {}
+            if passive_balance_ram.get('status') == 0:
+                passive_slaves[passive_balance_ram.get('arm')] = passive_balance_ram.get('slave')
+            
+            writer.publish(slave_counts, battery_data, status, alarms, passive_slaves,
+                           passive_balance_ram.get('timestamp') or 0)
+        except Exception as e:
+            print(f"❌ Canlı görünüm yayın hatası: {e}")
+        time.sleep(LIVE_VIEW_INTERVAL)
+
+def config_worker():
+    """Komut kanalını başlat, eski sürümler için pending_config.json dosyasını da izle"""
+    try:
+        command_server = CommandServer(handle_command)
+        command_server.start()
+    except Exception as e:
+        print(f"❌ Komut kanalı başlatılamadı, sadece dosya ile çalışılacak: {e}")
+    
+    while True:
+        try:
+            for config_data in read_fallback():
                 try:
-                    with open(config_file, 'r', encoding='utf-8') as f:
-                        config_data = json.load(f)
-                    os.remove(config_file)
-                    
-                    if config_data.get('type') == 'batconfig':
-                        # Database'deki yeni fonksiyonu kullan
-                        data = config_data['data']
-                        db.save_battery_config(
-                            data['armValue'], data['Vmin'], data['Vmax'], data['Vnom'],
-                            data['Rintnom'], data['Tempmin_D'], data['Tempmax_D'],
-                            data['Tempmin_PN'], data['Tempmax_PN'], data['Socmin'], data['Sohmin']
-                        )
-                        # Cihaza da gönder
-                        send_batconfig_to_device(data)
-                    elif config_data.get('type') == 'armconfig':
-                        # Database'deki yeni fonksiyonu kullan
-                        data = config_data['data']
-                        db.save_arm_config(
-                            data['armValue'], data['akimKats'], data['akimMax'],
-                            data['nemMax'], data['nemMin'], data['tempMax'], data['tempMin']
-                        )
-                        # Cihaza da gönder
-                        send_armconfig_to_device(data)
-                    elif config_data.get('type') == 'send_to_device':
-                        # Tümünü oku komutu gönder
-                        command = config_data.get('command', '5 5 0x7A')
-                        send_read_all_command(command)
-                    elif config_data.get('type') == 'manual_set':
-                        # Manuel kol set komutu gönder
-                        arm = config_data.get('arm')
-                        slave = config_data.get('slave', 0)
-                        command = config_data.get('command')
-                        if command:
-                            print(f"*** MANUEL KOL SET KOMUTU GÖNDERİLİYOR ***")
-                            print(f"Arm: {arm}, Slave: {slave}, Komut: {command} (Hex: {[hex(x) for x in command]})")
-                            wave_uart_send(pi, TX_PIN, command, int(1e6 / BAUD_RATE))
-                            print(f"✓ Kol {arm}, Batarya {slave} manuel set komutu cihaza gönderildi")
-                    elif config_data.get('type') == 'command':
-                        # Toplu komut gönder (readAll, resetAll)
-                        command = config_data.get('command')
-                        arm = config_data.get('arm')
-                        packet = config_data.get('packet')
-                        if packet:
-                            print(f"*** TOPLU KOMUT GÖNDERİLİYOR ***")
-                            print(f"Komut: {command}, Kol: {arm}, Paket: {packet} (Hex: {[hex(x) for x in packet]})")
-                            wave_uart_send(pi, TX_PIN, packet, int(1e6 / BAUD_RATE))
-                            print(f"✓ {command} komutu cihaza gönderildi")
-                            
-                            # "Tümünü Oku" komutu gönderildiğinde flag'i True yap ve veri alma modunu başlat
-                            if command == 'readAll':
-                                read_all_mode = True
-                                read_all_arm = arm
-                                print(f"🔍 TÜMÜNÜ OKU MODU AKTİF - Kol {arm}")
-                                
-                                # Veri alma modunu da başlat
-                                config = {
-                                    'arm': arm,
-                                    'address': 0,  # Tümünü Oku için adres 0
-                                    'value': 0,    # Tümünü Oku için değer 0
-                                    'valueText': 'Tüm Veriler'
-                                }
-                                set_data_retrieval_mode(True, config)
-                                print(f"🔧 VERİ ALMA MODU BAŞLATILDI - Tümünü Oku için")
-                    elif config_data.get('type') == 'dataget':
-                        # Veri alma komutu gönder
-                        arm_value = config_data.get('armValue')
-                        slave_address = config_data.get('slaveAddress')
-                        slave_command = config_data.get('slaveCommand')
-                        packet = config_data.get('packet')
-                        if packet:
-                            print(f"*** VERİ ALMA KOMUTU GÖNDERİLİYOR ***")
-                            print(f"Kol: {arm_value}, Adres: {slave_address}, Komut: {slave_command}, Paket: {packet} (Hex: {[hex(x) for x in packet]})")
-                            wave_uart_send(pi, TX_PIN, packet, int(1e6 / BAUD_RATE))
-                            print(f"✓ Veri alma komutu cihaza gönderildi")
-                    elif config_data.get('type') == 'data_retrieval_start':
-                        # Veri alma modunu başlat (JSON dosyasından)
-                        config = config_data.get('config')
-                        if config:
-                            set_data_retrieval_mode(True, config)
-                            print(f"🔧 VERİ ALMA MODU BAŞLATILDI (JSON'dan): {config}")
-                            
-                            # Eğer "Tümünü Oku" (address=0) ise, UART'a komut gönder
-                            if config.get('address') == 0:
-                                arm = config.get('arm')
-                                if arm:
-                                    # Tümünü Oku komutu paketini hazırla
-                                    if arm == 5:  # Tüm kollar
-                                        command_packet = [0x81, 5, 0x7A]  # 0x81 0x05 0x7A
-                                    else:  # Belirli kol
-                                        command_packet = [0x81, arm, 0x7A]  # 0x81 0xkol 0x7A
-                                    
-                                    print(f"*** TÜMÜNÜ OKU KOMUTU GÖNDERİLİYOR (Veri Alma Modu) ***")
-                                    print(f"Kol: {arm}, Paket: {[f'0x{b:02X}' for b in command_packet]}")
-                                    wave_uart_send(pi, TX_PIN, command_packet, int(1e6 / BAUD_RATE))
-                                    print(f"✓ Tümünü oku komutu cihaza gönderildi (Veri Alma Modu)")
-                                    
-                                    # read_all_mode flag'ini de set et
-                                    read_all_mode = True
-                                    read_all_arm = arm
-                                    print(f"🔍 TÜMÜNÜ OKU MODU AKTİF - Kol {arm}")
-                    elif config_data.get('type') == 'data_retrieval_stop':
-                        # Veri alma modunu durdur (JSON dosyasından)
-                        set_data_retrieval_mode(False, None)
-                        print(f"🛑 VERİ ALMA MODU DURDURULDU (JSON'dan)")
-                    elif config_data.get('type') == 'reload_trap_targets':
-                        # Trap hedeflerini yeniden yükle
-                        load_trap_targets_to_ram()
-                        print(f"🔄 Trap hedefleri yeniden yüklendi")
-                    
+                    handle_command(config_data)
                 except Exception as e:
                     print(f"Konfigürasyon dosyası işlenirken hata: {e}")
-                    if os.path.exists(config_file):
-                        os.remove(config_file)
-            time.sleep(1)
         except Exception as e:
             print(f"Config worker hatası: {e}")
-            time.sleep(1)
+        time.sleep(1)
 
 def get_dynamic_data_by_index_new(start_index, quantity):
     """Dinamik veri indeksine göre veri döndür - YENİ MANTIK"""
@@ -2010,6 +2055,16 @@ def main():
         config_thread.start()
         print("Config worker thread'i başlatıldı.")
 
+        # web_app canlı görünümü (paylaşımlı bellek)
+        live_view_thread = threading.Thread(target=live_view_worker, daemon=True)
+        live_view_thread.start()
+        print("Live view worker thread'i başlatıldı.")
+
+        # Veri saklama (retention) işlemleri
+        retention_thread = threading.Thread(target=retention_worker, daemon=True)
+        retention_thread.start()
+        print("Retention worker thread'i başlatıldı.")
+
         # Modbus TCP sunucu
         modbus_thread = threading.Thread(target=modbus_tcp_server, daemon=False)
         modbus_thread.start()
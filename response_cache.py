@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+class ResponseCache:
+    """Okuma ağırlıklı endpoint'lerin JSON gövdelerini (endpoint, parametreler, generation) ile sakla
+
+    Generation girdiler değişince artar (canlı görünüm generation'ı veya konfigürasyon yazımı),
+    bu yüzden eski kayıtlar bir daha eşleşmez ve zamanla dışarı atılır.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (body, etag, mimetype, {kodlama: sıkıştırılmış gövde})
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[:3]
+
+    def put(self, key, body, mimetype):
+        """Gövdeyi sakla ve güçlü ETag'ini döndür"""
+        etag = make_etag(body)
+        with self._lock:
+            self._entries[key] = (body, etag, mimetype, {})
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return etag
+
+    def variant(self, key, body, encoding, compress):
+        """Gövdenin sıkıştırılmış hali (kayıt başına bir kez sıkıştırılır, tekrar isteklerde bellekten)"""
+        if not encoding:
+            return body
+        with self._lock:
+            entry = self._entries.get(key)
+            data = entry[3].get(encoding) if entry else None
+        if data is None:
+            data = compress(body, encoding)
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry and entry[0] is body:
+                    entry[3][encoding] = data
+        return data
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+def make_etag(body):
+    """Gövde içeriğinden güçlü ETag (aynı içerik farklı generation'da da aynı ETag'i alır)"""
+    return hashlib.blake2b(body, digest_size=12).hexdigest()
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+
+import json
+import time
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+class RetentionEngine:
+    """Kademeli veri saklama: ham veri -> saatlik rollup -> günlük rollup"""
+
+    def __init__(self, db, pause_seconds=0.2, vacuum_step_pages=1000):
+        self.db = db
+        self.pause_seconds = pause_seconds  # Chunk'lar arası bekleme (yazıcıya nefes aldırır)
+        self.vacuum_step_pages = vacuum_step_pages
+
+    def _load_policy(self):
+        """Retention politikasını veritabanından al (yoksa varsayılanlar)"""
+        config = self.db.get_retention_config() or {}
+        return {
+            'raw_days': config.get('raw_days', 30),
+            'hourly_days': config.get('hourly_days', 730),
+            'daily_days': config.get('daily_days'),
+            'chunk_size': config.get('chunk_size') or 5000,
+            'max_run_seconds': config.get('max_run_seconds') or 60,
+            'is_active': config.get('is_active', True)
+        }
+
+    def _delete_in_chunks(self, delete_sql, params, chunk_size, deadline, prepare=None):
+        """Sınırlı chunk'lar halinde sil, her chunk ayrı kısa transaction (bütçe bitince dur)"""
+        total = 0
+        while time.monotonic() < deadline:
+            with self.db.get_connection() as conn:
+                if prepare:
+                    prepare(conn)  # ATTACH gibi transaction dışı hazırlık
+                cursor = conn.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
+                try:
+                    cursor.execute(delete_sql, params + (chunk_size,))
+                    deleted = cursor.rowcount
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+            total += deleted
+            if deleted < chunk_size:
+                return total, True
+            time.sleep(self.pause_seconds)
+        return total, False
+
+    def _rollups_cover(self, cutoff):
+        """Silinecek ham verinin saatlik rollup'ı var mı (rebuild yapılmamış eski DB koruması)"""
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            oldest_raw = self.db.battery_data_bounds(conn, None, cutoff - 1)[0]
+            if oldest_raw is None:
+                return True
+            cursor.execute(
+                f"SELECT 1 FROM {self.db.ROLLUP_TABLES['hourly']} WHERE bucket <= ? LIMIT 1",
+                (self.db._hour_bucket(oldest_raw),)
+            )
+            return cursor.fetchone() is not None
+
+    def _raw_schemas(self, cutoff):
+        """Cutoff öncesi ham veri içerebilecek schema'lar (ana dosya + sınırdaki partition'lar)"""
+        schemas = ['main']
+        if self.db.partitioned:
+            schemas += [info[0] for info in self.db.list_partitions(end_ts=cutoff)]
+        return schemas
+
+    def _incremental_vacuum(self, deadline):
+        """Boş sayfaları dosyadan geri ver, geri kazanılan sayfa sayısını döndür
+
+        Yazıcı connection'ı her adım için ayrı alınır ve beklemeden önce bırakılır: db_worker
+        insert'leri adımlar arasında çalışabilir.
+        """
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            auto_vacuum = cursor.execute("PRAGMA auto_vacuum").fetchone()[0]
+            page_count_before = cursor.execute("PRAGMA page_count").fetchone()[0]
+            freelist = cursor.execute("PRAGMA freelist_count").fetchone()[0]
+            page_size = cursor.execute("PRAGMA page_size").fetchone()[0]
+
+        if auto_vacuum != 2:
+            # auto_vacuum sonradan açıldıysa ancak tam VACUUM ile geçerli olur
+            print(f"⚠️ auto_vacuum=INCREMENTAL aktif değil ({auto_vacuum}), {freelist} boş sayfa yeniden kullanılacak")
+            return {'auto_vacuum': auto_vacuum, 'freelist_pages': freelist, 'reclaimed_pages': 0}
+
+        page_count_after = page_count_before
+        while freelist > 0 and time.monotonic() < deadline:
+            with self.db.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"PRAGMA incremental_vacuum({self.vacuum_step_pages})").fetchall()
+                freelist = cursor.execute("PRAGMA freelist_count").fetchone()[0]
+                page_count_after = cursor.execute("PRAGMA page_count").fetchone()[0]
+            if freelist > 0:
+                time.sleep(self.pause_seconds)
+
+        reclaimed = page_count_before - page_count_after
+        return {
+            'auto_vacuum': auto_vacuum,
+            'freelist_pages': freelist,
+            'reclaimed_pages': reclaimed,
+            'reclaimed_mb': round(reclaimed * page_size / (1024 * 1024), 2)
+        }
+
+    def run_once(self, now_ms=None):
+        """Tek bir retention turu çalıştır ve rapor döndür"""
+        policy = self._load_policy()
+        started = time.monotonic()
+        deadline = started + policy['max_run_seconds']
+        now_ms = now_ms or int(time.time() * 1000)
+        chunk_size = policy['chunk_size']
+        hourly_table = self.db.ROLLUP_TABLES['hourly']
+        daily_table = self.db.ROLLUP_TABLES['daily']
+
+        report = {'deleted': {}, 'completed': True, 'skipped': []}
+
+        if not policy['is_active']:
+            report['skipped'].append('inactive')
+            return report
+
+        # Ham veri: sadece rollup'ı olan aralık silinir
+        if policy['raw_days']:
+            # Saat başına hizalı: kalan ham verinin ilk saati yarım kalmaz, rollup yeniden oluşturma tam olur
+            cutoff = self.db._hour_bucket(now_ms - policy['raw_days'] * DAY_MS)
+            if self._rollups_cover(cutoff):
+                if self.db.partitioned:
+                    # Tamamen süresi dolan aylar dosya silme ile düşer
+                    report['dropped_partitions'] = self.db.drop_partitions_before(cutoff)
+                
+                deleted = 0
+                for schema in self._raw_schemas(cutoff):
+                    prepare = None
+                    if schema != 'main':
+                        prepare = lambda conn: self.db._attach_partitions(conn, None, cutoff)
+                    schema_deleted, done = self._delete_in_chunks(
+                        f"DELETE FROM {schema}.battery_data WHERE id IN "
+                        f"(SELECT id FROM {schema}.battery_data WHERE timestamp < ? LIMIT ?)",
+                        (cutoff,), chunk_size, deadline, prepare
+                    )
+                    deleted += schema_deleted
+                    report['completed'] &= done
+                report['deleted']['raw'] = deleted
+            else:
+                print("⚠️ Eski ham veri için rollup yok, silme atlandı (python db_maintenance.py rebuild-rollups)")
+                report['skipped'].append('raw')
+
+        for tier, table, days_key in (('hourly', hourly_table, 'hourly_days'),
+                                      ('daily', daily_table, 'daily_days')):
+            if not policy[days_key]:
+                continue  # Süresiz saklama
+            cutoff = now_ms - policy[days_key] * DAY_MS
+            deleted, done = self._delete_in_chunks(
+                f"DELETE FROM {table} WHERE (arm, k, dtype, bucket) IN "
+                f"(SELECT arm, k, dtype, bucket FROM {table} WHERE bucket < ? LIMIT ?)",
+                (cutoff,), chunk_size, deadline
+            )
+            report['deleted'][tier] = deleted
+            report['completed'] &= done
+
+        report['vacuum'] = self._incremental_vacuum(deadline)
+        report['duration_seconds'] = round(time.monotonic() - started, 2)
+
+        self.db.save_retention_report(json.dumps(report))
+        print(f"🧹 Retention tamamlandı: silinen={report['deleted']}, "
+              f"geri kazanılan sayfa={report['vacuum']['reclaimed_pages']}, "
+              f"süre={report['duration_seconds']}s{'' if report['completed'] else ' (bütçe doldu, sonraki turda devam)'}")
+        return report
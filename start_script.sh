@@ -20,9 +20,13 @@ VENV_PYTHON="/home/assan/Desktop/venv/bin/python"
 # Python scriptini çalıştır ve logla
 PYTHONUNBUFFERED=1 python /home/assan/Desktop/Monitoring_Raspberry/main.py >> /home/assan/Desktop/Monitoring_Raspberry/script.log 2>&1 &
 
-# web_app.py için venv içindeki Python'u kullan (bcrypt için gerekli)
+# Statik paketleri derle (hash'li adlar, .gz/.br kopyalar); hata olursa orijinal dosyalar sunulur
+$VENV_PYTHON /home/assan/Desktop/Monitoring_Raspberry/asset_pipeline.py >> /home/assan/Desktop/Monitoring_Raspberry/web.log 2>&1
+
+# web_app için venv içindeki Python'u kullan (bcrypt ve waitress için gerekli)
 # sudo ile çalıştırırken venv Python'unu kullan
-PYTHONUNBUFFERED=1 sudo $VENV_PYTHON /home/assan/Desktop/Monitoring_Raspberry/web_app.py >> /home/assan/Desktop/Monitoring_Raspberry/web.log 2>&1 &
+# wsgi.py üretim sunucusudur (waitress yoksa Flask geliştirme sunucusuna düşer)
+PYTHONUNBUFFERED=1 sudo $VENV_PYTHON /home/assan/Desktop/Monitoring_Raspberry/wsgi.py >> /home/assan/Desktop/Monitoring_Raspberry/web.log 2>&1 &
 
 # IP Broadcast servisini başlat (Windows IP bulucu için)
 PYTHONUNBUFFERED=1 python /home/assan/Desktop/Monitoring_Raspberry/ip_broadcast_service.py >> /home/assan/Desktop/Monitoring_Raspberry/broadcast.log 2>&1 &
@@ -8,6 +8,11 @@ if (typeof window.AlarmsPage === 'undefined') {
         this.currentPage = 1;
         this.pageSize = 50;
         this.totalPages = 1;
+        this.totalIsApproximate = false;
+        this.cursor = null;  // Mevcut sayfanın keyset cursor'ı (ilk sayfa: null)
+        this.nextCursor = null;
+        this.prevCursor = null;
+        this.hasMore = false;
         this.isLoading = false; // Yükleme durumu flag'i
         this.eventsBound = false; // Event listener'ların bağlanıp bağlanmadığını kontrol et
         this.autoRefreshInterval = null; // Interval referansı
@@ -18,6 +23,16 @@ if (typeof window.AlarmsPage === 'undefined') {
         console.log('🔧 AlarmsPage init() başladı');
         this.bindEvents();
         
+        // Canlı akış: aktif alarm sayısı değiştiğinde listeyi yenile (bir kez bağlanır)
+        if (!this.liveBound) {
+            window.addEventListener('live:alarms', () => {
+                if (this.isPageActive() && !this.isLoading && !this.showResolved) {
+                    this.loadAlarms();
+                }
+            });
+            this.liveBound = true;
+        }
+        
         // Sadece sayfa aktifse veri yükle
         if (this.isPageActive()) {
             this.loadAlarms(); // Hemen veri yükle
@@ -31,6 +46,7 @@ if (typeof window.AlarmsPage === 'undefined') {
     resetToActiveAlarms() {
         this.showResolved = false; // Aktif alarmlar modu
         this.currentPage = 1; // Sayfa sıfırla
+        this.cursor = null;
         this.loadAlarms();
         this.updateButtonText();
         
@@ -55,12 +71,12 @@ if (typeof window.AlarmsPage === 'undefined') {
     async loadAlarmHistory() {
         try {
             this.isLoading = true;
-            const response = await fetch(`/api/alarm-history?page=${this.currentPage}&pageSize=${this.pageSize}`);
+            const response = await fetch(`/api/alarm-history?${this.pageQuery()}`);
             const data = await response.json();
             
             if (data.success) {
                 this.alarms = data.alarms;
-                this.totalPages = data.totalPages;
+                this.updateCursors(data);
                 this.renderAlarms();
                 this.updatePagination();
             } else {
@@ -141,6 +157,9 @@ if (typeof window.AlarmsPage === 'undefined') {
         const pagination = document.getElementById('pagination');
         
         if (alarmHistoryContainer && alarmsTable) {
+            // Mod değişince cursor diğer listeye ait olur, ilk sayfaya dön
+            this.currentPage = 1;
+            this.cursor = null;
             if (this.showResolved) {
                 // Aktif alarmları göster
                 alarmHistoryContainer.style.display = 'none';
@@ -274,7 +293,7 @@ if (typeof window.AlarmsPage === 'undefined') {
                                     <td>${alarm.batteryDisplay || t('alarms.descriptions.armAlarm')}</td>
                                     <td>${(() => {
                                         try {
-                                            return this.translateAlarmDescription(alarm.description);
+                                            return this.translateAlarmDescription(alarm.description, alarm.descriptionKey) + this.formatOccurrences(alarm);
                                         } catch (error) {
                                             console.error('Alarm açıklaması çevrilirken hata:', error);
                                             return alarm.description;
@@ -303,29 +322,54 @@ if (typeof window.AlarmsPage === 'undefined') {
 
     updatePagination() {
         const pagination = document.getElementById('pagination');
-        if (this.totalPages > 1) {
+        if (this.totalPages > 1 || this.hasMore || this.currentPage > 1) {
             pagination.style.display = 'flex';
             
+            // Toplam sadece ilk sayfada alınır (yaklaşık olabilir), gezilen sayfadan az gösterilmez
+            const totalPages = Math.max(this.totalPages || 1, this.currentPage + (this.hasMore ? 1 : 0));
             document.getElementById('currentPage').textContent = this.currentPage;
-            document.getElementById('totalPages').textContent = this.totalPages;
+            document.getElementById('totalPages').textContent = this.totalIsApproximate ? `~${totalPages}` : totalPages;
             
             document.getElementById('prevPage').disabled = this.currentPage <= 1;
-            document.getElementById('nextPage').disabled = this.currentPage >= this.totalPages;
+            document.getElementById('nextPage').disabled = !this.hasMore;
         } else {
             pagination.style.display = 'none';
         }
     }
 
+    // Sayfa sorgu parametreleri (keyset cursor varsa eklenir)
+    pageQuery() {
+        let query = `page=${this.currentPage}&pageSize=${this.pageSize}`;
+        if (this.cursor) {
+            query += `&cursor=${encodeURIComponent(this.cursor)}`;
+        } else {
+            query += '&includeTotal=true';
+        }
+        return query;
+    }
+
+    updateCursors(data) {
+        if (data.totalPages) {
+            this.totalPages = data.totalPages;
+            this.totalIsApproximate = data.totalIsApproximate || false;
+        }
+        this.hasMore = data.hasMore || false;
+        this.nextCursor = data.nextCursor || null;
+        this.prevCursor = data.prevCursor || null;
+    }
+
     previousPage() {
         if (this.currentPage > 1) {
             this.currentPage--;
+            this.cursor = this.currentPage === 1 ? null : this.prevCursor;
             this.loadAlarms();
         }
     }
 
     nextPage() {
-        if (this.currentPage < this.totalPages) {
+        if (this.hasMore && this.nextCursor) {
             this.currentPage++;
+            this.cursor = this.nextCursor;
             this.loadAlarms();
         }
     }
@@ -350,7 +394,7 @@ if (typeof window.AlarmsPage === 'undefined') {
             this.showLoading();
             
             console.log('🌐 API isteği gönderiliyor: /api/alarms');
-            const response = await fetch(`/api/alarms?show_resolved=${this.showResolved}&page=${this.currentPage}&pageSize=${this.pageSize}`, {
+            const response = await fetch(`/api/alarms?show_resolved=${this.showResolved}&${this.pageQuery()}`, {
                 method: 'GET',
                 headers: {
                     'Content-Type': 'application/json'
@@ -367,7 +411,7 @@ if (typeof window.AlarmsPage === 'undefined') {
             
             if (data.success) {
                 this.alarms = data.alarms || [];
-                this.totalPages = data.totalPages || 1;
+                this.updateCursors(data);
                 console.log('📋 Alarm sayısı:', this.alarms.length);
                 this.renderAlarms();
                 this.updatePagination();
@@ -408,6 +452,11 @@ if (typeof window.AlarmsPage === 'undefined') {
         if (noData) noData.style.display = 'none';
     }
 
+    formatOccurrences(alarm) {
+        // Episode birden fazla periyot sürdüyse tekrar sayısını göster
+        return alarm.occurrenceCount > 1 ? ` (×${alarm.occurrenceCount})` : '';
+    }
+
     createActiveAlarmRow(alarm) {
         const row = document.createElement('tr');
         
@@ -430,7 +479,7 @@ if (typeof window.AlarmsPage === 'undefined') {
         // Açıklama
         const descriptionCell = document.createElement('td');
         try {
-            descriptionCell.textContent = this.translateAlarmDescription(alarm.description);
+            descriptionCell.textContent = this.translateAlarmDescription(alarm.description, alarm.descriptionKey) + this.formatOccurrences(alarm);
         } catch (error) {
             console.error('Alarm açıklaması çevrilirken hata:', error);
             descriptionCell.textContent = alarm.description; // Hata durumunda orijinal metni göster
@@ -470,7 +519,7 @@ if (typeof window.AlarmsPage === 'undefined') {
         // Açıklama
         const descriptionCell = document.createElement('td');
         try {
-            descriptionCell.textContent = this.translateAlarmDescription(alarm.description);
+            descriptionCell.textContent = this.translateAlarmDescription(alarm.description, alarm.descriptionKey) + this.formatOccurrences(alarm);
         } catch (error) {
             console.error('Alarm açıklaması çevrilirken hata:', error);
             descriptionCell.textContent = alarm.description; // Hata durumunda orijinal metni göster
@@ -599,6 +648,10 @@ if (typeof window.AlarmsPage === 'undefined') {
         
         // Her 30 saniyede bir otomatik yenile
         this.autoRefreshInterval = setInterval(() => {
+            // Aktif alarmlar canlı akışla güncellenir
+            if (!this.showResolved && window.liveStream && window.liveStream.isConnected()) {
+                return;
+            }
             if (this.isPageActive() && !this.isLoading) {
                 console.log('🔄 Otomatik yenileme çalışıyor...');
                 
@@ -653,7 +706,7 @@ if (typeof window.AlarmsPage === 'undefined') {
         }
     }
     
-    translateAlarmDescription(description) {
+    translateAlarmDescription(description, descriptionKey) {
         // Backend'den gelen Türkçe açıklamayı çevir
         if (!description) return description;
         
@@ -663,6 +716,11 @@ if (typeof window.AlarmsPage === 'undefined') {
         
         const t = window.translationManager.t.bind(window.translationManager);
         
+        // Backend ortak alarm kod tablosunun anahtarını gönderiyorsa doğrudan onu kullan
+        if (descriptionKey) {
+            return t(`alarms.descriptions.${descriptionKey}`);
+        }
+        
         // Türkçe açıklamaları İngilizce anahtarlara map et
         const descriptionMap = {
             'Yüksek akım alarmı': 'alarms.descriptions.highCurrent',
@@ -5,6 +5,9 @@ if (typeof window.ArmLogsPage === 'undefined') {
     constructor() {
         this.currentPage = 1;
         this.pageSize = 50;
+        this.cursor = null;  // Mevcut sayfanın keyset cursor'ı (ilk sayfa: null)
+        this.nextCursor = null;
+        this.prevCursor = null;
         this.totalPages = 1;
         this.filters = {
             arm: '',
@@ -197,7 +200,9 @@ if (typeof window.ArmLogsPage === 'undefined') {
                 body: JSON.stringify({
                     page: this.currentPage,
                     pageSize: this.pageSize,
-                    filters: this.filters
+                    filters: this.filters,
+                    cursor: this.cursor,
+                    format: 'columnar' // Alan adları her satırda tekrarlanmasın
                 })
             });
 
@@ -205,8 +210,10 @@ if (typeof window.ArmLogsPage === 'undefined') {
                 console.log('✅ [2025-09-08T11:16:35.221Z] API yanıtı alındı');
                 const data = await response.json();
                 console.log('📊 [2025-09-08T11:16:35.221Z] Gelen veri:', data);
-                this.logs = data.logs || [];
+                this.logs = window.expandColumnar(data.logs);
                 this.hasMore = data.hasMore || false;
+                this.nextCursor = data.nextCursor || null;
+                this.prevCursor = data.prevCursor || null;
                 
                 console.log('📋 [2025-09-08T11:16:35.221Z] Log sayısı:', this.logs.length);
                 this.renderLogs();
@@ -307,19 +314,22 @@ if (typeof window.ArmLogsPage === 'undefined') {
     previousPage() {
         if (this.currentPage > 1) {
             this.currentPage--;
+            this.cursor = this.currentPage === 1 ? null : this.prevCursor;
             this.loadLogs();
         }
     }
 
     nextPage() {
-        if (this.hasMore) {
+        if (this.hasMore && this.nextCursor) {
             this.currentPage++;
+            this.cursor = this.nextCursor;
             this.loadLogs();
         }
     }
 
     applyFilters() {
         this.currentPage = 1;
+        this.cursor = null;
         this.loadLogs();
     }
 
@@ -334,6 +344,7 @@ if (typeof window.ArmLogsPage === 'undefined') {
         this.setDefaultDates();
         
         this.currentPage = 1;
+        this.cursor = null;
         this.loadLogs();
     }
 
@@ -12,6 +12,8 @@ if (typeof window.BatteriesPage === 'undefined') {
         this.autoRefreshInterval = null; // Interval referansı
         this.eventsBound = false; // Event listener flag'i
         this.activeAlarms = new Set(); // Aktif alarmlar (arm-battery formatında)
+        this.generation = null; // Son alınan verinin generation'ı (delta istekleri için)
+        this.deltaEtag = null; // Son delta yanıtının ETag'i (değişiklik yoksa sunucu 304 döner)
         
         this.init();
     }
@@ -37,6 +39,10 @@ if (typeof window.BatteriesPage === 'undefined') {
         
         this.startAutoRefresh();
         console.log(`⏰ [${timestamp}] Auto refresh başlatıldı`);
+        
+        if (window.liveStream) {
+            window.liveStream.setArms([this.selectedArm]);
+        }
     }
 
     disableAllArmButtons() {
@@ -67,6 +73,17 @@ if (typeof window.BatteriesPage === 'undefined') {
                 this.onLanguageChanged(e.detail.language);
             });
             
+            // Canlı akış: sadece değişen bataryalar gelir
+            window.addEventListener('live:batteries', (e) => this.onLiveBatteries(e.detail));
+            window.addEventListener('live:alarms', () => {
+                if (this.isPageActive()) {
+                    this.loadActiveAlarms().then(() => {
+                        this.updateArmButtonAlarmStatus();
+                        this.updateBatteryCardAlarmStatus();
+                    });
+                }
+            });
+            
             this.eventsBound = true;
             console.log('🔗 Event delegation bağlandı');
         }
@@ -242,7 +259,11 @@ if (typeof window.BatteriesPage === 'undefined') {
         
         // Seçilen kol'u güncelle
         this.selectedArm = arm;
+        this.generation = null;
         localStorage.setItem('selectedArm', arm); // localStorage'a kaydet
+        if (window.liveStream) {
+            window.liveStream.setArms([arm]);
+        }
         
         console.log(`Kol ${arm} seçildi, bataryalar yükleniyor...`);
         
@@ -267,6 +288,103 @@ if (typeof window.BatteriesPage === 'undefined') {
         });
     }
 
+    onLiveBatteries(detail) {
+        if (!this.isPageActive() || this.isLoading || detail.arm !== this.selectedArm) {
+            return;
+        }
+        
+        const indexByAddress = new Map(this.batteriesData.map((battery, index) => [battery.batteryAddress, index]));
+        
+        // Batarya sayısı değiştiyse veya ilk kez veri gelen batarya varsa sayfayı baştan yükle
+        const slaveCountChanged = this.liveSlaveCount !== undefined && detail.slaveCount !== this.liveSlaveCount;
+        this.liveSlaveCount = detail.slaveCount;
+        if (slaveCountChanged || detail.batteries.some(battery => !indexByAddress.has(battery.batteryAddress))) {
+            this.loadBatteries();
+            return;
+        }
+        
+        this.patchBatteries(detail.batteries);
+        this.generation = detail.generation;
+    }
+
+    // Sadece değişen bataryaların verisini ve kartlarını güncelle
+    patchBatteries(batteries) {
+        const grid = document.getElementById('batteriesGrid');
+        if (!grid) {
+            return;
+        }
+        
+        const patchedCards = [];
+        batteries.forEach(battery => {
+            const index = this.batteriesData.findIndex(item => item.batteryAddress === battery.batteryAddress);
+            if (index === -1) {
+                return;
+            }
+            // Çevrilmiş alan adları (*_name) ilk yüklemeden korunur
+            this.batteriesData[index] = { ...this.batteriesData[index], ...battery };
+            
+            const oldCard = grid.querySelector(`.battery-card[data-battery-address="${battery.batteryAddress}"]`);
+            const newCard = this.createBatteryCard(this.batteriesData[index]);
+            if (oldCard && newCard) {
+                oldCard.replaceWith(newCard);
+                patchedCards.push(newCard);
+            }
+        });
+        
+        if (patchedCards.length) {
+            this.updateCardTexts('tr');
+            this.updateBatteryCardAlarmStatus(patchedCards);
+        }
+    }
+
+    // Otomatik yenileme: generation varsa sadece değişen bataryaları iste
+    async refreshBatteries() {
+        if (this.generation === null || this.isLoading || !this.isPageActive()) {
+            return this.loadBatteries();
+        }
+        
+        try {
+            const response = await fetch('/api/batteries', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-Language': 'tr',
+                    ...(this.deltaEtag ? { 'If-None-Match': this.deltaEtag } : {})
+                },
+                body: JSON.stringify({
+                    page: this.currentPage,
+                    pageSize: this.pageSize,
+                    selectedArm: this.selectedArm,
+                    since_generation: this.generation
+                })
+            });
+            
+            if (response.status === 304) {
+                return; // Son yanıttan beri değişiklik yok
+            }
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            
+            const data = await response.json();
+            if (!data.success) {
+                throw new Error(data.message || 'Veri yüklenemedi');
+            }
+            
+            const known = new Set(this.batteriesData.map(battery => battery.batteryAddress));
+            if (!data.delta || data.batteries.some(battery => !known.has(battery.batteryAddress))) {
+                // Tam liste geldi (veya yeni batarya var): tümünü yeniden çiz
+                return this.loadBatteries();
+            }
+            
+            this.patchBatteries(data.batteries);
+            this.generation = data.generation;
+            this.deltaEtag = response.headers.get('ETag');
+        } catch (error) {
+            console.error('Batarya verileri güncellenirken hata:', error);
+        }
+    }
+
     async loadBatteries() {
         const timestamp = new Date().toISOString();
         console.log(`🔋 [${timestamp}] loadBatteries() başladı`);
@@ -311,6 +429,7 @@ if (typeof window.BatteriesPage === 'undefined') {
             
             if (data.success) {
                 this.batteriesData = data.batteries;
+                this.generation = data.generation;
                 this.totalPages = data.totalPages;
                 this.currentPage = data.currentPage;
                 this.renderBatteries();
@@ -333,9 +452,9 @@ if (typeof window.BatteriesPage === 'undefined') {
         }
     }
 
-    updateBatteryCardAlarmStatus() {
-        // Batarya kartlarının alarm durumunu güncelle
-        document.querySelectorAll('.battery-card').forEach(card => {
+    updateBatteryCardAlarmStatus(cards = document.querySelectorAll('.battery-card')) {
+        // Batarya kartlarının alarm durumunu güncelle (verilmezse tüm kartlar)
+        cards.forEach(card => {
             const arm = this.selectedArm;
             const batteryAddress = card.dataset.batteryAddress;
             
@@ -600,12 +719,16 @@ if (typeof window.BatteriesPage === 'undefined') {
         
         // Her 30 saniyede bir otomatik yenile
         this.autoRefreshInterval = setInterval(() => {
+            // Canlı akış varsa değişiklikler olay olarak gelir
+            if (window.liveStream && window.liveStream.isLive()) {
+                return;
+            }
             // Sadece sayfa aktifse ve manuel işlem yoksa yenile
             if (this.isPageActive() && !this.isLoading) {
                 console.log('🔄 Otomatik yenileme çalışıyor...');
                 // Önce alarmları güncelle, sonra bataryaları yükle
                 this.loadActiveAlarms().then(() => {
-                    this.loadBatteries();
+                    this.refreshBatteries();
                 });
             } else if (this.isLoading) {
                 console.log('⏳ Manuel yükleme devam ediyor, otomatik yenileme atlanıyor...');
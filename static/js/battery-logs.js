@@ -5,6 +5,9 @@ if (typeof window.BatteryLogsPage === 'undefined') {
     constructor() {
         this.currentPage = 1;
         this.pageSize = 50;
+        this.cursor = null;  // Mevcut sayfanın keyset cursor'ı (ilk sayfa: null)
+        this.nextCursor = null;
+        this.prevCursor = null;
         this.hasMore = false;  // Toplam sayfa yerine "daha fazla var mı?" kontrolü
         this.filters = {
             arm: '',
@@ -153,15 +156,19 @@ if (typeof window.BatteryLogsPage === 'undefined') {
                 body: JSON.stringify({
                     page: this.currentPage,
                     pageSize: this.pageSize,
-                    filters: this.filters
+                    filters: this.filters,
+                    cursor: this.cursor,
+                    format: 'columnar' // Alan adları her satırda tekrarlanmasın
                 })
             });
 
             if (response.ok) {
                 const data = await response.json();
                 console.log('Battery logs API response:', data);
-                this.logs = data.logs || [];
+                this.logs = window.expandColumnar(data.logs);
                 this.hasMore = data.hasMore || false;  // Daha fazla kayıt var mı?
+                this.nextCursor = data.nextCursor || null;
+                this.prevCursor = data.prevCursor || null;
                 
                 console.log('Logs loaded:', this.logs.length, 'items');
                 this.renderLogs();
@@ -273,13 +280,15 @@ if (typeof window.BatteryLogsPage === 'undefined') {
     previousPage() {
         if (this.currentPage > 1) {
             this.currentPage--;
+            this.cursor = this.currentPage === 1 ? null : this.prevCursor;
             this.loadLogs();
         }
     }
 
     nextPage() {
-        if (this.hasMore) {
+        if (this.hasMore && this.nextCursor) {
             this.currentPage++;
+            this.cursor = this.nextCursor;
             this.loadLogs();
         }
     }
@@ -294,6 +303,7 @@ if (typeof window.BatteryLogsPage === 'undefined') {
         console.log('🔍 Filtreler uygulandı:', this.filters);
         
         this.currentPage = 1;
+        this.cursor = null;
         this.loadLogs();
     }
 
@@ -314,6 +324,7 @@ if (typeof window.BatteryLogsPage === 'undefined') {
         this.updateBatteryOptions('');
         
         this.currentPage = 1;
+        this.cursor = null;
         this.loadLogs();
         console.log('✅ Filtreler temizlendi');
     }
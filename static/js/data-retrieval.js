@@ -7,6 +7,7 @@ if (typeof window.DataRetrieval === 'undefined') {
         this.isDataRetrievalMode = false;
         this.retrievalConfig = null;
         this.retrievedData = [];
+        this.retrievedCursor = null;
         this.init();
     }
 
@@ -876,6 +877,7 @@ if (typeof window.DataRetrieval === 'undefined') {
                 this.isDataRetrievalMode = true;
                 this.retrievalConfig = config;
                 this.retrievedData = [];
+                this.retrievedCursor = null;
                 
                 console.log('✅ Frontend aktif edildi (otomatik):', {
                     isDataRetrievalMode: this.isDataRetrievalMode,
@@ -1014,8 +1016,9 @@ if (typeof window.DataRetrieval === 'undefined') {
     async fetchRetrievedData() {
         try {
             console.log('🔍 fetchRetrievedData çağrıldı');
-            // Yakalanan verileri al
-            const response = await fetch('/api/get-retrieved-data');
+            // Sadece son yoklamadan beri gelen grupları al (cursor yoksa periyodun tamamı)
+            const query = this.retrievedCursor ? `?cursor=${encodeURIComponent(this.retrievedCursor)}` : '';
+            const response = await fetch(`/api/get-retrieved-data${query}`);
             console.log('📡 API yanıtı:', response.status);
             
             if (response.ok) {
@@ -1023,27 +1026,16 @@ if (typeof window.DataRetrieval === 'undefined') {
                 console.log('📊 API sonucu:', result);
                 
                 if (result.success && result.data) {
-                    // Verileri temizle ve yeni verileri ekle
-                    this.retrievedData = [];
-                    result.data.forEach(data => {
-                        this.retrievedData.push({
-                            timestamp: data.timestamp,
-                            arm: data.arm,
-                            address: data.address,
-                            voltage: data.voltage,
-                            health_status: data.health_status,
-                            temperature: data.temperature,
-                            positive_pole_temp: data.positive_pole_temp,
-                            negative_pole_temp: data.negative_pole_temp,
-                            ntc3_temp: data.ntc3_temp,
-                            charge_status: data.charge_status
-                        });
-                    });
-                    console.log(`📊 ${this.retrievedData.length} adet veri alındı ve this.retrievedData'ya eklendi`);
+                    this.mergeRetrievedData(result.data, result.reset);
+                    this.retrievedCursor = result.cursor;
+                    console.log(`📊 ${result.data.length} yeni/güncellenen satır, toplam ${this.retrievedData.length} veri`);
                 } else {
                     console.log('⚠️ API başarılı ama veri yok');
                 }
             } else {
+                if (response.status === 400) {
+                    this.retrievedCursor = null;  // Geçersiz cursor, sonraki yoklama baştan alır
+                }
                 console.log('❌ API hatası:', response.status);
             }
         } catch (error) {
@@ -1051,6 +1043,35 @@ if (typeof window.DataRetrieval === 'undefined') {
         }
     }
     
+    mergeRetrievedData(rows, reset) {
+        // Aynı (zaman, kol, adres) satırı yerinde güncellenir: yarım gelen grup sonraki yoklamada tamamlanır
+        if (reset) {
+            this.retrievedData = [];
+        }
+        const index = new Map(this.retrievedData.map((row, i) => [`${row.timestamp}|${row.arm}|${row.address}`, i]));
+        rows.forEach(data => {
+            const row = {
+                timestamp: data.timestamp,
+                arm: data.arm,
+                address: data.address,
+                voltage: data.voltage,
+                health_status: data.health_status,
+                temperature: data.temperature,
+                positive_pole_temp: data.positive_pole_temp,
+                negative_pole_temp: data.negative_pole_temp,
+                ntc3_temp: data.ntc3_temp,
+                charge_status: data.charge_status
+            };
+            const key = `${row.timestamp}|${row.arm}|${row.address}`;
+            if (index.has(key)) {
+                this.retrievedData[index.get(key)] = row;
+            } else {
+                index.set(key, this.retrievedData.length);
+                this.retrievedData.push(row);
+            }
+        });
+    }
+    
     showSingleDataTable() {
         // Tekil veri için özel tablo göster
         const operationsList = document.getElementById('operationsList');
@@ -1207,6 +1228,7 @@ if (typeof window.DataRetrieval === 'undefined') {
                 this.isDataRetrievalMode = false;
                 this.retrievalConfig = null;
                 this.retrievedData = [];
+                this.retrievedCursor = null;
                 
                 // Ana sayfaya dön
                 this.hideOperationsList();
@@ -108,6 +108,8 @@ class MailServerConfigPage {
         document.getElementById('smtpPassword').value = config.smtp_password || '';
         document.getElementById('useTls').checked = config.use_tls !== false;
         document.getElementById('isActive').checked = config.is_active !== false;
+        document.getElementById('digestWindowMinutes').value = config.digest_window_minutes || 0;
+        document.getElementById('digestCriticalBypass').checked = config.digest_critical_bypass !== false;
     }
 
     async saveConfig() {
@@ -119,7 +121,9 @@ class MailServerConfigPage {
                 smtp_username: formData.get('smtp_username'),
                 smtp_password: formData.get('smtp_password'),
                 use_tls: formData.get('use_tls') === 'on',
-                is_active: formData.get('is_active') === 'on'
+                is_active: formData.get('is_active') === 'on',
+                digest_window_minutes: parseInt(formData.get('digest_window_minutes')) || 0,
+                digest_critical_bypass: formData.get('digest_critical_bypass') === 'on'
             };
 
             // Validation
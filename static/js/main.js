@@ -1,4 +1,98 @@
 // Ana JavaScript dosyası
+
+// Canlı olay akışı (SSE): sunucu sadece değişiklik olduğunda olay gönderir.
+// Olaylar window üzerinde 'live:<olay>' CustomEvent'i olarak yayınlanır.
+class LiveStream {
+    constructor(url = '/api/stream') {
+        this.url = url;
+        this.arms = null;
+        this.source = null;
+        this.connected = false;
+        this.liveData = false; // Sunucuda canlı görünüm var mı (yoksa sayfalar polling'e devam eder)
+        this.failures = 0;
+        this.maxFailures = 5;
+    }
+
+    start() {
+        if (!window.EventSource) {
+            console.log('⚠️ EventSource desteklenmiyor, polling kullanılacak');
+            return;
+        }
+        this.stop();
+        const query = this.arms && this.arms.length ? `?arm=${this.arms.join(',')}` : '';
+        this.source = new EventSource(this.url + query);
+        
+        this.source.onopen = () => {
+            this.connected = true;
+            this.failures = 0;
+        };
+        this.source.onerror = () => {
+            this.connected = false;
+            this.failures++;
+            if (this.failures >= this.maxFailures) {
+                console.log('⚠️ Canlı akış bağlanamadı, polling kullanılacak');
+                this.stop();
+            }
+        };
+        ['hello', 'batteries', 'summary', 'alarms'].forEach(type => {
+            this.source.addEventListener(type, (e) => {
+                const detail = JSON.parse(e.data);
+                if (type === 'hello') {
+                    this.liveData = !!detail.live;
+                }
+                window.dispatchEvent(new CustomEvent(`live:${type}`, { detail }));
+            });
+        });
+    }
+
+    stop() {
+        if (this.source) {
+            this.source.close();
+            this.source = null;
+        }
+        this.connected = false;
+    }
+
+    // Sadece belirtilen kolların batarya olaylarını al (null: tüm kollar)
+    setArms(arms) {
+        const key = arms ? arms.join(',') : '';
+        const current = this.arms ? this.arms.join(',') : '';
+        if (key === current && this.source) {
+            return;
+        }
+        this.arms = arms;
+        this.start();
+    }
+
+    // Alarm olayları canlı mı (polling atlanabilir)
+    isConnected() {
+        return this.connected;
+    }
+
+    // Batarya/özet olayları canlı mı
+    isLive() {
+        return this.connected && this.liveData;
+    }
+}
+
+window.liveStream = window.liveStream || new LiveStream();
+
+// Sütunsal JSON'u (format=columnar: alan başına diziler) satır nesnelerine çevir
+window.expandColumnar = function(table) {
+    if (!table || Array.isArray(table)) {
+        return table || [];
+    }
+    const rows = new Array(table.count);
+    for (let i = 0; i < table.count; i++) {
+        const row = {};
+        table.fields.forEach(field => {
+            row[field] = table.columns[field][i];
+        });
+        rows[i] = row;
+    }
+    return rows;
+};
+
 class App {
     constructor() {
         // localStorage'dan son sayfayı oku, yoksa summary
@@ -37,6 +131,12 @@ class App {
         this.initLanguage(); // Dil sistemini başlat
         this.loadPage(this.currentPage); // localStorage'dan gelen sayfa veya summary
         this.startAlarmCountRefresh(); // Alarm sayısı güncellemeyi başlat
+        
+        // Alarm sayısı değiştiğinde sunucu olay gönderir
+        window.addEventListener('live:alarms', (e) => {
+            this.displayAlarmCount(e.detail.count || 0);
+        });
+        window.liveStream.start();
     }
 
     initLanguage() {
@@ -359,8 +459,9 @@ class App {
         // Yeni script'i yükle
             const script = document.createElement('script');
         script.id = 'page-script';
-        script.src = `/static/js/${page}.js`;
-        console.log(`📡 [${timestamp}] SCRIPT FETCH EDİLİYOR - /static/js/${page}.js`);
+        // Derlenmiş paket varsa hash'li (süresiz önbelleklenen) adı kullan
+        script.src = (window.ASSET_MANIFEST || {})[`js/${page}.js`] || `/static/js/${page}.js`;
+        console.log(`📡 [${timestamp}] SCRIPT FETCH EDİLİYOR - ${script.src}`);
         
         const scriptStartTime = performance.now();
         
@@ -416,14 +517,26 @@ class App {
     // Alarm sayısı güncelleme
     async updateAlarmCount() {
         try {
+            const headers = {
+                'Content-Type': 'application/json'
+            };
+            // Sayaç değişmediyse sunucu 304 döner, rozet olduğu gibi kalır
+            if (this.alarmCountEtag) {
+                headers['If-None-Match'] = this.alarmCountEtag;
+            }
+            
             const response = await fetch('/api/alarm_count', {
                 method: 'GET',
-                headers: {
-                    'Content-Type': 'application/json'
-                }
+                headers: headers,
+                cache: 'no-store'
             });
 
+            if (response.status === 304) {
+                return;
+            }
+            
             if (response.ok) {
+                this.alarmCountEtag = response.headers.get('ETag');
                 const data = await response.json();
                 const alarmCount = data.count || 0;
                 this.displayAlarmCount(alarmCount);
@@ -459,7 +572,10 @@ class App {
         
         // Her 30 saniyede bir güncelle
         this.alarmCountInterval = setInterval(() => {
-            this.updateAlarmCount();
+            // Canlı akış bağlıysa sayı olayla gelir
+            if (!window.liveStream.isConnected()) {
+                this.updateAlarmCount();
+            }
         }, 30000);
         
         console.log('⏰ Yeni alarm count interval başlatıldı (30s)');
@@ -14,6 +14,17 @@ if (typeof window.SummaryPage === 'undefined') {
     }
 
     bindEvents() {
+        // Canlı akış: kol özetleri değiştiğinde yeniden çiz (bir kez bağlanır)
+        if (!this.liveBound) {
+            window.addEventListener('live:summary', (e) => {
+                if (this.isPageActive()) {
+                    this.summaryData = e.detail.summary || [];
+                    this.renderSummary();
+                }
+            });
+            this.liveBound = true;
+        }
+        
         // Dil değişikliği dinleyicisi
         window.addEventListener('languageChanged', (e) => {
             console.log('🌐 Özet sayfası - Dil değişti:', e.detail.language);
@@ -11,9 +11,11 @@ class TranslationManager {
         
         try {
             // Çeviri dosyalarını yükle
+            // Derlenmiş paket varsa hash'li (süresiz önbelleklenen) adı kullan
+            const manifest = window.ASSET_MANIFEST || {};
             const [trData, enData] = await Promise.all([
-                fetch('/static/locales/tr.json').then(r => r.json()),
-                fetch('/static/locales/en.json').then(r => r.json())
+                fetch(manifest['locales/tr.json'] || '/static/locales/tr.json').then(r => r.json()),
+                fetch(manifest['locales/en.json'] || '/static/locales/en.json').then(r => r.json())
             ]);
             
             this.translations = {
@@ -1,10 +1,23 @@
 # interface/web_app.py
-from flask import Flask, render_template, jsonify, request, session, redirect, url_for
-from database import BatteryDatabase
+from flask import Flask, render_template, jsonify, request, session, redirect, url_for, Response, stream_with_context, g, send_from_directory
+from database import BatteryDatabase, decode_page_cursor, encode_page_cursor
+import alarm_codes
+import command_channel
+import live_view
+from live_stream import LiveStreamHub
+from response_cache import ResponseCache, make_etag
+import compression
+import downsampling
+from bulk_export import BulkExporter, FORMATS as BULK_EXPORT_FORMATS
+import asset_pipeline
+import mimetypes
 import time
 import json
 import threading
 import os
+import zlib
+import tempfile
+import itertools
 from datetime import datetime
 from functools import wraps
 
@@ -13,7 +26,6 @@ app.secret_key = 'tescom_bms_secret_key_2024'  # Session için secret key
 
 # Thread-safe database erişimi için lock'lar
 db_lock = threading.Lock()  # Write işlemleri için
-db_read_lock = threading.RLock()  # Read işlemleri için (multiple readers allowed)
 
 # Retry mekanizması için
 import time as time_module
@@ -23,13 +35,108 @@ data_retrieval_period_start = None
 
 # Database instance'ını thread-safe yapmak için lazy loading
 # main.py'den farklı bir connection pool kullan
+_db_init_lock = threading.Lock()
+
 def get_db():
     if not hasattr(get_db, 'instance'):
-        get_db.instance = BatteryDatabase()
+        with _db_init_lock:  # Eşzamanlı ilk istekler tek havuz açsın
+            if not hasattr(get_db, 'instance'):
+                get_db.instance = BatteryDatabase()
         # Connection pool zaten WAL mode ve timeout ile yapılandırılmış
         # Database instance oluşturuldu
     return get_db.instance
 
+# main.py'nin paylaşımlı bellekteki canlı görünümü (yoksa veritabanından okunur)
+live_view_reader = live_view.LiveViewReader()
+live_change_tracker = live_view.ChangeTracker()
+_dtype_names_cache = {}
+
+def get_dtype_names(language):
+    """dtype -> çevrilmiş ad (statik tablo, dil başına bir kez okunur)"""
+    if language not in _dtype_names_cache:
+        _dtype_names_cache[language] = {
+            item['dtype']: item['name'] for item in get_db().get_data_types_by_language(language)
+        }
+    return _dtype_names_cache[language]
+
+def get_alarm_counter():
+    """(aktif alarm sayısı, sayaç versiyonu) - sayaç tablosu yoksa doğrudan sayım"""
+    db_instance = get_db()
+    return db_instance.get_alarm_counter() or (db_instance.get_active_alarm_count(), 0)
+
+# Canlı yayın (SSE): değişiklikleri tek thread izler, açık sekme sayısından bağımsız
+live_stream_hub = LiveStreamHub(live_view_reader, get_alarm_counter)
+
+# Okuma ağırlıklı endpoint'lerin yanıt önbelleği: girdiler değişmedikçe bellekten / 304
+response_cache = ResponseCache()
+_config_generation = 0
+
+def get_live_snapshot():
+    """İstek başına tek canlı görünüm kopyası (önbellek anahtarı ve yanıt aynı veriden)"""
+    if 'live_snapshot' not in g:
+        g.live_snapshot = live_view_reader.snapshot()
+    return g.live_snapshot
+
+def bump_config_generation():
+    """Konfigürasyon yazıldı: önbellekteki yanıtlar geçersiz"""
+    global _config_generation
+    _config_generation += 1
+    response_cache.clear()
+
+def _request_params():
+    """Önbellek anahtarı için normalize edilmiş istek parametreleri (sorgu, JSON gövde, dil)"""
+    body = request.get_json(silent=True) if request.method == 'POST' else None
+    return (
+        tuple(sorted(request.args.items(multi=True))),
+        json.dumps(body, sort_keys=True, separators=(',', ':')) if body is not None else None,
+        request.headers.get('X-Language')
+    )
+
+def cached_response(live=False, config=False):
+    """JSON yanıtını (endpoint, parametreler, generation) anahtarıyla önbellekle, güçlü ETag ve If-None-Match desteği
+
+    live: canlı görünüm generation'ına bağlı (görünüm yoksa önbelleklenmez, sadece ETag verilir)
+    config: konfigürasyon yazımlarıyla (bump_config_generation) geçersiz olur
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            generation = (_config_generation,) if config else ()
+            if live:
+                snapshot = get_live_snapshot()
+                generation += (snapshot.generation if snapshot else None,)
+            key = (request.endpoint, _request_params(), generation) if None not in generation else None
+            
+            entry = response_cache.get(key) if key else None
+            if entry:
+                body, etag, mimetype = entry
+            else:
+                response = app.make_response(f(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response  # Hatalar önbelleğe alınmaz
+                body, mimetype = response.get_data(), response.mimetype
+                etag = response_cache.put(key, body, mimetype) if key else make_etag(body)
+            
+            # Sıkıştırılmış gövde de önbellekte tutulur, tekrar isteklerde yeniden sıkıştırılmaz
+            encoding = compression.choose_encoding(request.headers.get('Accept-Encoding'), mimetype, len(body))
+            sent_etag = compression.variant_etag(etag, encoding)
+            
+            # POST (batteries) için de geçerli: istemci son ETag'i gönderirse gövde tekrar gönderilmez
+            if etag in request.if_none_match or sent_etag in request.if_none_match:
+                response = app.response_class(status=304)
+            else:
+                data = response_cache.variant(key, body, encoding, compression.compress) if key \
+                    else compression.compress(body, encoding)
+                response = app.response_class(data, mimetype=mimetype)
+                if encoding:
+                    response.headers['Content-Encoding'] = encoding
+            response.set_etag(sent_etag)
+            response.vary.add('Accept-Encoding')
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return decorated_function
+    return decorator
+
 # Authentication decorator'ları
 def login_required(f):
     """Giriş yapmış kullanıcı kontrolü"""
@@ -51,9 +158,9 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-# Database işlemleri için retry wrapper
+# Database yazma işlemleri için retry wrapper (okumalar WAL + salt okunur havuzla kilitlenmez)
 def db_operation_with_retry(operation, max_retries=3, delay=0.1):
-    """Database işlemini retry ile çalıştır"""
+    """Database yazma işlemini retry ile çalıştır"""
     for attempt in range(max_retries):
         try:
             return operation()
@@ -68,6 +175,118 @@ def db_operation_with_retry(operation, max_retries=3, delay=0.1):
 # Global db referansı (backward compatibility için)
 db = None
 
+# Tek bir CSV export'unda sunucu tarafı satır sınırı
+EXPORT_MAX_ROWS = int(os.environ.get('EXPORT_MAX_ROWS', '1000000'))
+
+def _export_row_limit(data):
+    """İstemcinin istediği satır sınırını sunucu sınırıyla kısıtla"""
+    requested = (data or {}).get('maxRows')
+    try:
+        requested = int(requested) if requested else EXPORT_MAX_ROWS
+    except (TypeError, ValueError):
+        requested = EXPORT_MAX_ROWS
+    return max(1, min(requested, EXPORT_MAX_ROWS))
+
+def _gzip_chunks(chunks):
+    """CSV parçalarını akış halinde gzip'le (tüm dosya bellekte tutulmaz)"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip başlığı
+    for chunk in chunks:
+        compressed = compressor.compress(chunk.encode('utf-8'))
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def csv_stream_response(chunks, filename, data=None, estimated_rows=None, row_limit=None):
+    """CSV generator'ını chunked transfer ile döndür (opsiyonel gzip ve ilerleme header'ları)"""
+    # İlk parçayı şimdi üret: sorgu hatası 200 header'ı gitmeden 500 olarak dönsün
+    chunks = iter(chunks)
+    first = next(chunks, '')
+    chunks = itertools.chain([first], chunks)
+    
+    use_gzip = (data or {}).get('gzip', True) is not False and \
+        'gzip' in request.headers.get('Accept-Encoding', '').lower()
+    
+    if use_gzip:
+        body = _gzip_chunks(chunks)
+    else:
+        body = (chunk.encode('utf-8') for chunk in chunks)
+    
+    response = Response(stream_with_context(body), status=200, mimetype='text/csv')
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    response.headers['Content-Type'] = 'text/csv; charset=utf-8'
+    response.headers['Cache-Control'] = 'no-store'
+    if use_gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+        response.headers['Vary'] = 'Accept-Encoding'
+    if estimated_rows is not None:
+        response.headers['X-Export-Estimated-Rows'] = str(min(estimated_rows, row_limit or estimated_rows))
+    if row_limit:
+        response.headers['X-Export-Row-Limit'] = str(row_limit)
+    return response
+
+@app.after_request
+def compress_response(response):
+    """JSON/HTML yanıtlarını istemcinin kabul ettiği kodlamayla sıkıştır
+
+    Akışlar (SSE, CSV), dosya gönderimleri ve zaten kodlanmış yanıtlar olduğu gibi geçer.
+    """
+    if response.is_streamed or response.direct_passthrough or 'Content-Encoding' in response.headers \
+            or response.status_code < 200 or response.status_code in (204, 206, 304) \
+            or response.mimetype not in compression.COMPRESSIBLE_TYPES:
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    encoding = compression.choose_encoding(request.headers.get('Accept-Encoding'), response.mimetype, len(data))
+    if encoding is None:
+        return response
+    
+    response.set_data(compression.compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(compression.variant_etag(etag, encoding), weak)
+    return response
+
+def table_rows(rows, data=None):
+    """İstemci format=columnar isterse (sorgu veya JSON gövde) satırları alan başına dizilere çevir"""
+    requested = request.args.get('format') or (data or {}).get('format')
+    return compression.to_columnar(rows) if requested == 'columnar' else rows
+
+@app.context_processor
+def asset_helpers():
+    """Şablonlar için derlenmiş paket URL'leri (derleme yoksa orijinal static dosyalar)"""
+    manifest = asset_pipeline.load_manifest()
+    
+    def asset_urls(name):
+        if name in manifest:
+            return [manifest[name]]
+        return [url_for('static', filename=path) for path in asset_pipeline.sources(name)]
+    
+    return {'asset_urls': asset_urls, 'asset_manifest': manifest}
+
+@app.route('/assets/<path:filename>')
+def hashed_asset(filename):
+    """İçerik hash'li paketler: adı içerikle değiştiği için süresiz önbelleklenir, varsa .br/.gz sunulur"""
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    if mimetype in ('text/javascript', 'application/javascript', 'text/css'):
+        mimetype += '; charset=utf-8'
+    accepted = request.headers.get('Accept-Encoding', '')
+    
+    encoding = None
+    for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if candidate in accepted and os.path.isfile(os.path.join(asset_pipeline.DIST_DIR, filename + suffix)):
+            encoding = candidate
+            filename += suffix
+            break
+    
+    response = send_from_directory(asset_pipeline.DIST_DIR, filename, mimetype=mimetype)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
 @app.route('/')
 def index():
     # Giriş yapmamışsa login sayfasına yönlendir
@@ -197,8 +416,7 @@ def api_get_users():
     """Tüm kullanıcıları listele (sadece admin)"""
     try:
         db_instance = get_db()
-        with db_read_lock:
-            users = db_instance.get_all_users()
+        users = db_instance.get_all_users()
         return jsonify({
             'success': True,
             'users': users
@@ -234,15 +452,14 @@ def api_create_user():
         
         # Maksimum kullanıcı sayısı kontrolü (default kullanıcılar hariç max 8)
         db_instance = get_db()
-        with db_read_lock:
-            all_users = db_instance.get_all_users()
-            # Default kullanıcıları (ID 1 ve 2) hariç say
-            user_count = len([u for u in all_users if u['id'] != 1 and u['id'] != 2])
-            if user_count >= 8:
-                return jsonify({
-                    'success': False,
-                    'message': 'Maksimum 8 kullanıcı eklenebilir!'
-                }), 400
+        all_users = db_instance.get_all_users()
+        # Default kullanıcıları (ID 1 ve 2) hariç say
+        user_count = len([u for u in all_users if u['id'] != 1 and u['id'] != 2])
+        if user_count >= 8:
+            return jsonify({
+                'success': False,
+                'message': 'Maksimum 8 kullanıcı eklenebilir!'
+            }), 400
         
         with db_lock:
             result = db_instance.create_user(email, password, username, role)
@@ -347,79 +564,111 @@ def get_page_html(page_name):
         return render_template('pages/404.html')
 
 @app.route('/api/data_types')
+@cached_response(config=True)
 def get_data_types():
     language = request.args.get('lang', 'tr')  # Varsayılan Türkçe
     db_instance = get_db()
-    with db_read_lock:
-        data_types = db_instance.get_data_types_by_language(language)
+    data_types = db_instance.get_data_types_by_language(language)
     return jsonify(data_types)
 
 @app.route('/api/alarm_count')
 def get_alarm_count():
-    """Aktif alarm sayısını getir"""
+    """Aktif alarm sayısını getir (sayaç satırından, ETag ile)"""
     try:
-        db_instance = get_db()
-        with db_read_lock:
-            count = db_instance.get_active_alarm_count()
-        return jsonify({
+        count, version = get_alarm_counter()
+        
+        response = jsonify({
             'success': True,
             'count': count
         })
+        # Sayaç değişmedikçe aynı ETag -> 304, gövde gönderilmez
+        response.set_etag(f'alarm-count-{version}-{count}')
+        response.headers['Cache-Control'] = 'no-cache'
+        return response.make_conditional(request)
     except Exception as e:
         return jsonify({
             'success': False,
             'message': str(e)
         }), 500
 
+@app.route('/api/stream')
+def live_stream():
+    """Canlı olay akışı (SSE): batteries, summary ve alarms olayları, ?arm=1,3 ile kol filtresi"""
+    arms = [int(arm) for arm in request.args.get('arm', '').split(',') if arm.strip().isdigit()]
+    subscriber = live_stream_hub.subscribe(arms)
+    if subscriber is None:
+        # Akışlar sunucu thread'lerinin payına ulaştı, API isteklerine thread kalsın
+        return Response('Canlı akış kapasitesi dolu', status=503, headers={'Retry-After': '30'})
+    return Response(
+        stream_with_context(live_stream_hub.stream(subscriber)),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # Ters vekil (nginx) tamponlamasın
+        }
+    )
+
 @app.route('/api/recent_data')
 def get_recent_data():
-    minutes = int(request.args.get('minutes', 5))
-    arm = request.args.get('arm')
-    battery = request.args.get('battery')
-    dtype = request.args.get('dtype')
-    data_type = request.args.get('data_type')
-    limit = int(request.args.get('limit', 50))
-    language = request.args.get('lang', 'tr')
-    
-    if arm:
-        arm = int(arm)
-    if battery:
-        battery = int(battery)
-    if dtype:
-        dtype = int(dtype)
-    
-    db_instance = get_db()
-    with db_read_lock:
+    try:
+        minutes = int(request.args.get('minutes', 5))
+        arm = request.args.get('arm')
+        battery = request.args.get('battery')
+        dtype = request.args.get('dtype')
+        data_type = request.args.get('data_type')
+        limit = int(request.args.get('limit', 50))
+        language = request.args.get('lang', 'tr')
+        
+        if arm:
+            arm = int(arm)
+        if battery:
+            battery = int(battery)
+        if dtype:
+            dtype = int(dtype)
+        
+        db_instance = get_db()
         data = db_instance.get_recent_data_with_translations(
-        minutes=minutes, 
-        arm=arm, 
-        battery=battery, 
-        dtype=dtype, 
-        data_type=data_type, 
-        limit=limit,
-        language=language
-    )
-    return jsonify(data)
+            minutes=minutes, 
+            arm=arm, 
+            battery=battery, 
+            dtype=dtype, 
+            data_type=data_type, 
+            limit=limit,
+            language=language
+        )
+        return jsonify(data)
+    except ValueError as e:
+        # Geçersiz parametre
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
 
 @app.route('/api/data_by_date')
 def get_data_by_date():
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
-    arm = request.args.get('arm')
-    dtype = request.args.get('dtype')
-    language = request.args.get('lang', 'tr')
-    
-    if arm:
-        arm = int(arm)
-    if dtype:
-        dtype = int(dtype)
-    
-    db_instance = get_db()
-    with db_read_lock:
+    try:
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        arm = request.args.get('arm')
+        dtype = request.args.get('dtype')
+        language = request.args.get('lang', 'tr')
+        
+        if arm:
+            arm = int(arm)
+        if dtype:
+            dtype = int(dtype)
+        
+        db_instance = get_db()
         data = db_instance.get_data_by_date_range_with_translations(
-        start_date, end_date, arm, dtype, language
-    )
-    return jsonify(data)
+            start_date, end_date, arm=arm, dtype=dtype, language=language
+        )
+        return jsonify(data)
+    except (ValueError, TypeError) as e:
+        # Geçersiz veya eksik tarih/parametre
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
 
 
 
@@ -430,6 +679,9 @@ def get_battery_logs():
     page = data.get('page', 1)
     page_size = data.get('pageSize', 50)
     filters = data.get('filters', {})
+    # Opak keyset cursor'ı (ilk sayfa için boş) ve opsiyonel yaklaşık toplam
+    cursor = data.get('cursor')
+    include_total = bool(data.get('includeTotal', False))
     
     # Mevcut dili al
     language = request.headers.get('X-Language', 'tr')
@@ -437,21 +689,33 @@ def get_battery_logs():
     try:
         # Veritabanından gruplandırılmış batarya log verilerini al
         db_instance = get_db()
-        with db_read_lock:
-            logs_data = db_instance.get_grouped_battery_logs(
+        logs_data = db_instance.get_grouped_battery_logs(
             page=page,
             page_size=page_size,
             filters=filters,
-            language=language
+            language=language,
+            cursor=cursor,
+            include_total=include_total
         )
         
-        return jsonify({
+        response = {
             'success': True,
-            'logs': logs_data['logs'],
+            'logs': table_rows(logs_data['logs'], data),
             'currentPage': logs_data['currentPage'],
-            'hasMore': logs_data.get('hasMore', False)
-        })
+            'hasMore': logs_data.get('hasMore', False),
+            'nextCursor': logs_data.get('nextCursor'),
+            'prevCursor': logs_data.get('prevCursor')
+        }
+        if 'totalCount' in logs_data:
+            response['totalCount'] = logs_data['totalCount']
+        return jsonify(response)
         
+    except ValueError as e:
+        # Geçersiz cursor
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -473,9 +737,8 @@ def get_battery_detail_charts():
     
     try:
         db_instance = get_db()
-        with db_read_lock:
-            # 1 saat aralıklarla en son 7 saatlik veri getir
-            charts_data = db_instance.get_battery_detail_charts(arm, battery)
+        # 1 saat aralıklarla en son 7 saatlik veri getir
+        charts_data = db_instance.get_battery_detail_charts(arm, battery)
         
         return jsonify({
             'success': True,
@@ -488,6 +751,49 @@ def get_battery_detail_charts():
             'message': str(e)
         }), 500
 
+@app.route('/api/timeseries', methods=['GET'])
+def get_timeseries():
+    """Grafik zaman serisi: arm, k, dtypes (virgüllü), start/end (ms), points, method (lttb/minmax)
+
+    Her dtype en fazla points nokta döner; aralık ne kadar uzun olursa olsun yanıt boyutu sınırlıdır.
+    """
+    try:
+        arm = request.args.get('arm', type=int)
+        k = request.args.get('k', type=int)
+        if not arm or not k:
+            raise ValueError('arm ve k parametreleri gerekli')
+
+        db_instance = get_db()
+        names = db_instance.ARM_SERIES_NAMES if k == 2 else db_instance.BATTERY_SERIES_NAMES
+        dtypes_param = request.args.get('dtypes')
+        dtypes = [int(value) for value in dtypes_param.split(',') if value.strip()] if dtypes_param else list(names)
+
+        end_time = request.args.get('end', type=int) or int(time.time() * 1000)
+        start_time = request.args.get('start', type=int) or end_time - db_instance.TIMESERIES_RAW_SPAN_MS
+        if start_time >= end_time:
+            raise ValueError('start, end değerinden küçük olmalı')
+
+        points = min(max(request.args.get('points', 500, type=int), 10), 2000)
+        method = request.args.get('method', 'lttb')
+        if method not in downsampling.METHODS:
+            raise ValueError(f"Geçersiz örnekleme yöntemi: {method}")
+        resolution = request.args.get('resolution') or None
+
+        result = db_instance.get_timeseries(arm, k, dtypes, start_time, end_time,
+                                            points=points, method=method, resolution=resolution)
+        return jsonify({'success': True, 'data': result})
+
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
 @app.route('/api/arm-logs', methods=['POST'])
 def get_arm_logs():
     """Gruplandırılmış kol log verilerini getir"""
@@ -495,6 +801,9 @@ def get_arm_logs():
     page = data.get('page', 1)
     page_size = data.get('pageSize', 50)
     filters = data.get('filters', {})
+    # Opak keyset cursor'ı (ilk sayfa için boş) ve opsiyonel yaklaşık toplam
+    cursor = data.get('cursor')
+    include_total = bool(data.get('includeTotal', False))
     
     # Mevcut dili al
     language = request.headers.get('X-Language', 'tr')
@@ -502,21 +811,33 @@ def get_arm_logs():
     try:
         # Veritabanından gruplandırılmış kol log verilerini al
         db_instance = get_db()
-        with db_read_lock:
-            logs_data = db_instance.get_grouped_arm_logs(
+        logs_data = db_instance.get_grouped_arm_logs(
             page=page,
             page_size=page_size,
             filters=filters,
-            language=language
+            language=language,
+            cursor=cursor,
+            include_total=include_total
         )
         
-        return jsonify({
+        response = {
             'success': True,
-            'logs': logs_data['logs'],
+            'logs': table_rows(logs_data['logs'], data),
             'currentPage': logs_data['currentPage'],
-            'hasMore': logs_data.get('hasMore', False)
-        })
+            'hasMore': logs_data.get('hasMore', False),
+            'nextCursor': logs_data.get('nextCursor'),
+            'prevCursor': logs_data.get('prevCursor')
+        }
+        if 'totalCount' in logs_data:
+            response['totalCount'] = logs_data['totalCount']
+        return jsonify(response)
         
+    except ValueError as e:
+        # Geçersiz cursor
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -525,27 +846,24 @@ def get_arm_logs():
 
 @app.route('/api/logs/export', methods=['POST'])
 def export_logs():
-    """Log verilerini CSV olarak export et"""
+    """Log verilerini CSV olarak export et (akış halinde)"""
     try:
-        data = request.get_json()
+        data = request.get_json() or {}
         filters = data.get('filters', {})
+        row_limit = _export_row_limit(data)
         
         db_instance = get_db()
-        with db_read_lock:
-            csv_content = db_instance.export_logs_to_csv(filters)
-        
-        response = app.response_class(
-            response=csv_content,
-            status=200,
-            mimetype='text/csv'
+        return csv_stream_response(
+            db_instance.export_logs_to_csv(filters, max_rows=row_limit),
+            'logs_export.csv', data,
+            estimated_rows=db_instance.estimate_export_rows('battery', filters),
+            row_limit=row_limit
         )
-        response.headers['Content-Disposition'] = 'attachment; filename=logs_export.csv'
-        response.headers['Content-Type'] = 'text/csv; charset=utf-8'
-        return response
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/batteries', methods=['POST'])
+@cached_response(live=True)
 def get_batteries():
     """Batarya verilerini getir"""
     try:
@@ -557,19 +875,38 @@ def get_batteries():
         # Mevcut dili al (localStorage'dan veya varsayılan olarak 'tr')
         language = request.headers.get('X-Language', 'tr')
         
-        # Read-only işlem için read lock kullan (daha hızlı)
-        def get_batteries_data():
+        # İstemcinin elindeki generation: sadece sonrasında değişen bataryalar döner
+        since_generation = data.get('since_generation')
+        generation = None
+        delta = False
+        
+        # Canlı görünüm varsa veritabanına hiç gidilmez
+        snapshot = get_live_snapshot()
+        if snapshot:
+            batteries_data = live_view.batteries_for_display(
+                snapshot, page, page_size, selected_arm, get_dtype_names(language)
+            )
+            generation = snapshot.generation
+            live_change_tracker.update(snapshot)
+            if since_generation is not None:
+                changed = live_change_tracker.changed_since(selected_arm, int(since_generation))
+                if changed is not None:
+                    delta = True
+                    batteries_data['batteries'] = [
+                        battery for battery in batteries_data['batteries'] if battery['batteryAddress'] in changed
+                    ]
+        else:
+            # Okuma salt okunur havuzdan, diğer isteklerle eşzamanlı çalışır
             db_instance = get_db()
-            with db_read_lock:
-                return db_instance.get_batteries_for_display(page, page_size, selected_arm, language)
-        
-        batteries_data = db_operation_with_retry(get_batteries_data)
+            batteries_data = db_instance.get_batteries_for_display(page, page_size, selected_arm, language)
         
         return jsonify({
             'success': True,
             'batteries': batteries_data['batteries'],
             'totalPages': batteries_data['totalPages'],
-            'currentPage': batteries_data['currentPage']
+            'currentPage': batteries_data['currentPage'],
+            'generation': generation,
+            'delta': delta  # False -> tam liste, istemci tüm kartları yeniden çizer
         })
         
     except Exception as e:
@@ -579,12 +916,12 @@ def get_batteries():
         }), 500
 
 @app.route('/api/active-arms', methods=['GET'])
+@cached_response(live=True)
 def get_active_arms():
     """Aktif kolları getir (armslavecount > 0)"""
     try:
         db_instance = get_db()
-        with db_read_lock:
-            active_arms = db_instance.get_active_arms()
+        active_arms = db_instance.get_active_arms()
         return jsonify({
             'success': True,
             'activeArms': active_arms
@@ -596,6 +933,7 @@ def get_active_arms():
         }), 500
 
 @app.route('/api/passive-balance', methods=['GET'])
+@cached_response(live=True)
 def get_passive_balance():
     """Passive balance verilerini getir"""
     try:
@@ -604,8 +942,7 @@ def get_passive_balance():
             arm = int(arm)
         
         db_instance = get_db()
-        with db_read_lock:
-            balance_data = db_instance.get_passive_balance(arm)
+        balance_data = db_instance.get_passive_balance(arm)
         return jsonify({
             'success': True,
             'balanceData': balance_data
@@ -618,67 +955,114 @@ def get_passive_balance():
 
 @app.route('/api/batteries/export', methods=['POST'])
 def export_batteries():
-    """Batarya verilerini CSV olarak export et"""
+    """Batarya verilerini CSV olarak export et (akış halinde)"""
     try:
-        # Lock kullanmadan doğrudan çağır - database.py içinde optimize edilecek
-        db_instance = get_db()
-        csv_content = db_instance.export_batteries_to_csv()
+        data = request.get_json(silent=True) or {}
+        row_limit = _export_row_limit(data)
         
-        response = app.response_class(
-            response=csv_content,
-            status=200,
-            mimetype='text/csv'
+        db_instance = get_db()
+        return csv_stream_response(
+            db_instance.export_batteries_to_csv(max_rows=row_limit),
+            'batteries_export.csv', data,
+            estimated_rows=db_instance.estimate_export_rows('batteries'),
+            row_limit=row_limit
         )
-        response.headers['Content-Disposition'] = 'attachment; filename=batteries_export.csv'
-        response.headers['Content-Type'] = 'text/csv; charset=utf-8'
-        return response
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/battery-logs/export', methods=['POST'])
 def export_battery_logs():
-    """Batarya log verilerini CSV olarak export et"""
+    """Batarya log verilerini CSV olarak export et (akış halinde)"""
     try:
-        data = request.get_json()
-        filters = data.get('filters', {}) if data else {}
+        data = request.get_json() or {}
+        filters = data.get('filters', {})
+        row_limit = _export_row_limit(data)
         
-        # Lock kullanmadan doğrudan çağır - database.py içinde optimize edilmiş
         db_instance = get_db()
-        csv_content = db_instance.export_logs_to_csv(filters)
-        
-        response = app.response_class(
-            response=csv_content,
-            status=200,
-            mimetype='text/csv'
+        return csv_stream_response(
+            db_instance.export_logs_to_csv(filters, max_rows=row_limit),
+            'battery_logs_export.csv', data,
+            estimated_rows=db_instance.estimate_export_rows('battery', filters),
+            row_limit=row_limit
         )
-        response.headers['Content-Disposition'] = 'attachment; filename=battery_logs_export.csv'
-        response.headers['Content-Type'] = 'text/csv; charset=utf-8'
-        return response
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/arm-logs/export', methods=['POST'])
 def export_arm_logs():
-    """Kol log verilerini CSV olarak export et"""
+    """Kol log verilerini CSV olarak export et (akış halinde)"""
     try:
-        data = request.get_json()
-        filters = data.get('filters', {}) if data else {}
+        data = request.get_json() or {}
+        filters = data.get('filters', {})
+        row_limit = _export_row_limit(data)
         
-        # Lock kullanmadan doğrudan çağır - database.py içinde optimize edilmiş
         db_instance = get_db()
-        csv_content = db_instance.export_arm_logs_to_csv(filters)
-        
-        response = app.response_class(
-            response=csv_content,
-            status=200,
-            mimetype='text/csv'
+        return csv_stream_response(
+            db_instance.export_arm_logs_to_csv(filters, max_rows=row_limit),
+            'arm_logs_export.csv', data,
+            estimated_rows=db_instance.estimate_export_rows('arm', filters),
+            row_limit=row_limit
         )
-        response.headers['Content-Disposition'] = 'attachment; filename=arm_logs_export.csv'
-        response.headers['Content-Type'] = 'text/csv; charset=utf-8'
-        return response
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/bulk-export/months', methods=['GET'])
+def get_bulk_export_months():
+    """Toplu export için veri bulunan aylar"""
+    try:
+        return jsonify({
+            'success': True,
+            'months': BulkExporter(get_db()).available_months(),
+            'formats': list(BULK_EXPORT_FORMATS)
+        })
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@app.route('/api/bulk-export', methods=['GET'])
+def bulk_export():
+    """Bir ayın ham verisini kolon bazlı (npz / csv.gz) indir"""
+    try:
+        fmt = request.args.get('format', 'npz')
+        if fmt not in BULK_EXPORT_FORMATS:
+            return jsonify({'success': False, 'message': f'Geçersiz format: {fmt}'}), 400
+        
+        exporter = BulkExporter(get_db())
+        year, month = exporter.parse_month(request.args.get('month'))
+        arm = request.args.get('arm', type=int)
+        filename = f"battery_data_{year:04d}_{month:02d}{'_arm' + str(arm) if arm else ''}.{fmt}"
+        
+        if fmt == 'csv.gz':
+            # Metin parçaları akış halinde gzip'lenir (dosya, Content-Encoding değil)
+            body = _gzip_chunks(exporter.iter_csv_chunks(year, month, arm))
+            response = Response(stream_with_context(body), status=200, mimetype='application/gzip')
+        else:
+            # npz (zip) seekable dosya ister: geçici dosyaya yaz, bloklar halinde gönder
+            output = tempfile.TemporaryFile()
+            rows = exporter.write_npz(output, year, month, arm)
+            output.seek(0)
+            
+            def read_blocks():
+                with output:
+                    for block in iter(lambda: output.read(64 * 1024), b''):
+                        yield block
+            
+            response = Response(read_blocks(), status=200, mimetype='application/octet-stream')
+            response.headers['X-Export-Rows'] = str(rows)
+        
+        response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except RuntimeError as e:
+        # numpy kurulu değil
+        return jsonify({'success': False, 'message': str(e)}), 501
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
 @app.route('/api/stats')
 def get_stats():
     """İstatistik verilerini getir"""
@@ -727,10 +1111,11 @@ def save_batconfig():
         }
         
         try:
-            # Konfigürasyonu dosyaya kaydet (main.py için)
-            with open('pending_config.json', 'w', encoding='utf-8') as f:
-                json.dump(config_data, f, indent=2, ensure_ascii=False)
-            print(f"Batarya konfigürasyonu dosyaya kaydedildi: {data}")
+            # Konfigürasyonu main.py'ye gönder (komut kanalı, onay beklenir)
+            ack = command_channel.send_command(config_data)
+            if not ack['ok']:
+                raise Exception(ack.get('error'))
+            print(f"Batarya konfigürasyonu main.py'ye iletildi: {data}")
             
             # Konfigürasyonu veritabanına da kaydet
             db_instance = get_db()
@@ -749,6 +1134,7 @@ def save_batconfig():
                     sohmin=data['Sohmin']
                 )
             print(f"Batarya konfigürasyonu veritabanına kaydedildi: Kol {data['armValue']}")
+            bump_config_generation()
             
         except Exception as e:
             print(f"Konfigürasyon kaydedilirken hata: {e}")
@@ -807,10 +1193,11 @@ def save_armconfig():
         }
         
         try:
-            # Konfigürasyonu dosyaya kaydet (main.py için)
-            with open('pending_config.json', 'w', encoding='utf-8') as f:
-                json.dump(config_data, f, indent=2, ensure_ascii=False)
-            print(f"Kol konfigürasyonu dosyaya kaydedildi: {data}")
+            # Konfigürasyonu main.py'ye gönder (komut kanalı, onay beklenir)
+            ack = command_channel.send_command(config_data)
+            if not ack['ok']:
+                raise Exception(ack.get('error'))
+            print(f"Kol konfigürasyonu main.py'ye iletildi: {data}")
             
             # Konfigürasyonu veritabanına da kaydet
             db_instance = get_db()
@@ -825,6 +1212,7 @@ def save_armconfig():
                     temp_min=data['tempMin']
                 )
             print(f"Kol konfigürasyonu veritabanına kaydedildi: Kol {data['armValue']}")
+            bump_config_generation()
             
         except Exception as e:
             print(f"Konfigürasyon kaydedilirken hata: {e}")
@@ -846,13 +1234,13 @@ def save_armconfig():
         }), 500
 
 @app.route('/api/batconfigs', methods=['GET'])
+@cached_response(config=True)
 def get_batconfigs():
     """Tüm batarya konfigürasyonlarını getir"""
     try:
         # Veritabanından konfigürasyonları oku
         db_instance = get_db()
-        with db_read_lock:
-            configs = db_instance.get_batconfigs()
+        configs = db_instance.get_batconfigs()
         return jsonify({
             'success': True,
             'data': configs
@@ -864,13 +1252,13 @@ def get_batconfigs():
         }), 500
 
 @app.route('/api/armconfigs', methods=['GET'])
+@cached_response(config=True)
 def get_armconfigs():
     """Tüm kol konfigürasyonlarını getir"""
     try:
         # Veritabanından konfigürasyonları oku
         db_instance = get_db()
-        with db_read_lock:
-            configs = db_instance.get_armconfigs()
+        configs = db_instance.get_armconfigs()
         return jsonify({
             'success': True,
             'data': configs
@@ -889,18 +1277,18 @@ def get_alarms():
         show_resolved = request.args.get('show_resolved', 'false').lower() == 'true'
         page = int(request.args.get('page', 1))
         page_size = int(request.args.get('pageSize', 50))
+        cursor = request.args.get('cursor')
+        include_total = request.args.get('includeTotal', 'false').lower() == 'true'  # Opsiyonel, yaklaşık
         
         # Veritabanından sayfalanmış alarmları oku
-        def get_alarms_data():
-            db_instance = get_db()
-            with db_read_lock:
-                return db_instance.get_paginated_alarms(
-                    show_resolved=show_resolved,
-                    page=page,
-                    page_size=page_size
-                )
-        
-        alarms_data = db_operation_with_retry(get_alarms_data)
+        db_instance = get_db()
+        alarms_data = db_instance.get_paginated_alarms(
+            show_resolved=show_resolved,
+            page=page,
+            page_size=page_size,
+            cursor=cursor,
+            include_total=include_total
+        )
         
         # Alarm verilerini işle
         processed_alarms = []
@@ -911,11 +1299,21 @@ def get_alarms():
         
         return jsonify({
             'success': True,
-            'alarms': processed_alarms,
-            'totalCount': alarms_data['totalCount'],
-            'totalPages': alarms_data['totalPages'],
-            'currentPage': alarms_data['currentPage']
+            'alarms': table_rows(processed_alarms),
+            'totalCount': alarms_data.get('totalCount'),
+            'totalPages': alarms_data.get('totalPages'),
+            'totalIsApproximate': alarms_data.get('totalIsApproximate', False),
+            'currentPage': alarms_data['currentPage'],
+            'hasMore': alarms_data.get('hasMore', False),
+            'nextCursor': alarms_data.get('nextCursor'),
+            'prevCursor': alarms_data.get('prevCursor')
         })
+    except ValueError as e:
+        # Geçersiz cursor veya sayfa parametresi
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -929,18 +1327,18 @@ def get_alarm_history():
         # Query parametrelerini al
         page = int(request.args.get('page', 1))
         page_size = int(request.args.get('pageSize', 50))
+        cursor = request.args.get('cursor')
+        include_total = request.args.get('includeTotal', 'false').lower() == 'true'  # Opsiyonel, yaklaşık
         
         # Veritabanından sadece çözülmüş alarmları oku
-        def get_alarm_history_data():
-            db_instance = get_db()
-            with db_read_lock:
-                return db_instance.get_paginated_alarms(
-                    show_resolved=True,  # Sadece çözülmüş alarmlar
-                    page=page,
-                    page_size=page_size
-                )
-        
-        alarms_data = db_operation_with_retry(get_alarm_history_data)
+        db_instance = get_db()
+        alarms_data = db_instance.get_paginated_alarms(
+            show_resolved=True,  # Sadece çözülmüş alarmlar
+            page=page,
+            page_size=page_size,
+            cursor=cursor,
+            include_total=include_total
+        )
         
         # Alarm verilerini işle
         processed_alarms = []
@@ -951,11 +1349,21 @@ def get_alarm_history():
         
         return jsonify({
             'success': True,
-            'alarms': processed_alarms,
-            'totalCount': alarms_data['totalCount'],
-            'totalPages': alarms_data['totalPages'],
-            'currentPage': alarms_data['currentPage']
+            'alarms': table_rows(processed_alarms),
+            'totalCount': alarms_data.get('totalCount'),
+            'totalPages': alarms_data.get('totalPages'),
+            'totalIsApproximate': alarms_data.get('totalIsApproximate', False),
+            'currentPage': alarms_data['currentPage'],
+            'hasMore': alarms_data.get('hasMore', False),
+            'nextCursor': alarms_data.get('nextCursor'),
+            'prevCursor': alarms_data.get('prevCursor')
         })
+    except ValueError as e:
+        # Geçersiz cursor veya sayfa parametresi
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -963,12 +1371,16 @@ def get_alarm_history():
         }), 500
 
 @app.route('/api/summary', methods=['GET'])
+@cached_response(live=True)
 def get_summary():
     """Özet sayfası için veri getir"""
     try:
-        # Veritabanından özet verileri oku
-        db_instance = get_db()
-        with db_read_lock:
+        # Canlı görünüm varsa RAM verisinden, yoksa veritabanından oku
+        snapshot = get_live_snapshot()
+        if snapshot:
+            summary_data = live_view.summary_data(snapshot)
+        else:
+            db_instance = get_db()
             summary_data = db_instance.get_summary_data()
         
         return jsonify({
@@ -987,8 +1399,7 @@ def get_mail_recipients():
     """Mail alıcılarını getir"""
     try:
         db_instance = get_db()
-        with db_read_lock:
-            recipients = db_instance.get_mail_recipients()
+        recipients = db_instance.get_mail_recipients()
         
         return jsonify({
             'success': True,
@@ -1076,20 +1487,21 @@ def process_alarm_data(alarm):
         timestamp = alarm[5]  # timestamp
         status = alarm[6]  # status
         resolved_at = alarm[7] if len(alarm) > 7 else None  # resolved_at
+        occurrence_count = (alarm[9] if len(alarm) > 9 else None) or 1  # episode tekrar sayısı
+        last_seen = alarm[10] if len(alarm) > 10 else None  # episode son görülme (ms)
         
-        # Ortak alarm kontrol fonksiyonunu kullan
-        if not is_valid_alarm(error_msb, error_lsb):
+        # Ortak alarm kod tablosunu kullan
+        code = alarm_codes.lookup(error_msb, error_lsb)
+        if not code.is_valid:
             print(f"⚠️ Geçersiz alarm filtrelendi: arm={arm}, battery={battery}, MSB={error_msb}, LSB={error_lsb}")
             return None
         
-        alarm_type = get_alarm_type(error_msb, error_lsb)
+        description = alarm_codes.get_description(error_msb, error_lsb)
         
-        if alarm_type == 'arm':  # Kol alarmı
-            description = get_arm_alarm_description(error_msb)
+        if code.type == 'arm':  # Kol alarmı
             battery_display = "Kol Alarmı"
             battery_key = 0  # JavaScript için kol alarmı key'i
         else:  # Batarya alarmı
-            description = get_battery_alarm_description(error_msb, error_lsb)
             # Batarya alarmlarında k değeri varsa göster (2 eksik), yoksa boş bırak
             if battery == 0:
                 battery_display = ""
@@ -1103,66 +1515,17 @@ def process_alarm_data(alarm):
             'battery': battery_key,  # JavaScript için orijinal k değeri
             'batteryDisplay': battery_display,  # Ekranda gösterilecek değer
             'description': description,
+            'descriptionKey': code.key,  # alarms.descriptions.<key> çeviri anahtarı
             'status': "Devam Ediyor",
             'timestamp': timestamp,
-            'resolved_at': resolved_at
+            'resolved_at': resolved_at,
+            'occurrenceCount': occurrence_count,
+            'lastSeen': last_seen or timestamp
         }
     except Exception as e:
         print(f"Alarm verisi işlenirken hata: {e}")
         return None
 
-def get_battery_alarm_description(error_msb, error_lsb):
-    """Batarya alarm açıklaması oluştur"""
-    # MSB kontrolü (errorCodeLsb !== 1 && errorCodeMsb >= 1)
-    if error_lsb != 1 and error_msb >= 1:
-        if error_msb == 1:
-            return "Pozitif kutup başı alarmı"
-        elif error_msb == 2:
-            return "Negatif kutup başı sıcaklık alarmı"
-    
-    # LSB kontrolü (error_msb = 0 olan durumlar da dahil)
-    if error_lsb == 4:
-        return "Düşük batarya gerilim uyarısı"
-    elif error_lsb == 8:
-        return "Düşük batarya gerilimi alarmı"
-    elif error_lsb == 16:
-        return "Yüksek batarya gerilimi uyarısı"
-    elif error_lsb == 32:
-        return "Yüksek batarya gerilimi alarmı"
-    elif error_lsb == 64:
-        return "Modül sıcaklık alarmı"
-    
-    return None
-
-def get_arm_alarm_description(error_msb):
-    """Kol alarm açıklaması oluştur"""
-    if error_msb == 2:
-        return "Yüksek akım alarmı"
-    elif error_msb == 4:
-        return "Yüksek nem alarmı"
-    elif error_msb == 8:
-        return "Yüksek ortam sıcaklığı alarmı"
-    elif error_msb == 16:
-        return "Yüksek kol sıcaklığı alarmı"
-    elif error_msb == 266:
-        return "Kol verisi gelmiyor"
-    else:
-        return None
-
-def is_valid_alarm(error_msb, error_lsb):
-    """Alarm geçerli mi kontrol et - process_alarm_data ile aynı mantık"""
-    if error_lsb == 9:  # Kol alarmı
-        return get_arm_alarm_description(error_msb) is not None
-    else:  # Batarya alarmı
-        return get_battery_alarm_description(error_msb, error_lsb) is not None
-
-def get_alarm_type(error_msb, error_lsb):
-    """Alarm türünü döndür - 'arm' veya 'battery'"""
-    if error_lsb == 9:
-        return 'arm'
-    else:
-        return 'battery'
-
 @app.route('/api/send-config-to-device', methods=['POST'])
 @admin_required
 def send_config_to_device():
@@ -1171,7 +1534,7 @@ def send_config_to_device():
         data = request.get_json()
         command = data.get('command', '5 5 0x7A')
         
-        # Konfigürasyonu JSON dosyasına kaydet (main.py için)
+        # Komutu main.py'ye gönder
         config_data = {
             'type': 'send_to_device',
             'command': command,
@@ -1179,11 +1542,12 @@ def send_config_to_device():
         }
         
         try:
-            with open('pending_config.json', 'w', encoding='utf-8') as f:
-                json.dump(config_data, f, indent=2, ensure_ascii=False)
+            ack = command_channel.send_command(config_data)
+            if not ack['ok']:
+                raise Exception(ack.get('error'))
             print(f"Konfigürasyon cihaza gönderilecek: {command}")
         except Exception as e:
-            print(f"Konfigürasyon dosyaya kaydedilirken hata: {e}")
+            print(f"Konfigürasyon main.py'ye iletilirken hata: {e}")
             return jsonify({
                 'success': False,
                 'message': 'Konfigürasyon kaydedilemedi'
@@ -1205,12 +1569,8 @@ def send_config_to_device():
 def get_mail_server_config():
     """Mail sunucu konfigürasyonunu getir"""
     try:
-        def get_config():
-            db_instance = get_db()
-            with db_read_lock:
-                return db_instance.get_mail_server_config()
-        
-        config = db_operation_with_retry(get_config)
+        db_instance = get_db()
+        config = db_instance.get_mail_server_config()
         
         return jsonify({
             'success': True,
@@ -1238,6 +1598,16 @@ def save_mail_server_config():
                     'message': f'{field} alanı zorunludur'
                 }), 400
         
+        try:
+            digest_window_minutes = int(data.get('digest_window_minutes') or 0)
+        except (TypeError, ValueError):
+            digest_window_minutes = -1
+        if not 0 <= digest_window_minutes <= 1440:
+            return jsonify({
+                'success': False,
+                'message': 'digest_window_minutes 0-1440 arasında olmalıdır'
+            }), 400
+        
         def save_config():
             db_instance = get_db()
             with db_lock:
@@ -1247,7 +1617,9 @@ def save_mail_server_config():
                     smtp_username=data.get('smtp_username', ''),
                     smtp_password=data.get('smtp_password', ''),
                     use_tls=data.get('use_tls', True),
-                    is_active=data.get('is_active', True)
+                    is_active=data.get('is_active', True),
+                    digest_window_minutes=digest_window_minutes,
+                    digest_critical_bypass=data.get('digest_critical_bypass', True)
                 )
         
         success = db_operation_with_retry(save_config)
@@ -1403,12 +1775,8 @@ def get_all_ips():
 def get_ip_config():
     """IP konfigürasyonunu getir"""
     try:
-        def get_config():
-            db_instance = get_db()
-            with db_read_lock:
-                return db_instance.get_ip_config()
-        
-        config = db_operation_with_retry(get_config)
+        db_instance = get_db()
+        config = db_instance.get_ip_config()
         
         return jsonify({
             'success': True,
@@ -1543,20 +1911,17 @@ def send_manual_set_command():
         
         # UART gönderimi için main.py'deki mevcut sistemi kullan
         try:
-            # pending_config.json dosyasına komutu yaz
-            import json
-            import os
-            
+            # Komutu main.py'ye gönder (komut kanalı)
             config_data = {
                 "type": "manual_set",
                 "arm": arm,
                 "slave": slave,
-                "command": manual_set_command,
-                "timestamp": time.time()
+                "command": manual_set_command
             }
             
-            with open("pending_config.json", "w") as f:
-                json.dump(config_data, f)
+            ack = command_channel.send_command(config_data)
+            if not ack['ok']:
+                raise Exception(ack.get('error'))
             
             
             return jsonify({
@@ -1591,7 +1956,7 @@ def get_trap_targets():
     """Trap hedeflerini getir"""
     try:
         db = get_db()
-        targets = db_operation_with_retry(lambda: db.get_trap_targets())
+        targets = db.get_trap_targets()
         return jsonify({
             'success': True,
             'data': targets
@@ -1686,7 +2051,7 @@ def get_trap_settings():
     """Trap ayarlarını getir (trap_targets'ten)"""
     try:
         db = get_db()
-        target = db_operation_with_retry(lambda: db.get_trap_target())
+        target = db.get_trap_target()
         
         if target:
             # trap_targets formatını trap_settings formatına çevir
@@ -1773,17 +2138,11 @@ def save_trap_settings():
         
         # Kayıt başarılıysa trap_targets RAM'ini yeniden yükle
         if result.get('success'):
-            # main.py'ye sinyal gönder (pending_config.json ile)
-            import json
-            import os
-            config_file = 'pending_config.json'
-            config_data = {
-                'type': 'reload_trap_targets',
-                'timestamp': time.time()
-            }
+            # main.py'ye sinyal gönder (komut kanalı)
             try:
-                with open(config_file, 'w') as f:
-                    json.dump(config_data, f)
+                ack = command_channel.send_command({'type': 'reload_trap_targets'})
+                if not ack['ok']:
+                    raise Exception(ack.get('error'))
                 print(f"✓ Trap hedefleri yeniden yükleme sinyali gönderildi")
             except Exception as e:
                 print(f"⚠️ Sinyal gönderme hatası: {e}")
@@ -1821,7 +2180,7 @@ def get_trap_history():
         page_size = int(request.args.get('pageSize', 50))
         
         db = get_db()
-        history = db_operation_with_retry(lambda: db.get_trap_history(page, page_size))
+        history = db.get_trap_history(page, page_size)
         
         return jsonify({
             'success': True,
@@ -1838,7 +2197,7 @@ def get_trap_stats():
     """Trap istatistiklerini getir"""
     try:
         db = get_db()
-        stats = db_operation_with_retry(lambda: db.get_trap_stats())
+        stats = db.get_trap_stats()
         
         return jsonify({
             'success': True,
@@ -1850,6 +2209,22 @@ def get_trap_stats():
             'message': str(e)
         }), 500
 
+@app.route('/api/db-pool-stats', methods=['GET'])
+@admin_required
+def get_db_pool_stats():
+    """Veritabanı connection havuzu bekleme metrikleri (cihaz bazlı ayar için)"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': get_db().get_pool_stats()
+        })
+    except Exception as e:
+        print(f"DB pool stats hatası: {e}")
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
 # ========================================
 # FTP AYARLARI API ENDPOINT'LERİ
 # ========================================
@@ -1866,7 +2241,7 @@ def get_ftp_config():
     """FTP konfigürasyonunu getir"""
     try:
         db = get_db()
-        config = db_operation_with_retry(lambda: db.get_ftp_config())
+        config = db.get_ftp_config()
         
         # Şifreyi frontend'e gönderme, sadece varlığını belirt
         if config and config.get('ftp_password'):
@@ -1904,7 +2279,7 @@ def save_ftp_config():
         # Şifre girilmemişse mevcut şifreyi koru
         db = get_db()
         if not ftp_password:
-            existing_config = db_operation_with_retry(lambda: db.get_ftp_config())
+            existing_config = db.get_ftp_config()
             if existing_config:
                 ftp_password = existing_config.get('ftp_password')
         
@@ -2045,17 +2420,17 @@ def send_command():
         else:
             return jsonify({'success': False, 'message': 'Geçersiz komut'}), 400
         
-        # pending_config.json dosyasına komutu yaz
+        # Komutu main.py'ye gönder (komut kanalı)
         config_data = {
             'type': 'command',
             'command': command,
             'arm': arm,
-            'packet': command_packet,
-            'timestamp': int(time.time() * 1000)
+            'packet': command_packet
         }
         
-        with open('pending_config.json', 'w', encoding='utf-8') as f:
-            json.dump(config_data, f, indent=2, ensure_ascii=False)
+        ack = command_channel.send_command(config_data)
+        if not ack['ok']:
+            return jsonify({'success': False, 'message': f"Komut gönderilemedi: {ack.get('error')}"}), 500
         
         
         return jsonify({
@@ -2083,18 +2458,18 @@ def send_dataget():
         # Veri alma paketini hazırla: 3 byte (arm, slave+1, command)
         dataget_packet = [arm_value, slave_address + 1, slave_command]
         
-        # pending_config.json dosyasına komutu yaz
+        # Komutu main.py'ye gönder (komut kanalı)
         config_data = {
             'type': 'dataget',
             'armValue': arm_value,
             'slaveAddress': slave_address,
             'slaveCommand': slave_command,
-            'packet': dataget_packet,
-            'timestamp': int(time.time() * 1000)
+            'packet': dataget_packet
         }
         
-        with open('pending_config.json', 'w', encoding='utf-8') as f:
-            json.dump(config_data, f, indent=2, ensure_ascii=False)
+        ack = command_channel.send_command(config_data)
+        if not ack['ok']:
+            return jsonify({'success': False, 'message': f"Veri alma komutu gönderilemedi: {ack.get('error')}"}), 500
         
         
         return jsonify({
@@ -2128,18 +2503,14 @@ def start_data_retrieval():
             'valueText': value_text
         }
         
-        # main.py'ye JSON dosyası üzerinden iletişim kur (import etmeden)
-        try:
-            config_file = "pending_config.json"
-            config_data = {
-                'type': 'data_retrieval_start',
-                'config': config
-            }
-            with open(config_file, 'w', encoding='utf-8') as f:
-                json.dump(config_data, f, indent=2, ensure_ascii=False)
-            print(f"✓ Veri alma modu başlatma isteği JSON dosyasına yazıldı: {config_file}")
-        except Exception as je:
-            raise Exception(f"JSON dosyası yazılırken hata: {str(je)}")
+        # main.py'ye komut kanalı üzerinden ilet (import etmeden)
+        ack = command_channel.send_command({
+            'type': 'data_retrieval_start',
+            'config': config
+        })
+        if not ack['ok']:
+            raise Exception(f"Komut iletilemedi: {ack.get('error')}")
+        print(f"✓ Veri alma modu başlatma isteği main.py'ye iletildi")
         
         # Web app tarafında da periyot başlangıcını kaydet
         global data_retrieval_period_start
@@ -2162,14 +2533,11 @@ def start_data_retrieval():
 def stop_data_retrieval():
     """Veri alma modunu durdur"""
     try:
-        # main.py'ye JSON dosyası üzerinden iletişim kur (import etmeden)
-        config_file = "pending_config.json"
-        config_data = {
-            'type': 'data_retrieval_stop'
-        }
-        with open(config_file, 'w', encoding='utf-8') as f:
-            json.dump(config_data, f, indent=2, ensure_ascii=False)
-        print(f"✓ Veri alma modu durdurma isteği JSON dosyasına yazıldı: {config_file}")
+        # main.py'ye komut kanalı üzerinden ilet (import etmeden)
+        ack = command_channel.send_command({'type': 'data_retrieval_stop'})
+        if not ack['ok']:
+            raise Exception(ack.get('error'))
+        print(f"✓ Veri alma modu durdurma isteği main.py'ye iletildi")
         
         # Web app tarafında periyot başlangıcını temizle
         global data_retrieval_period_start
@@ -2186,76 +2554,55 @@ def stop_data_retrieval():
 @app.route('/api/get-retrieved-data', methods=['GET'])
 @login_required
 def get_retrieved_data():
-    """Yakalanan verileri al"""
+    """Yakalanan verileri al (cursor verilirse sadece son yoklamadan beri gelen gruplar)"""
     try:
         # Web app'teki timestamp'ı kullan
         global data_retrieval_period_start
         start_timestamp = data_retrieval_period_start
         if not start_timestamp:
-            return jsonify({'success': True, 'data': []})
-        
-        # Veritabanından timestamp'a göre veri çek
-        db = get_db()
-        with db_read_lock:
-            # Timestamp'ı milisaniye cinsinden kullan (veritabanındaki format)
-            # Önce toplam veri sayısını kontrol et
-            count_query = "SELECT COUNT(*) FROM battery_data"
-            count_cursor = db.execute_query(count_query)
-            total_count = count_cursor.fetchone()[0]
-            
-            # Bu tarihten sonraki verileri al (gruplama ile) - sadece batarya verileri (k > 2)
-            query = """
-                SELECT 
-                    timestamp,
-                    arm,
-                    (k - 2) as address,
-                    MAX(CASE WHEN dtype = 10 THEN data END) as voltage,
-                    MAX(CASE WHEN dtype = 11 THEN data END) as health_status,
-                    MAX(CASE WHEN dtype = 12 THEN data END) as temperature,
-                    MAX(CASE WHEN dtype = 13 THEN data END) as positive_pole_temp,
-                    MAX(CASE WHEN dtype = 14 THEN data END) as negative_pole_temp,
-                    MAX(CASE WHEN dtype = 15 THEN data END) as ntc3_temp,
-                    MAX(CASE WHEN dtype = 126 THEN data END) as charge_status
-                FROM battery_data 
-                WHERE timestamp >= ? AND k > 2
-                GROUP BY timestamp, arm, k
-                ORDER BY timestamp ASC, arm ASC, k ASC
-            """
-            
-            # SQL sorgusu logları kaldırıldı
-            
-            data_cursor = db.execute_query(query, (start_timestamp,))
-            data = data_cursor.fetchall()
-            
-            # Verileri formatla (gruplama ile)
-            retrieved_data = []
-            for row in data:
-                # Timestamp'ı çevir
-                timestamp_ms = row[0]
-                timestamp_dt = datetime.fromtimestamp(timestamp_ms / 1000)
-                formatted_time = timestamp_dt.strftime("%Y-%m-%d %H:%M:%S")
-                
-                # Veri satırı oluştur
-                data_row = {
-                    'timestamp': formatted_time,
-                    'arm': row[1],
-                    'address': row[2],
-                    'voltage': row[3],
-                    'health_status': row[4],
-                    'temperature': row[5],
-                    'positive_pole_temp': row[6],
-                    'negative_pole_temp': row[7],
-                    'ntc3_temp': row[8],
-                    'charge_status': row[9]
-                }
-                retrieved_data.append(data_row)
-            
-            return jsonify({
-                'success': True,
-                'data': retrieved_data
-            })
+            return jsonify({'success': True, 'data': [], 'cursor': None, 'reset': True})
+        
+        # Cursor başka bir veri alma periyoduna aitse baştan gönderilir (istemci listesini temizler)
+        _, key = decode_page_cursor(request.args.get('cursor'))
+        reset = not key or len(key) != 3 or key[0] != start_timestamp
+        after = None if reset else (key[1], key[2])
+        
+        # Sadece batarya verileri (k > 2), milisaniye timestamp ile
+        rows, last_key = get_db().get_retrieved_data_since(start_timestamp, after)
+        
+        # Verileri formatla (gruplama ile)
+        retrieved_data = []
+        for row in rows:
+            # Timestamp'ı çevir
+            timestamp_dt = datetime.fromtimestamp(row[0] / 1000)
+            formatted_time = timestamp_dt.strftime("%Y-%m-%d %H:%M:%S")
             
+            # Veri satırı oluştur
+            data_row = {
+                'timestamp': formatted_time,
+                'arm': row[1],
+                'address': row[2],
+                'voltage': row[3],
+                'health_status': row[4],
+                'temperature': row[5],
+                'positive_pole_temp': row[6],
+                'negative_pole_temp': row[7],
+                'ntc3_temp': row[8],
+                'charge_status': row[9]
+            }
+            retrieved_data.append(data_row)
+        
+        return jsonify({
+            'success': True,
+            'data': table_rows(retrieved_data),
+            'cursor': encode_page_cursor('next', (start_timestamp,) + tuple(last_key)) if last_key else None,
+            'reset': reset
+        })
+        
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     except Exception as e:
+        print(f"❌ Veri alma satırları alınamadı: {e}")
         return jsonify({'success': False, 'message': 'Veriler alınamadı'}), 500
 
 @app.route('/api/data-retrieval-status', methods=['GET'])
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""web_app üretim giriş noktası (waitress, tek süreç + sınırlı thread havuzu)
+
+Kullanım:
+    python3 wsgi.py [port]          # Varsayılan port 80
+    gunicorn ... wsgi:application   # Başka bir WSGI sunucusu tercih edilirse
+
+Tek süreç kullanılır: veritabanı havuzu, yanıt önbelleği, canlı görünüm okuyucusu ve SSE yayını
+tüm thread'ler arasında paylaşılır. Thread/bağlantı sayıları CPU ve RAM'den hesaplanır,
+WEB_THREADS, WEB_CONNECTION_LIMIT, WEB_BACKLOG ve WEB_MAX_STREAMS ile ezilebilir.
+
+Ölçüm (Pi üzerinde, önce web_app.py sonra wsgi.py ile):
+    python3 bench_web_concurrency.py --url http://127.0.0.1:80 --clients 20 --duration 30
+"""
+
+import logging
+import os
+import signal
+import sys
+
+def _total_ram_mb():
+    """Toplam RAM (MB), okunamazsa 1 GB varsay"""
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemTotal:'):
+                    return int(line.split()[1]) // 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return 1024
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    if not value:
+        return default
+    try:
+        return max(1, int(value))
+    except ValueError:
+        print(f"⚠️ Geçersiz {name}: {value}, {default} kullanılacak")
+        return default
+
+def serving_profile(cpu_count=None, ram_mb=None):
+    """CPU ve RAM'e göre thread, bağlantı ve kuyruk sınırları
+
+    İstekler çoğunlukla SQLite/JSON beklediği için çekirdek başına 4 thread; her thread'e ~128 MB
+    RAM payı düşmeyecekse azaltılır. SSE akışları thread tuttuğu için en fazla yarısını alabilir.
+    Pi 4 (4 çekirdek, 4 GB): 16 thread, 8 akış, 64 bağlantı, 4 okuyucu DB connection.
+    """
+    cpu_count = cpu_count or os.cpu_count() or 1
+    ram_mb = ram_mb or _total_ram_mb()
+    threads = _env_int('WEB_THREADS', max(4, min(cpu_count * 4, ram_mb // 128, 32)))
+    return {
+        'threads': threads,
+        'max_streams': _env_int('WEB_MAX_STREAMS', max(1, threads // 2)),
+        'connection_limit': _env_int('WEB_CONNECTION_LIMIT', threads * 4),  # Fazlası kernel kuyruğunda bekler
+        'backlog': _env_int('WEB_BACKLOG', 64),
+        'db_readers': max(3, min(cpu_count, threads))
+    }
+
+def _quiet_loggers():
+    """Flask/werkzeug istek loglarını kapat (web_app.py ile aynı), waitress sadece uyarı yazsın"""
+    for name in ('werkzeug', 'flask'):
+        logger = logging.getLogger(name)
+        logger.setLevel(logging.ERROR)
+        logger.disabled = True
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger('waitress').setLevel(logging.WARNING)  # "Task queue depth" uyarıları görünür
+
+profile = serving_profile()
+
+# Okuyucu havuzu boyutu web_app ilk veritabanı açılışında okunur
+os.environ.setdefault('BATTERY_DB_READERS', str(profile['db_readers']))
+
+from web_app import app, get_db, live_stream_hub  # noqa: E402
+
+live_stream_hub.max_subscribers = profile['max_streams']
+application = app
+
+def main():
+    port = 80
+    if len(sys.argv) > 1:
+        try:
+            port = int(sys.argv[1])
+        except ValueError:
+            print(f"⚠️ Geçersiz port: {sys.argv[1]}, 80 kullanılacak")
+
+    sys.stdout.reconfigure(line_buffering=True)
+    sys.stderr.reconfigure(line_buffering=True)
+    _quiet_loggers()
+
+    # Veritabanı havuzu thread'ler başlamadan bir kez açılır, tüm istekler paylaşır
+    get_db()
+
+    try:
+        from waitress import create_server
+    except ImportError:
+        print("⚠️ waitress kurulu değil (pip install waitress), Flask geliştirme sunucusu kullanılıyor")
+        app.run(host='0.0.0.0', port=port, debug=False, threaded=True)
+        return
+
+    server = create_server(
+        app,
+        host='0.0.0.0',
+        port=port,
+        threads=profile['threads'],
+        connection_limit=profile['connection_limit'],
+        backlog=profile['backlog'],
+        channel_timeout=120,  # Boşta keep-alive bağlantıları (SSE 15 sn'de bir ping alır)
+        cleanup_interval=30,
+        asyncore_use_poll=True,  # select() 1024 fd sınırına takılmasın
+        ident='battery-monitor'
+    )
+
+    def stop(signum, frame):
+        # waitress SystemExit'i yakalayıp yeni bağlantıları keser, süren istekleri bekler
+        print(f"🔄 Web sunucusu kapatılıyor (sinyal {signum})...")
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    print(f"✓ Web sunucusu: port {port}, {profile['threads']} thread, "
+          f"{profile['max_streams']} canlı akış, {profile['connection_limit']} bağlantı")
+    server.run()
+
+if __name__ == '__main__':
+    main()